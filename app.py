@@ -13,6 +13,8 @@ from config.styles import apply_styles
 from config.constants import APP_NAME, APP_VERSION, APP_AUTHOR
 from components.navigation import render_sidebar, render_active_section
 from utils.session_manager import SessionManager
+from utils.backup_scheduler import get_backup_scheduler
+from utils.precompute import get_precompute_worker
 
 
 def set_custom_favicon():
@@ -92,6 +94,10 @@ def main():
 
     # Initialisation
     initialize_session_state()
+    # Sauvegardes automatiques en arrière-plan (thread démarré une seule fois par processus serveur)
+    get_backup_scheduler()
+    # Précalcul des prévisions en arrière-plan (modèles, validations croisées, saisonnalités)
+    get_precompute_worker()
 
     # Interface utilisateur
     render_header()
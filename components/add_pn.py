@@ -1,14 +1,16 @@
 """
 Composant d'ajout de PN
-Permet d'ajouter des PN individuellement ou par lot via import Excel
+Permet d'ajouter des PN individuellement ou par lot via import Excel ou CSV
 """
 
 import streamlit as st
+import pandas as pd
 from datetime import datetime
-from utils.data_utils import load_excel, save_json_data, get_aircraft_model, extract_model_from_filename
+from utils.data_utils import load_excel, get_aircraft_model
+from utils.ingestion import run_batch_import, file_fingerprint, format_months
 from utils.validators import DataValidator
 from utils.session_manager import SessionManager
-from config.constants import MESSAGES, EXCEL_EXTENSIONS, DATE_FORMAT
+from config.constants import MESSAGES, IMPORT_EXTENSIONS, DATE_FORMAT
 
 
 def _initialize_aircraft_models():
@@ -17,15 +19,8 @@ def _initialize_aircraft_models():
 
 
 def _save_pn_data():
-    """Sauvegarde les données des PN dans le fichier JSON"""
-    save_json_data(
-        st.session_state.pn_data,
-        st.session_state.pn_last_updated,
-        st.session_state.pn_trend,
-        st.session_state.pn_trend_enabled,
-        st.session_state.pn_file_name,
-        st.session_state.pn_aircraft_model
-    )
+    """Sauvegarde les données des PN et les diffuse aux autres sessions (False en cas de conflit)"""
+    return SessionManager.save()
 
 
 def _add_single_pn(pn_name, aircraft_model, uploaded_file):
@@ -35,7 +30,7 @@ def _add_single_pn(pn_name, aircraft_model, uploaded_file):
     Args:
         pn_name (str): Nom du PN
         aircraft_model (str): Modèle d'avion
-        uploaded_file: Fichier Excel uploadé
+        uploaded_file: Fichier Excel ou CSV uploadé
         
     Returns:
         bool: True si l'ajout a réussi, False sinon
@@ -67,6 +62,10 @@ def _add_single_pn(pn_name, aircraft_model, uploaded_file):
     st.session_state.pn_trend[pn_name] = {}
     st.session_state.pn_trend_enabled[pn_name] = False
     st.session_state.pn_file_name[pn_name] = uploaded_file.name
+    st.session_state.setdefault('pn_file_hash', {})[pn_name] = {
+        'file': file_fingerprint(uploaded_file.getvalue()),
+        'series': st.session_state.pn_data.get_series(pn_name).fingerprint(),
+    }
     
     # Sauvegarde du modèle d'avion
     model_value = aircraft_model.strip() if aircraft_model.strip() else "Inconnu"
@@ -77,38 +76,79 @@ def _add_single_pn(pn_name, aircraft_model, uploaded_file):
 
 def _process_batch_files(uploaded_files):
     """
-    Traite un lot de fichiers pour l'import multiple
+    Traite un lot de fichiers pour l'import multiple : lecture parallèle, puis ajout des nouveaux PN
+    et mise à jour des PN dont l'historique a changé (enregistrés ensuite en une seule écriture)
     
     Args:
         uploaded_files: Liste des fichiers uploadés
         
     Returns:
-        tuple: (nombre de succès, liste des avertissements)
+        tuple: (dict du nombre de fichiers par statut, DataFrame récapitulatif par fichier)
     """
-    success_count = 0
-    warnings = []
+    progress = st.progress(0.0, text="Lecture des fichiers...")
+
+    def _on_progress(done, total, result):
+        progress.progress(done / total, text=f"{done}/{total} fichier(s) lu(s) : {result['file_name']}")
+
+    results = run_batch_import(
+        uploaded_files,
+        st.session_state.pn_data,
+        st.session_state.get('pn_file_hash', {}),
+        on_progress=_on_progress
+    )
+    progress.empty()
     
-    for file in uploaded_files:
-        # Extraire PN et modèle du nom de fichier
-        pn_name, model = extract_model_from_filename(file.name)
-        
-        if pn_name in st.session_state.pn_data:
-            warnings.append(f"Le PN {pn_name} existe déjà. Il sera ignoré.")
+    counts = {status: 0 for status in ('ok', 'updated', 'unchanged', 'ignored', 'error')}
+    now = datetime.now().strftime(DATE_FORMAT)
+    pn_file_hash = st.session_state.setdefault('pn_file_hash', {})
+    for result in results:
+        counts[result['status']] += 1
+        if result['status'] not in ('ok', 'updated', 'unchanged'):
             continue
-            
-        with st.spinner(f"Chargement du fichier {file.name}..."):
-            df = load_excel(file, file_name=file.name)
-            
-        if df is not None:
-            st.session_state.pn_data[pn_name] = df
-            st.session_state.pn_last_updated[pn_name] = datetime.now().strftime("%Y-%m-%d %H:%M")
+        pn_name = result['pn']
+        if result['status'] == 'ok':
+            # Nouveau PN : modèle d'avion et tendance initialisés
+            st.session_state.pn_aircraft_model[pn_name] = result['model'] if result['model'] else "Inconnu"
             st.session_state.pn_trend[pn_name] = {}
             st.session_state.pn_trend_enabled[pn_name] = False
-            st.session_state.pn_file_name[pn_name] = file.name
-            st.session_state.pn_aircraft_model[pn_name] = model if model else "Inconnu"
-            success_count += 1
+        if result['status'] != 'unchanged':
+            # Nouveau PN ou historique modifié (le modèle d'avion et la tendance d'un PN existant sont conservés)
+            st.session_state.pn_data[pn_name] = result['series']
+            st.session_state.pn_last_updated[pn_name] = now
+        st.session_state.pn_file_name[pn_name] = result['file_name']
+        pn_file_hash[pn_name] = {
+            'file': result['file_hash'],
+            'series': st.session_state.pn_data.get_series(pn_name).fingerprint(),
+        }
     
-    return success_count, warnings
+    status_labels = {
+        'ok': "✅ Importé", 'updated': "🔄 Mis à jour", 'unchanged': "➖ Inchangé",
+        'ignored': "⚠️ Ignoré", 'error': "❌ Erreur",
+    }
+    summary = pd.DataFrame([
+        {
+            "Fichier": result['file_name'],
+            "PN": result['pn'],
+            "Modèle": result['model'] or "Inconnu",
+            "Mois importés": len(result['df']) if result['df'] is not None else 0,
+            "Statut": status_labels[result['status']],
+            "Détail": _batch_detail(result),
+        }
+        for result in results
+    ])
+    return counts, summary
+
+
+def _batch_detail(result):
+    """Détail affiché dans le récapitulatif de l'import multiple"""
+    details = [result['error']] if result['error'] else []
+    if result['status'] == 'updated':
+        details.append(f"{len(result['changed_months'])} mois modifié(s) : {format_months(result['changed_months'])}")
+    elif result['status'] == 'unchanged':
+        details.append("Historique identique à l'import précédent")
+    if result['warning']:
+        details.append(result['warning'])
+    return ' ; '.join(details)
 
 
 def _render_single_pn_form():
@@ -128,15 +168,14 @@ def _render_single_pn_form():
         )
         
         uploaded_file = st.file_uploader(
-            "Importer un fichier Excel (colonnes : Année, Mois, Quantité)", 
-            type=EXCEL_EXTENSIONS,
+            "Importer un fichier Excel ou CSV (colonnes : Année, Mois, Quantité)", 
+            type=IMPORT_EXTENSIONS,
             help="Les mois peuvent être écrits avec ou sans majuscule (ex: Janvier ou janvier)"
         )
         submit_button = st.form_submit_button("Ajouter le PN")
 
         if submit_button and pn_name and uploaded_file:
-            if _add_single_pn(pn_name, aircraft_model, uploaded_file):
-                _save_pn_data()
+            if _add_single_pn(pn_name, aircraft_model, uploaded_file) and _save_pn_data():
                 SessionManager.set_active_section("dashboard")
                 model_text = aircraft_model.strip() if aircraft_model.strip() else "modèle non spécifié"
                 st.success(f"PN {pn_name} ajouté avec succès avec le modèle {model_text} !")
@@ -155,24 +194,27 @@ def _render_batch_import_form():
     
     with st.form(key="batch_add_pn_form"):
         uploaded_files = st.file_uploader(
-            "Importer plusieurs fichiers Excel", 
-            type=EXCEL_EXTENSIONS, 
+            "Importer plusieurs fichiers Excel ou CSV", 
+            type=IMPORT_EXTENSIONS, 
             accept_multiple_files=True
         )
         batch_submit_button = st.form_submit_button("Importer plusieurs PN")
 
         if batch_submit_button and uploaded_files:
-            success_count, warnings = _process_batch_files(uploaded_files)
+            counts, summary = _process_batch_files(uploaded_files)
             
-            # Afficher les avertissements
-            for warning in warnings:
-                st.warning(warning)
+            # Récapitulatif par fichier (le résumé reste affiché : pas de rechargement de la page)
+            st.dataframe(summary, use_container_width=True, hide_index=True)
                 
-            if success_count > 0:
-                _save_pn_data()
-                SessionManager.set_active_section("dashboard")
-                st.success(f"{success_count} PN(s) ajouté(s) avec succès ! Les modèles d'avion ont été extraits automatiquement des noms de fichier.")
-                st.rerun()
+            if counts['ok'] or counts['updated'] or counts['unchanged']:
+                # Les fichiers inchangés ne réécrivent rien (au plus le nom et l'empreinte du fichier)
+                if _save_pn_data():
+                    if counts['ok']:
+                        st.success(f"{counts['ok']} PN(s) ajouté(s) avec succès ! Les modèles d'avion ont été extraits automatiquement des noms de fichier.")
+                    if counts['updated']:
+                        st.success(f"{counts['updated']} PN(s) mis à jour.")
+                    if counts['unchanged']:
+                        st.info(f"{counts['unchanged']} PN(s) inchangé(s) : historique identique à l'import précédent.")
             else:
                 st.error("Aucun PN n'a pu être ajouté. Vérifiez les fichiers importés.")
 
@@ -1,10 +1,11 @@
 import streamlit as st
 import plotly.graph_objects as go
 from datetime import datetime
-from utils.forecast_utils import run_prophet_forecast, adjust_forecast
+from utils.forecast_utils import load_pn_model, predict_range, forecast_date_range, adjust_forecast, load_backtest, backtest_mae, resolve_engine
+from utils.precompute import get_precompute_worker
 from utils.plot_utils import generate_forecast_plot, generate_trend_plot
 from utils.data_utils import export_to_excel, get_aircraft_model
-from prophet.diagnostics import cross_validation, performance_metrics
+from config.constants import MESSAGES
 import pandas as pd
 
 def render_analysis():
@@ -31,11 +32,14 @@ def render_analysis():
         forecast_start_date = st.date_input("Date de début des prévisions", value=default_start_date, min_value=datetime(2020, 1, 1), max_value=datetime(2030, 12, 31))
 
         df = st.session_state.pn_data[selected_pn]
+        # Modèle Prophet ajusté en arrière-plan : lu dans le cache, jamais ajusté ici
+        model = None if df.empty else load_pn_model(selected_pn, df, section='analysis')
         if df.empty:
             st.error("Les données pour ce PN sont vides. Veuillez charger un fichier valide.")
+        elif model is None:
+            get_precompute_worker().enqueue([selected_pn])
+            st.caption(MESSAGES['forecast_pending'])
         else:
-            model, forecast = run_prophet_forecast(df, months, forecast_start_date)
-
             # Nettoyage des tendances : une seule valeur par année (la dernière)
             trends_raw = st.session_state.pn_trend.get(selected_pn, {})
             trends = {}
@@ -52,12 +56,12 @@ def render_analysis():
                         pct = 0.0
                     trends[year] = {"type": "linéaire", "values": {int(year): pct}}
             enable_trends = st.session_state.pn_trend_enabled.get(selected_pn, False)
-            forecast_adjusted = forecast.copy()
-            if enable_trends and trends:
-                forecast_adjusted = adjust_forecast(forecast, df, trends, forecast_start_year=forecast_start_date.year)
 
-            df_cv = cross_validation(model, horizon='365 days', initial='730 days', period='180 days')
-            mae = performance_metrics(df_cv)['mae'].mean() if not df_cv.empty else None
+            # Validation croisée précalculée en arrière-plan : lue dans le cache, jamais calculée ici
+            backtest = load_backtest(df, resolve_engine('analysis', selected_pn))
+            if backtest is None:
+                get_precompute_worker().enqueue([selected_pn])
+            mae = backtest_mae(backtest) if backtest is not None else None
 
             forecast_start = pd.to_datetime(forecast_start_date)
             forecast_end_date = (forecast_start + pd.offsets.MonthEnd(months)).normalize()
@@ -70,8 +74,17 @@ def render_analysis():
             else:
                 trend_start = df['ds'].min()
                 trend_end = pd.to_datetime(f"{forecast_start.year + (months // 12)}-12-31")
-            all_dates = pd.date_range(start=trend_start, end=trend_end, freq='MS').to_frame(index=False, name='ds')
-            trend_forecast = model.predict(all_dates)
+            all_dates = pd.date_range(start=trend_start, end=trend_end, freq='MS')
+            forecast_dates = forecast_date_range(forecast_start_date, months)
+
+            # Une seule prédiction couvre la période de prévision et la période de tendance
+            full_forecast = predict_range(model, min(all_dates[0], forecast_dates[0]), max(all_dates[-1], forecast_dates[-1]))
+            forecast = full_forecast[full_forecast['ds'].isin(forecast_dates)].reset_index(drop=True)
+            trend_forecast = full_forecast[full_forecast['ds'].isin(all_dates)].reset_index(drop=True)
+
+            forecast_adjusted = forecast.copy()
+            if enable_trends and trends:
+                forecast_adjusted = adjust_forecast(forecast, df, trends, forecast_start_year=forecast_start_date.year)
             trend_forecast_adjusted = trend_forecast if not (enable_trends and trends) else adjust_forecast(trend_forecast, df, trends, apply_all_trends=True)
 
             st.markdown(f"### Analyse du PN : **{selected_pn} ({get_aircraft_model(selected_pn, st.session_state.pn_aircraft_model)})**")
@@ -87,7 +100,7 @@ def render_analysis():
             st.markdown(f"**Fin des prévisions** : {forecast_end_date.strftime('%Y-%m-%d')}")
 
             st.markdown("#### Indicateurs clés")
-            yearly_totals = df.groupby(df['ds'].dt.year)['y'].sum()
+            yearly_totals = st.session_state.pn_data.get_series(selected_pn).yearly_totals()
             current_year = datetime.now().year
             complete_years = yearly_totals[yearly_totals.index < current_year]
             reference_year = complete_years.index.min() if not complete_years.empty else None
@@ -128,11 +141,11 @@ def render_analysis():
             )
             col5.metric(
                 "Fiabilité (MAE)",
-                f"{mae:.1f}" if mae is not None else "N/A",
+                f"{mae:.1f}" if mae is not None else ("N/A" if backtest is not None else "En cours"),
                 help="Erreur moyenne absolue des prévisions basée sur la validation croisée"
             )
 
-            yearly_totals = df[df['ds'].dt.year < current_year].groupby(df['ds'].dt.year)['y'].sum().reset_index()
+            yearly_totals = complete_years.reset_index()
             yearly_totals.columns = ['year', 'total']
             growth_text = "Pas assez de données historiques pour calculer la croissance entre 2023 et 2024."
             if len(yearly_totals) >= 2:
@@ -211,8 +224,6 @@ def render_analysis():
             st.plotly_chart(fig, use_container_width=True)
             # Affichage du graph de trend seule
             st.markdown("#### Visualisation de la trend")
-            trend_forecast = model.predict(all_dates)
-            trend_forecast_adjusted = trend_forecast if not (enable_trends and trends) else adjust_forecast(trend_forecast, df, trends, apply_all_trends=True)
             fig_trend = go.Figure()
             fig_trend.add_trace(go.Scatter(x=trend_forecast['ds'], y=trend_forecast['trend'], name='Trend initiale', line=dict(dash='dash', color='orange')))
             if enable_trends and trends:
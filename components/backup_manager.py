@@ -1,94 +1,78 @@
 import streamlit as st
-import os
-import json
-import pandas as pd
-from datetime import datetime as dt, timedelta
+from datetime import datetime as dt, time
+from functools import partial
+from utils.data_store import get_data_store
+from utils.snapshot_store import get_snapshot_store
+from utils.backup_scheduler import get_backup_scheduler
+from utils.restore import find_snapshot, plan_restore
+from utils.session_manager import SessionManager
+from config.constants import BACKUP_PAGE_SIZE
 
 def render_backup_manager():
     st.markdown("<h2>Gestion des sauvegardes de données</h2>", unsafe_allow_html=True)
-    backup_dir = "backups"
-    os.makedirs(backup_dir, exist_ok=True)
-
-    # Sauvegarde automatique hebdomadaire
-    now = dt.now()
-    backups = sorted([f for f in os.listdir(backup_dir) if f.endswith('.json')], reverse=True)
-    last_auto = None
-    for bkp in backups:
-        if bkp.startswith("auto_"):
-            last_auto = bkp
-            break
-    need_auto = True
+    store = get_snapshot_store()
+
+    # Sauvegardes automatiques : créées en arrière-plan par le planificateur, jamais pendant l'affichage
+    scheduler = get_backup_scheduler()
+    last_auto = scheduler.last_auto_time()
+    status = f"Sauvegarde automatique tous les {scheduler.interval.days} jours"
     if last_auto:
-        date_str = last_auto.split("_")[1].split(".")[0]
-        try:
-            last_auto_date = dt.strptime(date_str, "%Y%m%d")
-            if (now - last_auto_date).days < 7:
-                need_auto = False
-        except:
-            pass
-    if need_auto:
-        auto_name = f"auto_{now.strftime('%Y%m%d')}.json"
-        backup_path = os.path.join(backup_dir, auto_name)
-        backup_data = {
-            "pn_data": {k: v.to_json(date_format='iso') if hasattr(v, 'to_json') else v for k, v in st.session_state.pn_data.items()},
-            "pn_trend": st.session_state.pn_trend,
-            "pn_trend_enabled": st.session_state.pn_trend_enabled,
-            "pn_last_updated": st.session_state.pn_last_updated,
-            "pn_file_name": st.session_state.pn_file_name
-        }
-        with open(backup_path, "w", encoding="utf-8") as f:
-            json.dump(backup_data, f, ensure_ascii=False, indent=2)
-        st.success(f"Sauvegarde automatique hebdomadaire créée : {auto_name}")
+        status += f" · dernière : {last_auto.strftime('%d/%m/%Y')} · prochaine : {scheduler.next_due().strftime('%d/%m/%Y')}"
+    st.caption(status)
+    if scheduler.last_error:
+        st.warning(f"Échec de la dernière sauvegarde automatique : {scheduler.last_error}")
 
     # Sauvegarde manuelle
     if st.button("Sauvegarder maintenant", key="save_backup_manual"):
-        now_str = now.strftime("%Y-%m-%d_%Hh%Mmin%S")
-        backup_path = os.path.join(backup_dir, f"backup_{now_str}.json")
-        backup_data = {
-            "pn_data": {k: v.to_json(date_format='iso') if hasattr(v, 'to_json') else v for k, v in st.session_state.pn_data.items()},
-            "pn_trend": st.session_state.pn_trend,
-            "pn_trend_enabled": st.session_state.pn_trend_enabled,
-            "pn_last_updated": st.session_state.pn_last_updated,
-            "pn_file_name": st.session_state.pn_file_name
-        }
-        with open(backup_path, "w", encoding="utf-8") as f:
-            json.dump(backup_data, f, ensure_ascii=False, indent=2)
-        st.success(f"Sauvegarde manuelle créée : {backup_path}")
-
-    # Liste des sauvegardes existantes
-    backups = sorted([f for f in os.listdir(backup_dir) if f.endswith('.json')], reverse=True)
+        data_store = get_data_store()
+        backup_name = store.create({**data_store.snapshot()[1], 'data_link': data_store.data_link}, kind='manual')
+        st.success(f"Sauvegarde manuelle créée : {backup_name}")
+
+    # Restauration à une date : la dernière sauvegarde créée au plus tard à cette date
+    with st.expander("Restaurer l'état à une date"):
+        date_col, time_col = st.columns(2)
+        with date_col:
+            restore_date = st.date_input("Date", value=dt.now().date(), key="restore_at_date")
+        with time_col:
+            restore_time = st.time_input("Heure", value=time(23, 59), key="restore_at_time")
+        restore_pns = st.multiselect(
+            "PN à restaurer (toute la flotte si aucun)", sorted(st.session_state.get('pn_data', {})), key="restore_at_pns"
+        )
+        if st.button("Chercher la sauvegarde", key="restore_at_search"):
+            found = find_snapshot(store, dt.combine(restore_date, restore_time), restore_pns)
+            if found is None:
+                st.warning("Aucune sauvegarde n'existe à cette date pour ces PN.")
+            else:
+                _open_restore(found, restore_pns)
+
+    _apply_restore_request()
+    if st.session_state.get('restore_target'):
+        _render_restore_panel(store, st.session_state['restore_target'])
+
+    # Liste des sauvegardes existantes, page par page depuis le catalogue (aucun fichier n'est lu)
+    page = st.session_state.get('backup_page', 0)
+    backups, total = store.list_snapshots(page * BACKUP_PAGE_SIZE, BACKUP_PAGE_SIZE)
+    if total and not backups:
+        # Page devenue vide après suppressions : retour à la dernière page
+        page = (total - 1) // BACKUP_PAGE_SIZE
+        backups, total = store.list_snapshots(page * BACKUP_PAGE_SIZE, BACKUP_PAGE_SIZE)
     if backups:
-        st.markdown("#### Versions sauvegardées :")
-        for bkp in backups:
+        page_count = -(-total // BACKUP_PAGE_SIZE)
+        st.markdown(f"#### Versions sauvegardées ({total}) :")
+        for entry in backups:
+            bkp = entry['id']
             col1, col2, col3, col4 = st.columns([3,1,1,1])
             with col1:
-                # Affichage nom + date lisible dans le titre (date seule, sans l'heure)
-                try:
-                    date_part = bkp.replace("backup_", "").replace("auto_", "").replace(".json", "")
-                    if "_" in date_part and "h" in date_part:
-                        date_obj = dt.strptime(date_part, "%Y-%m-%d_%Hh%Mmin%S")
-                        date_str = date_obj.strftime("%d/%m/%Y")  # date only
-                    else:
-                        date_obj = dt.strptime(date_part, "%Y%m%d")
-                        date_str = date_obj.strftime("%d/%m/%Y")
-                except:
-                    date_str = date_part
-                # Titre avec date visible (sans l'heure)
-                st.write(f"**{bkp}**  ", f"🗓️ {date_str}")
+                # Date, nombre de PN et taille lus dans le catalogue
+                date_str = dt.fromisoformat(entry['created_at']).strftime("%d/%m/%Y")
+                st.write(f"**{bkp}**  ", f"🗓️ {date_str} · {entry['pn_count']} PN · {_format_size(entry['size'])}")
             with col2:
                 if st.button(f"Restaurer", key=f"restore_{bkp}"):
-                    with open(os.path.join(backup_dir, bkp), "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    pn_data = {k: pd.read_json(v) if isinstance(v, str) else v for k, v in data.get("pn_data", {}).items()}
-                    st.session_state.pn_data = pn_data
-                    st.session_state.pn_trend = data.get("pn_trend", {})
-                    st.session_state.pn_trend_enabled = data.get("pn_trend_enabled", {})
-                    st.session_state.pn_last_updated = data.get("pn_last_updated", {})
-                    st.session_state.pn_file_name = data.get("pn_file_name", {})
-                    st.success(f"Version restaurée depuis {bkp}. Rechargez la page pour voir l'effet.")
+                    _open_restore(bkp)
+                    st.rerun()
             with col3:
-                with open(os.path.join(backup_dir, bkp), "rb") as f:
-                    st.download_button("Exporter", f, file_name=bkp, mime="application/json", key=f"export_{bkp}")
+                # Contenu généré seulement au clic, hors de l'affichage de la page
+                st.download_button("Exporter", partial(store.export, bkp), file_name=f"{bkp}.json", mime="application/json", key=f"export_{bkp}")
             with col4:
                 # Nouvelle confirmation inline, plus claire
                 if st.session_state.get('delete_confirm') == bkp:
@@ -96,7 +80,7 @@ def render_backup_manager():
                     confirm_col, cancel_col = st.columns([1,1])
                     with confirm_col:
                         if st.button("✅ Oui, supprimer", key=f"confirm_delete_{bkp}"):
-                            os.remove(os.path.join(backup_dir, bkp))
+                            store.delete(bkp)
                             st.success(f"Sauvegarde supprimée : {bkp}")
                             st.session_state['delete_confirm'] = None
                     with cancel_col:
@@ -105,5 +89,96 @@ def render_backup_manager():
                 else:
                     if st.button("Supprimer", key=f"delete_{bkp}"):
                         st.session_state['delete_confirm'] = bkp
+        if page_count > 1:
+            prev_col, page_col, next_col = st.columns([1,2,1])
+            with prev_col:
+                if st.button("◀ Précédentes", key="backup_page_prev", disabled=page == 0):
+                    st.session_state['backup_page'] = page - 1
+                    st.rerun()
+            with page_col:
+                st.write(f"Page {page + 1} / {page_count}")
+            with next_col:
+                if st.button("Suivantes ▶", key="backup_page_next", disabled=page >= page_count - 1):
+                    st.session_state['backup_page'] = page + 1
+                    st.rerun()
     else:
         st.info("Aucune sauvegarde disponible.")
+
+
+def _open_restore(snapshot_id, pns=()):
+    """
+    Demande l'ouverture du panneau de restauration, pour toute la flotte ou pour les PN indiqués.
+
+    Les widgets du panneau peuvent déjà être affichés dans cette exécution : la demande est conservée
+    sous une clé hors widget et appliquée avant le prochain affichage du panneau (_apply_restore_request).
+    """
+    st.session_state['restore_request'] = {
+        'target': snapshot_id,
+        'scope': "PN sélectionnés" if pns else "Toute la flotte",
+        'pns': list(pns),
+    }
+
+
+def _apply_restore_request():
+    """Recopie la demande de restauration en attente dans l'état du panneau (avant création de ses widgets)"""
+    request = st.session_state.pop('restore_request', None)
+    if request:
+        st.session_state['restore_target'] = request['target']
+        st.session_state['restore_scope'] = request['scope']
+        st.session_state['restore_pns'] = request['pns']
+
+
+def _render_restore_panel(store, snapshot_id):
+    """
+    Panneau de confirmation d'une restauration.
+
+    Seuls le manifeste de la sauvegarde et les historiques restaurés sont lus ; le résultat est publié
+    en une seule écriture dans le stock partagé, visible aussitôt par toutes les sessions.
+
+    Args:
+        store (SnapshotStore): Magasin des sauvegardes.
+        snapshot_id (str): Sauvegarde à restaurer.
+    """
+    if snapshot_id not in store.catalog():
+        # Sauvegarde supprimée entre-temps
+        st.session_state['restore_target'] = None
+        return
+    st.markdown(f"#### Restaurer {snapshot_id}")
+    available = sorted(store.load(snapshot_id)['pn_data'])
+    scope = st.radio("Portée", ["Toute la flotte", "PN sélectionnés"], key="restore_scope", horizontal=True)
+    pns = None
+    if scope == "PN sélectionnés":
+        st.session_state['restore_pns'] = [pn for pn in st.session_state.get('restore_pns', []) if pn in available]
+        pns = st.multiselect("PN à restaurer", available, key="restore_pns")
+    else:
+        st.caption("Les PN ajoutés depuis cette sauvegarde seront supprimés.")
+
+    confirm_col, cancel_col = st.columns([1,1])
+    with confirm_col:
+        if st.button("✅ Restaurer", key="restore_confirm", disabled=pns is not None and not pns):
+            try:
+                sections, summary = plan_restore(store, st.session_state, snapshot_id, pns)
+            except Exception as e:
+                st.error(f"Erreur lors de la restauration : {str(e)}")
+                return
+            if SessionManager.publish(**sections):
+                st.session_state['restore_target'] = None
+                message = f"Version restaurée depuis {snapshot_id} : {len(summary['restored'])} PN restaurés"
+                if summary['unchanged']:
+                    message += f", {len(summary['unchanged'])} déjà identiques"
+                if summary['removed']:
+                    message += f", {len(summary['removed'])} supprimés"
+                st.success(message)
+    with cancel_col:
+        if st.button("❌ Annuler", key="restore_cancel"):
+            st.session_state['restore_target'] = None
+            st.rerun()
+
+
+def _format_size(size):
+    """Taille lisible (octets, Ko ou Mo)"""
+    if size < 1024:
+        return f"{size} o"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} Ko"
+    return f"{size / (1024 * 1024):.1f} Mo"
@@ -2,9 +2,10 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
-from utils.forecast_utils import run_prophet_forecast, adjust_forecast
+from utils.forecast_utils import adjust_forecast, load_backtest, backtest_mae, resolve_engine
+from utils.batch_forecast import run_batch_forecast
+from utils.precompute import get_precompute_worker
 from utils.data_utils import get_aircraft_model
-from prophet.diagnostics import cross_validation, performance_metrics
 
 def render_comparison():
     """
@@ -53,12 +54,19 @@ def render_comparison():
             synthese = []
             fig = go.Figure()
             colors = ['#003087', '#4A90E2']
+            batch_results = run_batch_forecast(
+                selected_pns, st.session_state.pn_data, forecast_start_date, months, section='comparison'
+            )
             for i, pn in enumerate(selected_pns):
                 df = st.session_state.pn_data[pn]
                 if df.empty:
                     st.error(f"Les données pour {pn} sont vides. Veuillez charger un fichier valide.")
                     continue
-                model, forecast = run_prophet_forecast(df, months, forecast_start_date)
+                result = batch_results[pn]
+                forecast = result['forecast']
+                if forecast is None:
+                    st.error(f"Prévision impossible pour {pn} : {result['error']}")
+                    continue
                 trends = st.session_state.pn_trend.get(pn, {})
                 enable_trends = st.session_state.pn_trend_enabled.get(pn, False)
                 forecast_adjusted = forecast.copy()
@@ -67,17 +75,16 @@ def render_comparison():
                 # Indicateurs simples
                 total_prevu = forecast_adjusted['yhat'].sum() if not forecast_adjusted.empty else 0
                 moyenne_mensuelle = total_prevu / months if total_prevu != 0 else 0
-                mae = None
-                try:
-                    df_cv = cross_validation(model, horizon='365 days', initial='730 days', period='180 days')
-                    mae = performance_metrics(df_cv)['mae'].mean() if not df_cv.empty else None
-                except Exception:
-                    mae = None
+                # MAE précalculée en arrière-plan : lue dans le cache, jamais calculée ici
+                backtest = load_backtest(df, resolve_engine('comparison', pn))
+                if backtest is None:
+                    get_precompute_worker().enqueue([pn])
+                mae = backtest_mae(backtest) if backtest is not None else None
                 synthese.append({
                     "PN": f"{pn} ({get_aircraft_model(pn, st.session_state.pn_aircraft_model)})",
                     "Total prévu": f"{total_prevu:.0f}",
                     "Moyenne mensuelle": f"{moyenne_mensuelle:.0f}",
-                    "MAE": f"{mae:.1f}" if mae is not None else "N/A"
+                    "MAE": f"{mae:.1f}" if mae is not None else ("N/A" if backtest is not None else "En cours")
                 })
                 # Graphe
                 fig.add_trace(go.Scatter(
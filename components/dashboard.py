@@ -8,6 +8,7 @@ import pandas as pd
 from utils.plot_utils import generate_seasonality_plot
 from utils.data_utils import get_aircraft_model
 from utils.session_manager import SessionManager
+from utils.precompute import get_precompute_worker
 from config.constants import MESSAGES
 
 
@@ -151,12 +152,17 @@ def _render_seasonality_section():
     else:
         pns_to_plot = list(st.session_state.pn_data.keys())
     
-    # Générer et afficher le graphique
+    # Générer et afficher le graphique (profils précalculés en arrière-plan, les manquants sont mis en file)
+    worker = get_precompute_worker()
     fig_seasonality = generate_seasonality_plot(
         pns_to_plot, 
         st.session_state.pn_data, 
-        st.session_state.pn_aircraft_model
+        st.session_state.pn_aircraft_model,
+        on_missing=worker.enqueue
     )
+    pending = [pn for pn in pns_to_plot if worker.is_pending(pn)]
+    if pending:
+        st.caption(f"Saisonnalité en cours de calcul pour {len(pending)} PN : actualisez la page dans quelques instants.")
     st.plotly_chart(fig_seasonality, use_container_width=True)
 
 
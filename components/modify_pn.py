@@ -1,7 +1,148 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
-from utils.data_utils import load_excel, save_json_data, get_aircraft_model
-import os
+from utils.data_utils import load_excel, get_aircraft_model, validate_history_frame
+from utils.data_store import get_data_store
+from utils.session_manager import SessionManager
+from utils.ingestion import file_fingerprint, is_unchanged_upload, diff_history, merge_history, format_months
+from config.constants import (
+    FORECAST_ENGINES, IMPORT_EXTENSIONS, REQUIRED_COLUMNS, MERGE_POLICIES, DEFAULT_MERGE_POLICY,
+    HISTORY_YEAR_RANGE, DATE_FORMAT
+)
+from config.mappings import MONTH_NAMES
+
+
+def _import_new_file(selected_pn, new_file):
+    """
+    Importe un nouveau fichier pour un PN existant. Un fichier identique au dernier import n'est pas relu,
+    et seul un historique dont au moins un mois a changé remplace l'historique courant.
+
+    Args:
+        selected_pn (str): PN modifié.
+        new_file: Fichier chargé via st.file_uploader.
+
+    Returns:
+        bool: True si l'historique du PN a changé.
+    """
+    file_hash = file_fingerprint(new_file.getvalue())
+    pn_file_hash = st.session_state.setdefault('pn_file_hash', {})
+    if is_unchanged_upload(selected_pn, file_hash, st.session_state.pn_data, pn_file_hash):
+        st.info(f"Fichier identique au dernier import : historique de {selected_pn} inchangé.")
+        return False
+
+    with st.spinner(f"Chargement du fichier pour {selected_pn}..."):
+        df = load_excel(new_file, file_name=selected_pn)
+    if df is None:
+        return False
+
+    series, changed = diff_history(selected_pn, df, st.session_state.pn_data)
+    if len(changed):
+        st.session_state.pn_data[selected_pn] = series
+        st.info(f"{len(changed)} mois modifié(s) pour {selected_pn} : {format_months(changed)}")
+    else:
+        st.info(f"Historique de {selected_pn} identique à l'import précédent.")
+    st.session_state.pn_file_name[selected_pn] = new_file.name
+    pn_file_hash[selected_pn] = {'file': file_hash, 'series': series.fingerprint()}
+    return bool(len(changed))
+
+
+def _render_append_form(selected_pn):
+    """
+    Affiche le formulaire de mise à jour mensuelle : les mois saisis (ou lus dans un fichier
+    ne contenant que les nouveaux mois) sont fusionnés dans l'historique existant.
+
+    Args:
+        selected_pn (str): PN modifié.
+    """
+    series = st.session_state.pn_data.get_series(selected_pn)
+    today = datetime.now()
+    next_month = series.start + len(series) if len(series) else today.year * 12 + today.month - 1
+    default_rows = pd.DataFrame({
+        'Année': [next_month // 12],
+        'Mois': [MONTH_NAMES[next_month % 12]],
+        'Quantité': [None],
+    })
+
+    with st.form(key=f"append_months_form_{selected_pn}"):
+        entries = st.data_editor(
+            default_rows,
+            num_rows="dynamic",
+            hide_index=True,
+            column_config={
+                'Année': st.column_config.NumberColumn(
+                    "Année", min_value=HISTORY_YEAR_RANGE[0], max_value=HISTORY_YEAR_RANGE[1], step=1, format="%d"
+                ),
+                'Mois': st.column_config.SelectboxColumn("Mois", options=MONTH_NAMES),
+                'Quantité': st.column_config.NumberColumn("Quantité", min_value=0),
+            },
+            key=f"append_editor_{selected_pn}"
+        )
+        append_file = st.file_uploader(
+            "Ou importer un fichier contenant uniquement les nouveaux mois",
+            type=IMPORT_EXTENSIONS,
+            key=f"append_file_{selected_pn}"
+        )
+        policy = st.selectbox(
+            "Mois déjà présents dans l'historique",
+            list(MERGE_POLICIES),
+            index=list(MERGE_POLICIES).index(DEFAULT_MERGE_POLICY),
+            format_func=lambda key: MERGE_POLICIES[key],
+            key=f"append_policy_{selected_pn}"
+        )
+        if st.form_submit_button("Ajouter les mois"):
+            if _append_months(selected_pn, entries, append_file, policy):
+                st.rerun()
+
+
+def _append_months(selected_pn, entries, append_file, policy):
+    """
+    Fusionne les nouveaux mois dans l'historique du PN et enregistre le seul historique modifié.
+
+    Args:
+        selected_pn (str): PN modifié.
+        entries (pandas.DataFrame): Mois saisis (colonnes 'Année', 'Mois', 'Quantité').
+        append_file: Fichier de nouveaux mois chargé via st.file_uploader (ou None).
+        policy (str): Politique pour les mois déjà présents (clé de MERGE_POLICIES).
+
+    Returns:
+        bool: True si l'historique a été mis à jour et enregistré.
+    """
+    frames = []
+    # Les lignes sans quantité (ligne proposée laissée vide) sont ignorées
+    entries = entries[REQUIRED_COLUMNS].dropna(subset=['Quantité']).reset_index(drop=True)
+    if not entries.empty:
+        df, report = validate_history_frame(entries)
+        if df is None:
+            st.error(f"Mois saisis invalides : {report.error_details()}.")
+            return False
+        frames.append(df)
+    if append_file:
+        df = load_excel(append_file, file_name=selected_pn)
+        if df is None:
+            return False
+        frames.append(df)
+    if not frames:
+        st.warning("Aucun mois à ajouter.")
+        return False
+
+    series, added, conflicts = merge_history(selected_pn, pd.concat(frames, ignore_index=True), st.session_state.pn_data, policy)
+    if policy == 'reject' and len(conflicts):
+        st.error(f"{len(conflicts)} mois déjà présent(s) avec une autre quantité : {format_months(conflicts)}. "
+                 "Choisissez de remplacer ou de conserver les mois existants.")
+        return False
+    if series is st.session_state.pn_data.get_series(selected_pn):
+        st.info("Aucun mois nouveau ou modifié : historique inchangé.")
+        return False
+
+    # La tendance personnalisée est conservée : seuls l'historique et sa date de mise à jour changent
+    st.session_state.pn_data[selected_pn] = series
+    st.session_state.pn_last_updated[selected_pn] = datetime.now().strftime(DATE_FORMAT)
+    if not SessionManager.save('pn_data', 'pn_last_updated'):
+        return False
+    replaced = len(conflicts) if policy == 'overwrite' else 0
+    st.success(f"PN {selected_pn} : {len(added)} mois ajouté(s), {replaced} mois remplacé(s).")
+    return True
+
 
 def render_modify_pn():
     """
@@ -43,38 +184,48 @@ def render_modify_pn():
                     help="Saisissez librement le modèle d'avion correspondant à ce PN",
                     key=f"model_input_{selected_pn}"
                 )
+
+                # Moteur de prévision propre à ce PN ("Par défaut" : moteur de chaque section)
+                engine_options = [None] + list(FORECAST_ENGINES.keys())
+                current_engine = st.session_state.get('pn_forecast_engine', {}).get(selected_pn)
+                new_engine = st.selectbox(
+                    "Moteur de prévision",
+                    engine_options,
+                    index=engine_options.index(current_engine) if current_engine in engine_options else 0,
+                    format_func=lambda engine: FORECAST_ENGINES[engine] if engine else "Par défaut",
+                    help="Le moteur classique est beaucoup plus rapide que Prophet, pour des prévisions plus simples",
+                    key=f"engine_input_{selected_pn}"
+                )
                 
-                new_file = st.file_uploader(f"Nouveau fichier pour {selected_pn}", type=["xlsx"], key=f"update_file_{selected_pn}")
+                new_file = st.file_uploader(f"Nouveau fichier pour {selected_pn}", type=IMPORT_EXTENSIONS, key=f"update_file_{selected_pn}")
                 with st.form(key=f"modify_pn_form_{selected_pn}"):
                     col_update, col_delete = st.columns(2)
                     with col_update:
                         if st.form_submit_button(f"Mettre à jour {selected_pn}"):
-                            trends = {}
+                            history_changed = False
                             if new_file:
-                                with st.spinner(f"Chargement du fichier pour {selected_pn}..."):
-                                    df = load_excel(new_file, file_name=selected_pn)
-                                if df is not None:
-                                    st.session_state.pn_data[selected_pn] = df
-                                    st.session_state.pn_file_name[selected_pn] = new_file.name
+                                history_changed = _import_new_file(selected_pn, new_file)
                             
                             # Mettre à jour le modèle d'avion
                             final_model = new_aircraft_model.strip() if new_aircraft_model.strip() else "Inconnu"
                             st.session_state.pn_aircraft_model[selected_pn] = final_model
+                            # Un moteur n'est enregistré pour le PN que s'il a été choisi explicitement
+                            pn_forecast_engine = dict(st.session_state.get('pn_forecast_engine', {}))
+                            if new_engine:
+                                pn_forecast_engine[selected_pn] = new_engine
+                            else:
+                                pn_forecast_engine.pop(selected_pn, None)
+                            st.session_state.pn_forecast_engine = pn_forecast_engine
                             
-                            st.session_state.pn_trend[selected_pn] = trends
-                            st.session_state.pn_trend_enabled[selected_pn] = False
-                            st.session_state.pn_last_updated[selected_pn] = datetime.now().strftime("%Y-%m-%d %H:%M")
-                            save_json_data(
-                                st.session_state.pn_data,
-                                st.session_state.pn_last_updated,
-                                st.session_state.pn_trend,
-                                st.session_state.pn_trend_enabled,
-                                st.session_state.pn_file_name,
-                                st.session_state.pn_aircraft_model
-                            )
-                            st.session_state.active_section = "dashboard"
-                            st.success(f"PN {selected_pn} mis à jour avec succès ! Modèle : {final_model}")
-                            st.rerun()
+                            # Tendance et date de mise à jour ne changent que si l'historique a changé
+                            if history_changed:
+                                st.session_state.pn_trend[selected_pn] = {}
+                                st.session_state.pn_trend_enabled[selected_pn] = False
+                                st.session_state.pn_last_updated[selected_pn] = datetime.now().strftime("%Y-%m-%d %H:%M")
+                            if SessionManager.save():
+                                st.session_state.active_section = "dashboard"
+                                st.success(f"PN {selected_pn} mis à jour avec succès ! Modèle : {final_model}")
+                                st.rerun()
                     with col_delete:
                         if st.form_submit_button(f"Supprimer {selected_pn}"):
                             del st.session_state.pn_data[selected_pn]
@@ -84,17 +235,16 @@ def render_modify_pn():
                             del st.session_state.pn_file_name[selected_pn]
                             if selected_pn in st.session_state.pn_aircraft_model:
                                 del st.session_state.pn_aircraft_model[selected_pn]
-                            save_json_data(
-                                st.session_state.pn_data,
-                                st.session_state.pn_last_updated,
-                                st.session_state.pn_trend,
-                                st.session_state.pn_trend_enabled,
-                                st.session_state.pn_file_name,
-                                st.session_state.pn_aircraft_model
-                            )
-                            st.session_state.active_section = "dashboard"
-                            st.success(f"PN {selected_pn} supprimé.")
-                            st.rerun()
+                            st.session_state.get('pn_forecast_engine', {}).pop(selected_pn, None)
+                            st.session_state.get('pn_file_hash', {}).pop(selected_pn, None)
+                            if SessionManager.save():
+                                st.session_state.active_section = "dashboard"
+                                st.success(f"PN {selected_pn} supprimé.")
+                                st.rerun()
+
+                # Mise à jour mensuelle, sans réimporter tout l'historique
+                st.markdown("#### Ajouter des mois")
+                _render_append_form(selected_pn)
     else:
         st.info("Aucun PN disponible pour modification.")
     # Fin de page : bouton réinitialiser
@@ -106,9 +256,7 @@ def render_modify_pn():
         col_confirm, col_cancel = st.columns(2)
         with col_confirm:
             if st.button("Confirmer la réinitialisation", key="confirm_reset"):
-                import os
-                if os.path.exists("pn_data.json"):
-                    os.remove("pn_data.json")
+                get_data_store().clear()
                 st.session_state.clear()
                 st.session_state.active_section = "dashboard"
                 st.success("Toutes les données ont été réinitialisées !")
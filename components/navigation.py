@@ -4,20 +4,15 @@ Contient toute la logique de navigation et de routage
 """
 
 import streamlit as st
-import json
 import webbrowser
 from datetime import datetime
+from utils.data_store import get_data_store
 
 
 def initialize_data_link():
-    """Initialise le lien de données depuis le fichier JSON"""
+    """Initialise le lien de données depuis le stock de données"""
     if 'data_link' not in st.session_state:
-        try:
-            with open("pn_data.json", "r") as f:
-                data = json.load(f)
-                st.session_state.data_link = data.get("data_link", "https://example.com")
-        except FileNotFoundError:
-            st.session_state.data_link = "https://example.com"
+        st.session_state.data_link = get_data_store().data_link
 
 
 def render_navigation_buttons():
@@ -104,17 +99,13 @@ def render_data_link_settings():
     with col1:
         if st.button("Sauvegarder"):
             if new_link:
-                st.session_state.data_link = new_link
-                # Sauvegarder dans le fichier JSON
                 try:
-                    with open("pn_data.json", "r") as f:
-                        data = json.load(f)
-                except FileNotFoundError:
-                    data = {}
-                data["data_link"] = new_link
-                with open("pn_data.json", "w") as f:
-                    json.dump(data, f, indent=4)
-                st.success("Lien sauvegardé avec succès!")
+                    get_data_store().set_data_link(new_link)
+                except Exception as e:
+                    st.error(f"Erreur lors de la sauvegarde du lien : {str(e)}")
+                else:
+                    st.session_state.data_link = new_link
+                    st.success("Lien sauvegardé avec succès!")
             else:
                 st.error("Veuillez entrer un lien valide.")
     
@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from utils.forecast_utils import run_prophet_forecast
+from utils.forecast_utils import load_pn_model, predict_range
+from utils.precompute import get_precompute_worker
+from config.constants import MESSAGES
 from datetime import datetime
 
 def render_performance():
@@ -26,7 +28,13 @@ def render_performance():
     months = (year_range[1] - year_range[0] + 1) * 12  # Nombre de mois pour toute la période
     
     # Récupération des prévisions pour toute la période
-    model, forecast = run_prophet_forecast(df, months, start_date)
+    # Modèle Prophet ajusté en arrière-plan : lu dans le cache, jamais ajusté ici
+    model = load_pn_model(pn_select, df, section='performance')
+    if model is None:
+        get_precompute_worker().enqueue([pn_select])
+        st.caption(MESSAGES['forecast_pending'])
+        return
+    forecast = predict_range(model, start_date, periods=months)
     # On suppose que la colonne 'yhat' est la prévision, 'y' la réalité
     df_compare = pd.merge(
         forecast[['ds', 'yhat']],
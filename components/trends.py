@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from utils.forecast_utils import run_prophet_forecast, adjust_forecast
-from utils.data_utils import save_json_data, load_json_data
+from utils.forecast_utils import load_pn_model, predict_range, forecast_date_range, adjust_forecast
+from utils.trends_repository import get_trends_repository
+from utils.session_manager import SessionManager
+from utils.precompute import get_precompute_worker
+from config.constants import MESSAGES
 
 def render_trends():
     st.markdown("<h2>Trends personnalisées</h2>", unsafe_allow_html=True)
@@ -11,10 +14,8 @@ def render_trends():
     Activez la fonctionnalité pour les PN souhaités. L'impact est plus fort sur les pics de saisonnalité.
     """, icon="⚙️")
     
-    # Lecture du JSON à chaque affichage
-    json_data = load_json_data()
-    pn_trend = json_data.get('pn_trend', {})
-    pn_trend_enabled = json_data.get('pn_trend_enabled', {})
+    # Tendances servies depuis le cache du dépôt (aucune relecture des historiques des PN)
+    _, pn_trend, pn_trend_enabled = get_trends_repository().get_trends()
     pn_list = sorted(list(pn_trend.keys()))
     # Récupérer toutes les années présentes dans le JSON pour tous les PN
     all_years = set()
@@ -51,16 +52,12 @@ def render_trends():
                     if year_str not in pn_trend[pn]:
                         pn_trend[pn][year_str] = {"type": "linéaire", "values": {year_str: 0.0}}
                 
-                save_json_data(
-                    st.session_state.pn_data if hasattr(st.session_state, 'pn_data') else {},
-                    st.session_state.pn_last_updated if hasattr(st.session_state, 'pn_last_updated') else {},
-                    pn_trend,
-                    pn_trend_enabled,
-                    st.session_state.pn_file_name if hasattr(st.session_state, 'pn_file_name') else "pn_data.json",
-                    getattr(st.session_state, 'pn_aircraft_model', {})
-                )
-                st.success(f"Année {new_year} ajoutée !")
-                st.rerun()
+                if SessionManager.publish(
+                    pn_trend=pn_trend,
+                    pn_trend_enabled=pn_trend_enabled
+                ):
+                    st.success(f"Année {new_year} ajoutée !")
+                    st.rerun()
     
     if all_years:
         year_to_remove = st.selectbox("Supprimer une année", [""] + [str(y) for y in all_years], key="year_to_remove")
@@ -72,16 +69,12 @@ def render_trends():
                 if pn in pn_trend and year_to_remove in pn_trend[pn]:
                     del pn_trend[pn][year_to_remove]
             
-            save_json_data(
-                getattr(st.session_state, 'pn_data', {}),
-                getattr(st.session_state, 'pn_last_updated', {}),
-                pn_trend,
-                pn_trend_enabled,
-                getattr(st.session_state, 'pn_file_name', "pn_data.json"),
-                getattr(st.session_state, 'pn_aircraft_model', {})
-            )
-            st.success(f"Année {year_to_remove} supprimée !")
-            st.rerun()
+            if SessionManager.publish(
+                pn_trend=pn_trend,
+                pn_trend_enabled=pn_trend_enabled
+            ):
+                st.success(f"Année {year_to_remove} supprimée !")
+                st.rerun()
     # Formulaire de saisie
     st.markdown("#### Saisie/activation d'une trend personnalisée")
     
@@ -128,16 +121,12 @@ def render_trends():
                 
                 pn_trend_enabled_clean[pn_select] = bool(active)
                 
-                save_json_data(
-                    getattr(st.session_state, 'pn_data', {}),
-                    getattr(st.session_state, 'pn_last_updated', {}),
-                    pn_trend_clean,
-                    pn_trend_enabled_clean,
-                    getattr(st.session_state, 'pn_file_name', "pn_data.json"),
-                    getattr(st.session_state, 'pn_aircraft_model', {})
-                )
-                st.success(f"Trend personnalisée enregistrée pour {pn_select} !")
-                st.rerun()
+                if SessionManager.publish(
+                    pn_trend=pn_trend_clean,
+                    pn_trend_enabled=pn_trend_enabled_clean
+                ):
+                    st.success(f"Trend personnalisée enregistrée pour {pn_select} !")
+                    st.rerun()
     # Tableau récapitulatif (toujours à jour)
     st.markdown("#### Récapitulatif de toutes les trends personnalisées")
     
@@ -185,16 +174,12 @@ def render_trends():
                         pn_trend[target_pn] = pn_trend[source_pn].copy()
                     pn_trend_enabled[target_pn] = pn_trend_enabled.get(source_pn, False)
                     
-                    save_json_data(
-                        getattr(st.session_state, 'pn_data', {}),
-                        getattr(st.session_state, 'pn_last_updated', {}),
-                        pn_trend,
-                        pn_trend_enabled,
-                        getattr(st.session_state, 'pn_file_name', "pn_data.json"),
-                        getattr(st.session_state, 'pn_aircraft_model', {})
-                    )
-                    st.success(f"Tendances copiées de {source_pn} vers {target_pn} !")
-                    st.rerun()
+                    if SessionManager.publish(
+                        pn_trend=pn_trend,
+                        pn_trend_enabled=pn_trend_enabled
+                    ):
+                        st.success(f"Tendances copiées de {source_pn} vers {target_pn} !")
+                        st.rerun()
                 else:
                     st.error("Le PN source et le PN cible doivent être différents.")
     
@@ -230,16 +215,12 @@ def render_trends():
                     
                     pn_trend_enabled[pn] = bulk_active
                 
-                save_json_data(
-                    getattr(st.session_state, 'pn_data', {}),
-                    getattr(st.session_state, 'pn_last_updated', {}),
-                    pn_trend,
-                    pn_trend_enabled,
-                    getattr(st.session_state, 'pn_file_name', "pn_data.json"),
-                    getattr(st.session_state, 'pn_aircraft_model', {})
-                )
-                st.success(f"Tendances appliquées à {len(selected_pns)} PN(s) !")
-                st.rerun()
+                if SessionManager.publish(
+                    pn_trend=pn_trend,
+                    pn_trend_enabled=pn_trend_enabled
+                ):
+                    st.success(f"Tendances appliquées à {len(selected_pns)} PN(s) !")
+                    st.rerun()
 
     # Bouton de reset global avec confirmation (placé juste après le tableau)
     with st.expander("⚠️ Réinitialiser toutes les trends personnalisées"):
@@ -263,17 +244,13 @@ def render_trends():
                             year_str = str(year)
                             pn_trend_reset[pn][year_str] = {"type": "linéaire", "values": {year_str: 0.0}}
                         pn_trend_enabled_reset[pn] = False
-                    save_json_data(
-                        getattr(st.session_state, 'pn_data', {}),
-                        getattr(st.session_state, 'pn_last_updated', {}),
-                        pn_trend_reset,
-                        pn_trend_enabled_reset,
-                        getattr(st.session_state, 'pn_file_name', "pn_data.json"),
-                        getattr(st.session_state, 'pn_aircraft_model', {})
-                    )
-                    st.success("Toutes les trends personnalisées ont été réinitialisées et désactivées.")
-                    st.session_state['reset_trends_confirm'] = False
-                    st.rerun()
+                    if SessionManager.publish(
+                        pn_trend=pn_trend_reset,
+                        pn_trend_enabled=pn_trend_enabled_reset
+                    ):
+                        st.success("Toutes les trends personnalisées ont été réinitialisées et désactivées.")
+                        st.session_state['reset_trends_confirm'] = False
+                        st.rerun()
             with col2:
                 if st.button("Annuler", key="cancel_reset_trends"):
                     st.session_state['reset_trends_confirm'] = False
@@ -288,10 +265,15 @@ def render_trends():
         pn_data = getattr(st.session_state, 'pn_data', {})
         df = pn_data.get(selected_pn)
         
-        if df is not None and not df.empty:
+        has_data = df is not None and not df.empty
+        # Modèle Prophet ajusté en arrière-plan : lu dans le cache, jamais ajusté ici
+        model = load_pn_model(selected_pn, df, section='trends') if has_data else None
+        if has_data and model is None:
+            get_precompute_worker().enqueue([selected_pn])
+            st.caption(MESSAGES['forecast_pending'])
+        elif has_data:
             months = 24
             forecast_start_date = pd.Timestamp.now().replace(day=1)
-            model, forecast = run_prophet_forecast(df, months, forecast_start_date)
             trends = {}
             for year in all_years:
                 year_str = str(year)
@@ -302,8 +284,8 @@ def render_trends():
                     val = 0.0
                 trends[year_str] = {"type": "linéaire", "values": {year_str: val}}
             enable_trend = pn_trend_enabled.get(selected_pn, False)
-            all_dates = pd.date_range(start=df['ds'].min(), end=forecast['ds'].max(), freq='MS').to_frame(index=False, name='ds')
-            trend_forecast = model.predict(all_dates)
+            forecast_end = forecast_date_range(forecast_start_date, months)[-1]
+            trend_forecast = predict_range(model, df['ds'].min(), forecast_end)
             # Appliquer la trend personnalisée uniquement si activée et non vide
             if enable_trend and any(float(trends[y]['values'][y]) != 0.0 for y in trends):
                 trend_forecast_adjusted = adjust_forecast(trend_forecast, df, trends, apply_all_trends=True)
@@ -13,19 +13,82 @@ APP_DEPARTMENT = "Air France industries - Atelier Roues et Pneus - MSEO"
 DATA_FILE = "pn_data.json"
 LOGO_PATH = "assets/airfrance-logo.png"
 BACKUP_DIR = "backups"
+CACHE_DIR = "cache"
+
+# Stockage des données PN : "npz" (un fichier colonnaire par PN dans DATA_DIR) ou "json" (format historique, lu pour la migration)
+STORAGE_BACKEND = "npz"
+DATA_DIR = "data"
+# Fichiers du stockage .npz unique de la version précédente, lus seulement pour la migration vers DATA_DIR
+LEGACY_SERIES_FILE = "pn_series.npz"
+LEGACY_METADATA_FILE = "pn_metadata.json"
+# Sauvegardes : séries dédupliquées par contenu dans BACKUP_DIR/objects, un manifeste par sauvegarde.
+# La compression (npz compressé, manifeste gzip) divise la taille sur disque pour un coût d'écriture faible.
+BACKUP_COMPRESSION = True
+# Sauvegardes automatiques (planificateur en arrière-plan) : intervalle en jours entre deux sauvegardes
+# et délai en secondes entre deux vérifications
+BACKUP_INTERVAL_DAYS = 7
+BACKUP_CHECK_SECONDS = 600
+# Nombre de sauvegardes conservées par type (None : toutes) ; les plus anciennes sont supprimées
+BACKUP_RETENTION = {"auto": 52, "manual": None}
+# Nombre de sauvegardes affichées par page
+BACKUP_PAGE_SIZE = 10
 
 # Configuration par défaut
 DEFAULT_TREND_YEAR = 2025
 DEFAULT_TREND_PERCENTAGE = 0.0
 DEFAULT_DATA_LINK = "https://example.com"
 
+# Configuration des modèles de prévision
+# Moteurs disponibles : Prophet, ou moteur classique NumPy (quelques millisecondes par PN)
+FORECAST_ENGINES = {
+    "prophet": "Prophet",
+    "indices_saisonniers": "Tendance linéaire et indices saisonniers",
+    "holt_winters": "Holt-Winters"
+}
+FORECAST_ENGINE = "prophet"
+# Moteur utilisé si Prophet n'est pas installé
+FALLBACK_FORECAST_ENGINE = "indices_saisonniers"
+# Moteur par section de l'application, prioritaire sur FORECAST_ENGINE (ex : {"dashboard": "indices_saisonniers"})
+SECTION_FORECAST_ENGINES = {}
+# Paramètres passés au constructeur Prophet (inclus dans la clé du cache des modèles)
+PROPHET_PARAMS = {}
+# Réajustement Prophet initialisé avec les paramètres du dernier modèle du PN (mise à jour mensuelle)
+PROPHET_WARM_START = True
+# Bornes de la grille mensuelle prédite une fois par modèle, puis découpée selon l'horizon demandé
+PREDICTION_GRID_START = "2020-01-01"
+PREDICTION_GRID_END = "2033-12-01"
+# Paramètres de la validation croisée (inclus dans la clé du cache des backtests)
+CV_PARAMS = {'horizon': '365 days', 'initial': '730 days', 'period': '180 days'}
+# Exécution des dates de coupure de la validation croisée : None (séquentiel), "threads" ou "processes".
+# Les ajustements Stan tournent dans un sous-processus cmdstan : les threads suffisent à les paralléliser
+# sans le coût de démarrage des processus "spawn" utilisés par Prophet.
+CV_PARALLEL = "threads"
+# Année de référence pour le profil de saisonnalité mensuel
+SEASONALITY_REFERENCE_YEAR = 2025
+# Nombre de processus du moteur de prévision multi-PN (None : un par cœur)
+FORECAST_MAX_WORKERS = None
+# Sections dont les modèles, validations croisées et saisonnalités sont précalculés en arrière-plan
+PRECOMPUTE_SECTIONS = ('dashboard', 'analysis', 'comparison', 'performance', 'trends')
+# Intervalle (secondes) de vérification des écritures d'un autre processus par le précalcul
+PRECOMPUTE_CHECK_SECONDS = 60
+# Nombre de processus de l'import de fichiers par lot (None : un par cœur)
+IMPORT_MAX_WORKERS = None
+
+# Politiques de fusion des mois ajoutés à un historique existant
+MERGE_POLICIES = {
+    "reject": "Refuser l'ajout si un mois existe déjà avec une autre quantité",
+    "overwrite": "Remplacer les mois existants",
+    "keep": "Conserver les mois existants"
+}
+DEFAULT_MERGE_POLICY = "reject"
+
 # Messages utilisateur
 MESSAGES = {
     'no_pn_available': "Aucun PN disponible. Ajoutez un PN pour commencer.",
-    'file_loading': "Chargement du fichier Excel...",
+    'file_loading': "Chargement du fichier...",
     'trend_info': "Les tendances personnalisées sont désormais gérées dans l'onglet dédié 'Trend perso'.",
     'format_info': (
-        "Le fichier Excel doit contenir les colonnes suivantes :\n"
+        "Le fichier Excel ou CSV (sans ligne d'en-tête) doit contenir les colonnes suivantes :\n"
         "- **Année** : L'année des données (ex : 2025).\n"
         "- **Mois** : Le mois des données (ex : Janvier ou janvier).\n"
         "- **Quantité** : La quantité associée au PN pour ce mois.\n"
@@ -33,15 +96,32 @@ MESSAGES = {
         "Note : Les mois peuvent être écrits avec ou sans majuscule initiale.\n"
         "Assurez-vous que les colonnes soient correctement nommées et que les données soient complètes."
     ),
+    'data_conflict': (
+        "Les données ont été modifiées par un autre utilisateur pendant votre saisie : "
+        "vos changements n'ont pas été enregistrés. La dernière version sera affichée à la prochaine action, "
+        "veuillez refaire votre modification."
+    ),
+    'forecast_pending': "Prévision en cours de calcul pour ce PN : actualisez la page dans quelques instants.",
+    'data_load_error': (
+        "Erreur lors du chargement des données : {error}. Aucune modification ne peut être enregistrée "
+        "tant que les données ne sont pas lisibles ; actualisez la page après correction."
+    ),
     'batch_import_info': (
-        "Sélectionnez plusieurs fichiers Excel. Le nom de chaque fichier sera analysé pour extraire "
-        "le PN et le modèle d'avion selon le format : Export_PN-modèle.xlsx"
+        "Sélectionnez plusieurs fichiers Excel ou CSV. Le nom de chaque fichier sera analysé pour extraire "
+        "le PN et le modèle d'avion selon le format : Export_PN-modèle.xlsx. Les fichiers de PN existants "
+        "mettent à jour leur historique ; un fichier déjà importé à l'identique est ignoré."
     )
 }
 
 # Formats de fichier
 EXCEL_EXTENSIONS = ["xlsx", "xls"]
+# Formats acceptés à l'import d'historique (les exports CSV sont plus rapides à lire)
+IMPORT_EXTENSIONS = EXCEL_EXTENSIONS + ["csv"]
 REQUIRED_COLUMNS = ["Année", "Mois", "Quantité"]
+# Années acceptées dans les fichiers d'historique importés
+HISTORY_YEAR_RANGE = (2000, 2100)
+# Nombre maximal de lignes citées par anomalie dans les rapports de validation
+VALIDATION_MAX_REPORTED_ROWS = 5
 
 # Formats de date
 DATE_FORMAT = "%Y-%m-%d %H:%M"
@@ -28,4 +28,9 @@ MONTH_MAP = {
     # Mois sans majuscule (format alternatif)
     'janvier': 1, 'février': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6,
     'juillet': 7, 'août': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12
-}
\ No newline at end of file
+}
+# Noms des mois dans l'ordre (saisie des mois dans l'interface)
+MONTH_NAMES = [
+    'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
+    'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'
+]
@@ -0,0 +1,136 @@
+"""
+Planificateur des sauvegardes automatiques
+Crée les sauvegardes périodiques et applique la rétention dans un thread d'arrière-plan, hors des pages
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from config.constants import BACKUP_INTERVAL_DAYS, BACKUP_CHECK_SECONDS, BACKUP_RETENTION
+from utils.data_store import get_data_store
+from utils.snapshot_store import get_snapshot_store, snapshot_time, snapshot_kind
+
+
+class BackupScheduler:
+    """
+    Sauvegardes automatiques à intervalle régulier.
+
+    Un thread démon vérifie toutes les check_seconds secondes si la dernière sauvegarde automatique date
+    de plus de interval_days jours ; si oui, il sauvegarde les données du stock partagé puis supprime
+    les sauvegardes au-delà de la rétention. Aucune page n'attend ni ne déclenche ce travail.
+    """
+
+    def __init__(self, snapshot_store, data_store, interval_days=BACKUP_INTERVAL_DAYS,
+                 check_seconds=BACKUP_CHECK_SECONDS, retention=None):
+        self._snapshot_store = snapshot_store
+        self._data_store = data_store
+        self.interval = timedelta(days=interval_days)
+        self.check_seconds = check_seconds
+        self.retention = BACKUP_RETENTION if retention is None else retention
+        self._stop = threading.Event()
+        self._thread = None
+        # État consulté par la page des sauvegardes
+        self.last_check = None
+        self.last_snapshot = None
+        self.last_error = None
+
+    def last_auto_time(self):
+        """
+        Date de la dernière sauvegarde automatique.
+
+        Returns:
+            datetime: Date de la sauvegarde, ou None s'il n'y en a aucune.
+        """
+        times = [
+            snapshot_time(snapshot_id) for snapshot_id in self._snapshot_store.snapshot_ids()
+            if snapshot_kind(snapshot_id) == 'auto'
+        ]
+        times = [time for time in times if time is not None]
+        return max(times) if times else None
+
+    def next_due(self):
+        """
+        Date à partir de laquelle la prochaine sauvegarde automatique sera créée.
+
+        Returns:
+            datetime: Date d'échéance (maintenant si aucune sauvegarde automatique n'existe).
+        """
+        last = self.last_auto_time()
+        return last + self.interval if last else datetime.now()
+
+    def run_once(self, now=None):
+        """
+        Crée la sauvegarde automatique si elle est due, puis applique la rétention.
+
+        Args:
+            now (datetime, optional): Date de référence.
+
+        Returns:
+            str: Identifiant de la sauvegarde créée, ou None si aucune n'était due.
+        """
+        now = now or datetime.now()
+        self.last_check = now
+        # Vérification et création sous le verrou des sauvegardes : deux processus serveur
+        # ne créent jamais chacun la sauvegarde du jour
+        with self._snapshot_store.lock():
+            last = self.last_auto_time()
+            # Comparaison au jour près : les identifiants automatiques sont datés du jour
+            if last is not None and (now.date() - last.date()).days < self.interval.days:
+                return None
+            # Écritures d'un autre processus serveur ou de la ligne de commande prises en compte avant la copie
+            self._data_store.refresh()
+            _, data = self._data_store.snapshot()
+            snapshot_id = self._snapshot_store.create({**data, 'data_link': self._data_store.data_link}, kind='auto', now=now)
+            self._snapshot_store.prune(self.retention)
+        self.last_snapshot = snapshot_id
+        return snapshot_id
+
+    def _run(self):
+        """Boucle du thread : une vérification immédiate, puis toutes les check_seconds secondes"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                # Le thread doit survivre à une erreur ponctuelle (disque plein, fichier verrouillé...)
+                self.last_error = str(e)
+            self._stop.wait(self.check_seconds)
+
+    def start(self):
+        """Démarre le thread démon (sans effet s'il tourne déjà)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Arrête le thread après la vérification en cours"""
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+@st.cache_resource
+def get_backup_scheduler():
+    """
+    Retourne le planificateur unique du processus serveur, démarré au premier appel.
+
+    Returns:
+        BackupScheduler: Planificateur partagé par toutes les sessions.
+    """
+    scheduler = BackupScheduler(get_snapshot_store(), get_data_store())
+    scheduler.start()
+    return scheduler
+
+
+if __name__ == "__main__":
+    # Exécution ponctuelle hors du serveur (tâche planifiée du système) : python -m utils.backup_scheduler
+    from utils.data_store import DataStore
+    from utils.snapshot_store import SnapshotStore
+
+    created = BackupScheduler(SnapshotStore(), DataStore()).run_once()
+    print(f"Sauvegarde créée : {created}" if created else "Aucune sauvegarde due.")
@@ -0,0 +1,153 @@
+"""
+Moteur de prévision multi-PN
+Répartit l'ajustement, la prédiction et la validation croisée de plusieurs PN sur un pool de processus
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config.constants import FORECAST_MAX_WORKERS, CV_PARALLEL
+from utils.forecast_utils import (
+    get_fitted_model, load_fitted_model, predict_range, get_backtest_mae, load_backtest, get_pn_seasonality,
+    load_pn_seasonality, resolve_engine
+)
+
+
+def _forecast_single_pn(pn, df, engine, start_date, periods, with_cv, with_seasonality, cv_parallel=CV_PARALLEL):
+    """
+    Calcule les résultats demandés pour un PN (exécuté dans un processus du pool).
+    Les dates de coupure ne sont parallélisées que si le PN n'est pas déjà traité dans le pool.
+
+    Returns:
+        dict: Résultats du PN ('forecast', 'mae', 'seasonality', 'error').
+    """
+    result = {'pn': pn, 'forecast': None, 'mae': None, 'seasonality': None, 'error': None}
+    try:
+        model = get_fitted_model(df, engine, pn)
+        if periods:
+            result['forecast'] = predict_range(model, start_date, periods=periods)
+        if with_seasonality:
+            result['seasonality'] = get_pn_seasonality(df, model)
+        if with_cv:
+            result['mae'] = get_backtest_mae(df, model, parallel=cv_parallel)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def get_worker_count(task_count, max_workers=None):
+    """
+    Détermine le nombre de processus à utiliser pour un lot.
+
+    Args:
+        task_count (int): Nombre de PN à traiter.
+        max_workers (int, optional): Limite explicite, sinon FORECAST_MAX_WORKERS.
+
+    Returns:
+        int: Nombre de processus (au moins 1).
+    """
+    limit = max_workers or FORECAST_MAX_WORKERS or os.cpu_count() or 1
+    return max(1, min(limit, task_count))
+
+
+def run_batch_forecast(pns, pn_data, start_date=None, periods=None, with_cv=False,
+                       with_seasonality=False, max_workers=None, section=None):
+    """
+    Exécute en parallèle les prévisions de plusieurs PN.
+
+    Les PN dont le modèle (et, si demandés, la validation croisée et la saisonnalité) sont déjà en cache
+    sont traités dans le processus appelant, qui garde ses modèles en mémoire et ses grilles de prédiction ;
+    seuls les ajustements Prophet réellement nécessaires sont envoyés au pool.
+
+    Args:
+        pns (list): PN à traiter.
+        pn_data (dict): Données des PN.
+        start_date (datetime, optional): Date de début des prévisions.
+        periods (int, optional): Nombre de mois à prévoir (aucune prévision si absent).
+        with_cv (bool): Calcule la MAE par validation croisée.
+        with_seasonality (bool): Calcule le profil de saisonnalité annuel.
+        max_workers (int, optional): Nombre maximal de processus.
+        section (str, optional): Section appelante, pour le choix du moteur de prévision.
+
+    Returns:
+        dict: Résultats par PN, dans l'ordre de la liste fournie.
+    """
+    # Le moteur est résolu ici : les processus du pool n'ont pas accès à la session
+    tasks = [(pn, pn_data[pn], resolve_engine(section, pn)) for pn in pns if pn in pn_data and not pn_data[pn].empty]
+    if not tasks:
+        return {}
+
+    def _is_cached(df, engine):
+        if engine != 'prophet':
+            # Moteurs classiques : ajustés en quelques millisecondes, jamais envoyés au pool
+            return True
+        return load_fitted_model(df, engine) is not None \
+            and (not with_cv or load_backtest(df, engine) is not None) \
+            and (not with_seasonality or load_pn_seasonality(df, engine) is not None)
+
+    misses = [task for task in tasks if not _is_cached(task[1], task[2])]
+    missed = {pn for pn, _, _ in misses}
+    results = {
+        pn: _forecast_single_pn(pn, df, engine, start_date, periods, with_cv, with_seasonality)
+        for pn, df, engine in tasks if pn not in missed
+    }
+    workers = get_worker_count(len(misses), max_workers)
+    if workers == 1:
+        # Un seul ajustement Prophet (ou aucun) : le démarrage du pool coûterait plus que le calcul
+        results.update({pn: _forecast_single_pn(pn, df, engine, start_date, periods, with_cv, with_seasonality) for pn, df, engine in misses})
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_forecast_single_pn, pn, df[['ds', 'y']], engine, start_date, periods, with_cv, with_seasonality, None)
+                for pn, df, engine in misses
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['pn']] = result
+
+    return {pn: results[pn] for pn, _, _ in tasks}
+
+
+def get_seasonality_matrix(pns, pn_data, max_workers=None, section=None, on_missing=None):
+    """
+    Construit la matrice des profils de saisonnalité (12 mois × N PN).
+
+    Les profils déjà calculés pour la version courante des données sont lus depuis le cache ;
+    seuls les PN manquants sont ajustés, en parallèle, sauf si on_missing est fourni.
+
+    Args:
+        pns (list): PN à inclure.
+        pn_data (dict): Données des PN.
+        max_workers (int, optional): Nombre maximal de processus.
+        section (str, optional): Section appelante, pour le choix du moteur de prévision.
+        on_missing (callable, optional): Reçoit la liste des PN sans profil en cache, qui sont alors
+            omis au lieu d'être calculés (ex : PrecomputeWorker.enqueue).
+
+    Returns:
+        tuple: (liste des PN retenus, numpy.ndarray de forme (12, N)).
+    """
+    profiles = {}
+    missing = []
+    for pn in pns:
+        df = pn_data.get(pn)
+        if df is None or df.empty:
+            continue
+        profile = load_pn_seasonality(df, resolve_engine(section, pn))
+        if profile is None:
+            missing.append(pn)
+        else:
+            profiles[pn] = profile
+
+    if missing and on_missing is not None:
+        on_missing(missing)
+    elif missing:
+        for pn, result in run_batch_forecast(missing, pn_data, with_seasonality=True, max_workers=max_workers, section=section).items():
+            if result['seasonality'] is not None:
+                profiles[pn] = result['seasonality']
+
+    kept = [pn for pn in pns if pn in profiles]
+    if not kept:
+        return [], np.empty((12, 0))
+    return kept, np.column_stack([profiles[pn] for pn in kept])
@@ -0,0 +1,225 @@
+"""
+Moteur de prévision classique en NumPy
+Alternative légère à Prophet : tendance linéaire et indices saisonniers, ou lissage de Holt-Winters
+"""
+
+import numpy as np
+import pandas as pd
+
+# Version des calculs du moteur classique, incluse dans les clés de cache (à incrémenter si un calcul change)
+CLASSICAL_VERSION = 2
+
+# Quantile de la loi normale pour un intervalle à 80 % (largeur par défaut de Prophet)
+_INTERVAL_Z = 1.2816
+
+
+def _month_index(dates):
+    """Convertit des dates en index mensuel absolu (année * 12 + mois - 1)"""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    return (dates.year * 12 + dates.month - 1).to_numpy(dtype=np.int64)
+
+
+def _first_complete_window(values, length):
+    """
+    Début de la première fenêtre de mois consécutifs sans valeur manquante.
+
+    Args:
+        values (numpy.ndarray): Série mensuelle contiguë (NaN pour les mois absents).
+        length (int): Nombre de mois consécutifs requis.
+
+    Returns:
+        int: Indice du premier mois de la fenêtre, ou None si aucune fenêtre complète n'existe.
+    """
+    if len(values) < length:
+        return None
+    observed = (~np.isnan(values)).astype(np.int64)
+    counts = np.convolve(observed, np.ones(length, dtype=np.int64), mode='valid')
+    starts = np.flatnonzero(counts == length)
+    return int(starts[0]) if starts.size else None
+
+
+class ClassicalModel:
+    """
+    Modèle de prévision mensuel en NumPy, compatible avec l'interface fit/predict de Prophet.
+
+    Méthodes disponibles :
+    - "indices_saisonniers" : tendance linéaire (moindres carrés) et indices saisonniers additifs
+    - "holt_winters" : lissage exponentiel triple additif (niveau, pente, saison), initialisé sur les
+      24 premiers mois consécutifs observés ; sans deux années consécutives complètes, l'historique
+      est trop court pour initialiser la saison et les indices saisonniers sont utilisés
+    """
+
+    def __init__(self, method="indices_saisonniers", alpha=0.3, beta=0.05, gamma=0.2):
+        self.method = method
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.history = None
+
+    def fit(self, df):
+        """
+        Ajuste le modèle sur une série mensuelle.
+
+        Args:
+            df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+
+        Returns:
+            ClassicalModel: Le modèle ajusté.
+        """
+        self.history = df[['ds', 'y']].sort_values('ds').reset_index(drop=True)
+        months = _month_index(self.history['ds'])
+        values = pd.to_numeric(self.history['y'], errors='coerce').to_numpy(dtype=np.float64)
+
+        # Série contiguë : les mois absents deviennent des valeurs manquantes
+        self._start = int(months.min())
+        self._y = np.full(int(months.max()) - self._start + 1, np.nan)
+        self._y[months - self._start] = values
+
+        start = _first_complete_window(self._y, 24) if self.method == "holt_winters" else None
+        if start is not None:
+            self._fit_holt_winters(start)
+        else:
+            self._fit_seasonal_indices()
+        return self
+
+    def _fit_seasonal_indices(self):
+        """Tendance linéaire et moyenne des écarts à la tendance par mois calendaire"""
+        t = np.arange(len(self._y))
+        observed = ~np.isnan(self._y)
+        if observed.sum() >= 2:
+            self._slope, self._intercept = np.polyfit(t[observed], self._y[observed], 1)
+        else:
+            self._slope, self._intercept = 0.0, float(np.nanmean(self._y))
+
+        residuals = self._y - (self._intercept + self._slope * t)
+        calendar = (self._start + t) % 12
+        sums = np.bincount(calendar[observed], weights=residuals[observed], minlength=12)
+        counts = np.bincount(calendar[observed], minlength=12)
+        season = np.divide(sums, counts, out=np.zeros(12), where=counts > 0)
+        self._season = season - season.mean()
+
+        fitted = self._intercept + self._slope * t + self._season[calendar]
+        self._sigma = float(np.nanstd(self._y - fitted)) if observed.any() else 0.0
+        self._level = self._intercept + self._slope * t
+        self._trend_step = np.full(len(t), self._slope)
+        self._fitted = fitted
+
+    def _fit_holt_winters(self, start=0):
+        """
+        Lissage de Holt-Winters additif avec saisons alignées sur le mois calendaire.
+
+        Args:
+            start (int): Début des 24 mois consécutifs observés servant à l'initialisation ;
+                les mois antérieurs prolongent vers le passé la tendance initiale.
+        """
+        y = self._y
+        n = len(y)
+        window = y[start:start + 24]
+        level = window[:12].mean()
+        trend = (window[12:].mean() - level) / 12
+        season = np.zeros(12)
+        first_year = (self._start + start + np.arange(12)) % 12
+        season[first_year] = window[:12] - level
+
+        levels = np.empty(n)
+        trends = np.empty(n)
+        fitted = np.empty(n)
+        # Avant la fenêtre d'initialisation : tendance initiale prolongée vers le passé
+        before = np.arange(start)
+        levels[:start] = level + (before - start) * trend
+        trends[:start] = trend
+        fitted[:start] = levels[:start] + trend + season[(self._start + before) % 12]
+        for i in range(start, n):
+            month = (self._start + i) % 12
+            fitted[i] = level + trend + season[month]
+            if np.isnan(y[i]):
+                # Mois manquant : on prolonge la prévision sans mise à jour
+                level, trend = level + trend, trend
+            else:
+                previous_level = level
+                level = self.alpha * (y[i] - season[month]) + (1 - self.alpha) * (level + trend)
+                trend = self.beta * (level - previous_level) + (1 - self.beta) * trend
+                season[month] = self.gamma * (y[i] - level) + (1 - self.gamma) * season[month]
+            levels[i] = level
+            trends[i] = trend
+
+        self._season = season
+        self._level = levels
+        self._trend_step = trends
+        self._fitted = fitted
+        self._sigma = float(np.nanstd(y - fitted))
+
+    def predict(self, future):
+        """
+        Calcule les prévisions pour des dates mensuelles.
+
+        Args:
+            future (pandas.DataFrame): Colonne 'ds' des dates à prévoir.
+
+        Returns:
+            pandas.DataFrame: Colonnes 'ds', 'trend', 'yhat_lower', 'yhat_upper', 'yearly', 'yhat'.
+        """
+        ds = pd.to_datetime(future['ds']).reset_index(drop=True)
+        offsets = _month_index(ds) - self._start
+        last = len(self._y) - 1
+        calendar = (self._start + offsets) % 12
+
+        # Avant l'historique : prolongement de la première tendance ; après : de la dernière
+        clipped = np.clip(offsets, 0, last)
+        steps = offsets - clipped
+        trend = self._level[clipped] + steps * self._trend_step[clipped]
+        seasonal = self._season[calendar]
+        yhat = np.where(steps == 0, self._fitted[clipped], trend + seasonal)
+
+        horizon = np.maximum(offsets - last, 1)
+        width = _INTERVAL_Z * self._sigma * np.sqrt(1 + (horizon - 1) * self.alpha ** 2)
+
+        return pd.DataFrame({
+            'ds': ds,
+            'trend': trend,
+            'yhat_lower': yhat - width,
+            'yhat_upper': yhat + width,
+            'yearly': seasonal,
+            'yhat': yhat,
+        })
+
+
+def classical_cross_validation(df, method, horizon, initial, period):
+    """
+    Validation croisée à origine glissante pour le moteur classique, au format de Prophet.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        method (str): Méthode du modèle classique.
+        horizon (str): Horizon de prévision (ex : '365 days').
+        initial (str): Historique minimal avant la première coupure.
+        period (str): Écart entre deux coupures.
+
+    Returns:
+        pandas.DataFrame: Colonnes 'ds', 'yhat', 'yhat_lower', 'yhat_upper', 'y', 'cutoff'.
+
+    Raises:
+        ValueError: Si l'historique est trop court pour les fenêtres demandées.
+    """
+    history = df[['ds', 'y']].sort_values('ds').reset_index(drop=True)
+    horizon, initial, period = pd.Timedelta(horizon), pd.Timedelta(initial), pd.Timedelta(period)
+
+    cutoffs = []
+    cutoff = history['ds'].max() - horizon
+    while cutoff >= history['ds'].min() + initial:
+        cutoffs.append(cutoff)
+        cutoff -= period
+    if not cutoffs:
+        raise ValueError("Less data than horizon after initial window. Make horizon or initial shorter.")
+
+    frames = []
+    for cutoff in reversed(cutoffs):
+        train = history[history['ds'] <= cutoff]
+        test = history[(history['ds'] > cutoff) & (history['ds'] <= cutoff + horizon)]
+        if test.empty:
+            continue
+        forecast = ClassicalModel(method).fit(train).predict(test[['ds']])
+        forecast['y'] = test['y'].to_numpy()
+        forecast['cutoff'] = cutoff
+        frames.append(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'y', 'cutoff']])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,243 @@
+"""
+Stock de données partagé entre les sessions
+Charge une seule fois par processus serveur les données des PN et diffuse chaque écriture à toutes les sessions
+"""
+
+import copy
+import threading
+import streamlit as st
+from config.constants import DEFAULT_DATA_LINK
+from utils.storage import get_storage, JsonStorage, LegacyNpzStorage, DataConflictError
+from utils.pn_collection import as_pn_collection
+
+# Sections de données partagées (mêmes clés que dans st.session_state)
+DATA_SECTIONS = (
+    'pn_data', 'pn_last_updated', 'pn_trend', 'pn_trend_enabled',
+    'pn_file_name', 'pn_aircraft_model', 'pn_forecast_engine', 'pn_file_hash'
+)
+
+
+def _copy_section(section, values):
+    """
+    Copie d'une section : les historiques des PN restent partagés et paresseux (jamais modifiés en place),
+    les métadonnées sont copiées en profondeur (une tendance modifiée en place dans une session
+    ne doit ni toucher le stock ni échapper à la comparaison de _publish).
+    """
+    if section == 'pn_data':
+        return as_pn_collection(values)
+    return copy.deepcopy(dict(values))
+
+
+class DataStore:
+    """
+    Stock de données en lecture majoritaire, partagé par toutes les sessions du serveur.
+
+    Les sessions conservent des copies des sections (les historiques des PN sont partagés,
+    et chargés depuis le disque seulement au premier accès)
+    et comparent leur version à celle du stock pour se resynchroniser après une écriture.
+
+    Entre processus serveur, chaque écriture se fait sous verrou de fichier et compare la version
+    enregistrée sur le disque à celle lue au chargement : une écriture concurrente est détectée
+    (DataConflictError) au lieu d'être écrasée.
+    """
+
+    def __init__(self, storage=None):
+        self._lock = threading.RLock()
+        self._storage = storage
+        self._data = None
+        self.data_link = DEFAULT_DATA_LINK
+        self.version = 0
+        # Version des données sur le disque au dernier chargement ou à la dernière écriture
+        self._disk_version = None
+
+    def _ensure_loaded(self):
+        """Charge les données depuis le disque au premier accès"""
+        if self._data is None:
+            if self._storage is None:
+                self._storage = get_storage()
+            with self._storage.lock():
+                # Version vue par une lecture partielle (read_sections) avant ce chargement complet
+                partial_version = self._disk_version
+                self._load()
+                if partial_version is not None and partial_version != self._disk_version:
+                    self.version += 1
+
+    def _load(self):
+        """
+        Lit toutes les données depuis le disque (verrou de fichier déjà pris).
+        En cas d'erreur de lecture, l'exception est propagée et le stock reste inchangé
+        (non chargé au premier accès) : de nouvelles données ne sont jamais publiées sur un état vide.
+        """
+        disk_version = self._storage.read_version()
+        stored = self._storage.load() if self._storage.exists() else {}
+        self._data = {section: _copy_section(section, stored.get(section, {})) for section in DATA_SECTIONS}
+        self.data_link = stored.get('data_link', DEFAULT_DATA_LINK)
+        self._disk_version = disk_version
+
+    def _check_disk_version(self):
+        """
+        Recharge les données si un autre processus les a modifiées (verrou de fichier déjà pris).
+
+        Returns:
+            bool: True si les données ont été rechargées.
+        """
+        if self._storage.read_version() == self._disk_version:
+            return False
+        self._load()
+        self.version += 1
+        return True
+
+    def _write(self, data, data_link, series=None, removed=(), sections=None):
+        """
+        Enregistre les PN et sections indiqués (tous par défaut) via le backend de stockage.
+        Une erreur d'écriture est propagée : l'appelant ne modifie pas les données en mémoire.
+        """
+        self._disk_version = self._storage.write({**data, 'data_link': data_link}, series, removed, sections)
+
+    def refresh(self):
+        """
+        Prend en compte les écritures d'un autre processus serveur depuis le dernier chargement.
+
+        Returns:
+            int: Version courante des données.
+        """
+        with self._lock:
+            if self._storage is None:
+                self._storage = get_storage()
+            if self._storage.read_version() != self._disk_version:
+                with self._storage.lock():
+                    if self._data is None:
+                        # Rien n'est encore en mémoire : seule la version change
+                        self._disk_version = self._storage.read_version()
+                        self.version += 1
+                    else:
+                        self._check_disk_version()
+            return self.version
+
+    def read_sections(self, *names):
+        """
+        Retourne quelques sections de métadonnées, sans charger l'historique des PN
+        si les données ne sont pas encore en mémoire.
+
+        Args:
+            *names: Sections à lire (ex : 'pn_trend', 'pn_trend_enabled').
+
+        Returns:
+            tuple: (version, dict des sections demandées, en copies indépendantes du stock).
+        """
+        with self._lock:
+            if self._data is not None:
+                return self.version, {name: _copy_section(name, self._data[name]) for name in names}
+            if self._storage is None:
+                self._storage = get_storage()
+            with self._storage.lock():
+                self._disk_version = self._storage.read_version()
+                return self.version, {name: dict(self._storage.load_section(name) or {}) for name in names}
+
+    def snapshot(self):
+        """
+        Retourne la version courante des données.
+
+        Returns:
+            tuple: (version, dict des sections). Les métadonnées sont copiées en profondeur : les modifier,
+                   même en place (ex : pn_trend[pn]), n'affecte ni le stock ni les autres sessions.
+                   Les historiques des PN sont partagés et ne doivent pas être modifiés en place.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self.version, {section: _copy_section(section, values) for section, values in self._data.items()}
+
+    def publish(self, expected_version=None, **sections):
+        """
+        Enregistre de nouvelles valeurs pour une ou plusieurs sections et les diffuse à toutes les sessions.
+
+        Args:
+            expected_version (int, optional): Version sur laquelle la session a basé ses modifications.
+            **sections: Sections à remplacer (ex : pn_trend=..., pn_trend_enabled=...).
+                        Les sections non fournies sont conservées.
+
+        Returns:
+            int: Nouvelle version des données.
+
+        Raises:
+            DataConflictError: Si les données ont changé depuis expected_version (autre session)
+                               ou depuis leur chargement (autre processus).
+            OSError: Si l'écriture sur le disque échoue (les données en mémoire restent inchangées).
+        """
+        unknown = set(sections) - set(DATA_SECTIONS)
+        if unknown:
+            raise ValueError(f"Sections de données inconnues : {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            self._ensure_loaded()
+            with self._storage.lock():
+                if self._check_disk_version() or (expected_version is not None and expected_version != self.version):
+                    raise DataConflictError("Les données ont été modifiées depuis leur lecture")
+                return self._publish(sections)
+
+    def _publish(self, sections):
+        """Applique et enregistre les sections (verrous déjà pris)"""
+        data = dict(self._data)
+        data.update({section: _copy_section(section, values) for section, values in sections.items()})
+
+        # Seuls les PN remplacés (nouvel objet DataFrame) et les sections modifiées sont réécrits ;
+        # la comparaison se fait sans charger les historiques encore sur le disque
+        old_series, new_series = self._data['pn_data'], data['pn_data']
+        changed_series = [pn for pn in new_series if pn not in old_series or new_series.peek(pn) is not old_series.peek(pn)]
+        removed_series = [pn for pn in old_series if pn not in new_series]
+        changed_sections = [
+            section for section in sections
+            if section != 'pn_data' and data[section] != self._data[section]
+        ]
+        if not (changed_series or removed_series or changed_sections):
+            # Rien n'a changé : ni écriture, ni nouvelle version (les caches restent valides)
+            return self.version
+        # Données en mémoire et version modifiées seulement après une écriture réussie
+        self._write(data, self.data_link, changed_series, removed_series, changed_sections)
+        self._data = data
+        self.version += 1
+        return self.version
+
+    def set_data_link(self, data_link):
+        """
+        Enregistre le lien du bouton 'Données'.
+
+        Args:
+            data_link (str): Nouveau lien.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            with self._storage.lock():
+                self._check_disk_version()
+                self._write(self._data, data_link, series=(), sections=('data_link',))
+                self.data_link = data_link
+
+    def clear(self):
+        """
+        Supprime toutes les données (fichiers compris) pour toutes les sessions.
+
+        Returns:
+            int: Nouvelle version des données.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            with self._storage.lock():
+                self._storage.clear()
+                # Les anciens formats sont aussi supprimés pour qu'ils ne soient pas migrés à nouveau
+                JsonStorage().clear()
+                LegacyNpzStorage().clear()
+                self._disk_version = self._storage.read_version()
+            self._data = {section: _copy_section(section, {}) for section in DATA_SECTIONS}
+            self.version += 1
+            return self.version
+
+
+@st.cache_resource
+def get_data_store():
+    """
+    Retourne le stock de données unique du processus serveur.
+
+    Returns:
+        DataStore: Stock partagé par toutes les sessions.
+    """
+    return DataStore()
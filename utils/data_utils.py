@@ -5,10 +5,22 @@ Fonctions de chargement, sauvegarde et manipulation des données PN
 
 import streamlit as st
 import pandas as pd
+import csv
+import importlib.util
 import json
+import os
 from pathlib import Path
 from io import BytesIO
-from config.mappings import MONTH_MAP, PN_MODEL_MAPPING
+from config.mappings import PN_MODEL_MAPPING
+from config.constants import DATA_FILE, DEFAULT_DATA_LINK, IMPORT_EXTENSIONS
+from utils.file_utils import write_atomic
+from utils.validators import DataValidator
+
+# Moteur de lecture Excel optionnel, plus rapide qu'openpyxl
+CALAMINE_AVAILABLE = importlib.util.find_spec('python_calamine') is not None
+
+# Colonnes des fichiers d'historique, dans l'ordre (fichiers sans ligne d'en-tête)
+IMPORT_COLUMNS = ['Année', 'Mois', 'Quantité']
 
 
 def load_json_data():
@@ -16,39 +28,40 @@ def load_json_data():
     Charge les données à partir du fichier JSON.
 
     Returns:
-        dict: Données chargées, ou dictionnaire vide en cas d'erreur.
+        dict: Données chargées, ou dictionnaire vide si le fichier n'existe pas.
+
+    Raises:
+        OSError: Si le fichier ne peut pas être lu.
+        ValueError: Si le fichier est corrompu (JSON invalide ou colonnes manquantes).
     """
-    json_file = Path("pn_data.json")
+    json_file = Path(DATA_FILE)
     if not json_file.exists():
         return {}
     
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Validation et conversion des données PN
-        for pn in data.get('pn_data', {}):
-            df = pd.DataFrame(data['pn_data'][pn])
-            required_columns = ['Année', 'Mois', 'Quantité', 'ds', 'y']
-            if not all(col in df.columns for col in required_columns):
-                st.error(f"Données corrompues pour {pn} - colonnes manquantes")
-                return {}
-            
-            df['ds'] = pd.to_datetime(df['ds'])
-            data['pn_data'][pn] = df
-        
-        # Assurer la compatibilité avec les anciennes versions
-        data.setdefault('pn_aircraft_model', {})
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    # Validation et conversion des données PN
+    for pn in data.get('pn_data', {}):
+        df = pd.DataFrame(data['pn_data'][pn])
+        required_columns = ['Année', 'Mois', 'Quantité', 'ds', 'y']
+        if not all(col in df.columns for col in required_columns):
+            raise ValueError(f"Données corrompues pour {pn} - colonnes manquantes")
         
-        return data
+        df['ds'] = pd.to_datetime(df['ds'])
+        data['pn_data'][pn] = df
     
-    except Exception as e:
-        st.error(f"Erreur lors du chargement de pn_data.json : {str(e)}")
-        return {}
+    # Assurer la compatibilité avec les anciennes versions
+    data.setdefault('pn_aircraft_model', {})
+    data.setdefault('pn_forecast_engine', {})
+    data.setdefault('pn_file_hash', {})
+    
+    return data
 
 
 def save_json_data(pn_data, pn_last_updated, pn_trend, pn_trend_enabled, 
-                  pn_file_name, pn_aircraft_model=None):
+                  pn_file_name, pn_aircraft_model=None, pn_forecast_engine=None, data_link=None,
+                  pn_file_hash=None):
     """
     Sauvegarde les données dans le fichier JSON.
 
@@ -59,59 +72,169 @@ def save_json_data(pn_data, pn_last_updated, pn_trend, pn_trend_enabled,
         pn_trend_enabled (dict): Indicateur d'activation des tendances.
         pn_file_name (dict): Noms des fichiers associés aux PN.
         pn_aircraft_model (dict): Modèles d'avion personnalisés par PN.
+        pn_forecast_engine (dict): Moteur de prévision choisi par PN.
+        data_link (str): Lien du bouton 'Données'.
+        pn_file_hash (dict): Empreintes du dernier fichier importé par PN.
+
+    Raises:
+        OSError: Si le fichier ne peut pas être écrit.
     """
-    json_file = Path("pn_data.json")
+    json_file = Path(DATA_FILE)
+    data_to_save = {
+        'pn_data': {pn: df.to_dict('records') for pn, df in pn_data.items()},
+        'pn_last_updated': pn_last_updated,
+        'pn_trend': pn_trend,
+        'pn_trend_enabled': pn_trend_enabled,
+        'pn_file_name': pn_file_name,
+        'pn_aircraft_model': pn_aircraft_model or {},
+        'pn_forecast_engine': pn_forecast_engine or {},
+        'data_link': data_link or DEFAULT_DATA_LINK,
+        'pn_file_hash': pn_file_hash or {}
+    }
     
+    # Écriture atomique : une interruption ne laisse jamais de fichier tronqué
+    content = json.dumps(data_to_save, indent=4, default=str, ensure_ascii=False)
+    write_atomic(json_file, content.encode('utf-8'))
+
+
+def _file_extension(file, file_name=None):
+    """Extension (sans point, en minuscules) du fichier importé"""
+    name = getattr(file, 'name', None) or (file if isinstance(file, (str, os.PathLike)) else None) or file_name or ''
+    return Path(str(name)).suffix.lower().lstrip('.')
+
+
+def _read_xlsx_openpyxl(file):
+    """Lecture d'un xlsx sans calamine, en mode lecture seule d'openpyxl (trois premières colonnes)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
     try:
-        data_to_save = {
-            'pn_data': {pn: df.to_dict('records') for pn, df in pn_data.items()},
-            'pn_last_updated': pn_last_updated,
-            'pn_trend': pn_trend,
-            'pn_trend_enabled': pn_trend_enabled,
-            'pn_file_name': pn_file_name,
-            'pn_aircraft_model': pn_aircraft_model or {}
-        }
-        
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, indent=4, default=str, ensure_ascii=False)
-            
-    except Exception as e:
-        st.error(f"Erreur lors de la sauvegarde de pn_data.json : {str(e)}")
+        rows = [
+            tuple(row) + (None,) * (3 - len(row))
+            for row in workbook.worksheets[0].iter_rows(max_col=3, values_only=True)
+            if any(value is not None for value in row)
+        ]
+    finally:
+        workbook.close()
+    return pd.DataFrame(rows, columns=IMPORT_COLUMNS)
 
 
-def _validate_excel_data(df, file_name=None):
+def _read_csv(file):
     """
-    Valide les données d'un fichier Excel.
-    
+    Lit les trois premières colonnes d'un export CSV avec le lecteur C de pandas,
+    après détection du séparateur sur le début du fichier (exports Excel français : point-virgule).
+    """
+    if hasattr(file, 'read'):
+        head = file.read(4096)
+        file.seek(0)
+    else:
+        with open(file, 'rb') as f:
+            head = f.read(4096)
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='ignore')
+    try:
+        separator = csv.Sniffer().sniff(head, delimiters=',;\t|').delimiter
+    except csv.Error:
+        separator = ','
+
+    try:
+        return pd.read_csv(file, header=None, names=IMPORT_COLUMNS, usecols=[0, 1, 2], sep=separator)
+    except UnicodeDecodeError:
+        # Exports Windows (accents des mois en cp1252)
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        return pd.read_csv(file, header=None, names=IMPORT_COLUMNS, usecols=[0, 1, 2], sep=separator, encoding='cp1252')
+
+
+def read_history_file(file, file_name=None):
+    """
+    Lit les colonnes Année, Mois, Quantité d'un fichier d'historique (sans ligne d'en-tête).
+
+    - CSV : séparateur détecté automatiquement (virgule, point-virgule, tabulation...)
+    - xlsx : moteur calamine s'il est installé, sinon openpyxl en lecture seule
+    - autres formats Excel (xls...) : lecteur par défaut de pandas
+
     Args:
-        df (pd.DataFrame): DataFrame à valider
-        file_name (str): Nom du fichier pour les messages d'erreur
-        
+        file: Fichier (chemin, fichier chargé via st.file_uploader ou flux binaire).
+        file_name (str, optional): Nom du fichier, utilisé si le fichier n'en porte pas.
+
+    Returns:
+        pandas.DataFrame: Colonnes 'Année', 'Mois', 'Quantité' brutes.
+    """
+    extension = _file_extension(file, file_name)
+    if extension == 'csv':
+        return _read_csv(file)
+    if extension == 'xlsx':
+        if CALAMINE_AVAILABLE:
+            return pd.read_excel(file, header=None, names=IMPORT_COLUMNS, usecols=[0, 1, 2], engine='calamine')
+        return _read_xlsx_openpyxl(file)
+    return pd.read_excel(file, header=None, names=IMPORT_COLUMNS)
+
+
+def validate_history_frame(df):
+    """
+    Valide un historique brut (colonnes 'Année', 'Mois', 'Quantité') et ajoute les colonnes de date et de valeur.
+
+    Args:
+        df (pandas.DataFrame): Historique lu dans un fichier ou saisi dans l'interface.
+
+    Returns:
+        tuple: (DataFrame avec les colonnes 'Année', 'Mois', 'Quantité', 'ds', 'y', ou None si les
+               données sont invalides ; ValidationReport de la validation).
+    """
+    report = DataValidator.validate_history(df)
+    if not report.is_valid:
+        return None, report
+
+    # Création des colonnes de date et de valeur (index mensuel -> datetime64[M])
+    df = report.data
+    periods = (df['Année'].to_numpy() - 1970) * 12 + df['Mois'].to_numpy() - 1
+    df['ds'] = periods.astype('datetime64[M]').astype('datetime64[ns]')
+    df['y'] = df['Quantité']
+    return df, report
+
+
+def validate_history_file(file, file_name=None):
+    """
+    Lit et valide un fichier d'historique (Excel ou CSV), sans interaction avec l'interface.
+
+    Args:
+        file: Fichier (chemin, fichier chargé via st.file_uploader ou flux binaire).
+        file_name (str, optional): Nom du fichier pour les messages d'erreur.
+
+    Returns:
+        tuple: (DataFrame avec les colonnes 'Année', 'Mois', 'Quantité', 'ds', 'y', ou None si le
+               fichier est invalide ; ValidationReport de la validation).
+    """
+    return validate_history_frame(read_history_file(file, file_name))
+
+
+def parse_history_file(file, file_name=None):
+    """
+    Lit et valide un fichier d'historique (Excel ou CSV), sans interaction avec l'interface.
+
+    Args:
+        file: Fichier (chemin, fichier chargé via st.file_uploader ou flux binaire).
+        file_name (str, optional): Nom du fichier pour les messages d'erreur.
+
+    Returns:
+        pandas.DataFrame: DataFrame avec les colonnes 'Année', 'Mois', 'Quantité', 'ds', 'y'.
+
     Raises:
-        ValueError: Si les données ne sont pas valides
+        ValueError: Si les données ne sont pas valides (message avec les numéros de ligne).
     """
-    file_ref = file_name or 'importé'
-    
-    # Vérification des colonnes
-    if list(df.columns) != ['Année', 'Mois', 'Quantité']:
-        raise ValueError(f"Le fichier {file_ref} doit contenir exactement les colonnes : Année, Mois, Quantité")
-    
-    # Vérification des valeurs manquantes
-    if df[['Année', 'Mois', 'Quantité']].isnull().any().any():
-        raise ValueError(f"Le fichier {file_ref} contient des valeurs manquantes.")
-    
-    # Vérification des quantités
-    invalid_quantities = ~df['Quantité'].apply(lambda x: isinstance(x, (int, float)) and x >= 0)
-    if invalid_quantities.any():
-        raise ValueError(f"La colonne Quantité du fichier {file_ref} doit contenir des valeurs numériques non négatives.")
+    df, report = validate_history_file(file, file_name)
+    if df is None:
+        raise ValueError(report.summary(file_name))
+    return df
 
 
 def load_excel(file, file_name=None):
     """
-    Charge un fichier Excel et le convertit en DataFrame avec les colonnes nécessaires.
+    Charge un fichier Excel ou CSV et le convertit en DataFrame avec les colonnes nécessaires.
 
     Args:
-        file: Fichier Excel chargé via st.file_uploader.
+        file: Fichier chargé via st.file_uploader.
         file_name (str, optional): Nom du fichier pour les messages d'erreur.
 
     Returns:
@@ -119,33 +242,19 @@ def load_excel(file, file_name=None):
                          ou None en cas d'erreur.
     """
     try:
-        # Lecture du fichier Excel
-        df = pd.read_excel(file, header=None, names=['Année', 'Mois', 'Quantité'])
-        
-        # Validation des données
-        _validate_excel_data(df, file_name)
-        
-        # Conversion des mois
-        df['Mois'] = df['Mois'].map(MONTH_MAP)
-        if df['Mois'].isnull().any():
-            raise ValueError(f"Certains mois dans le fichier {file_name or 'importé'} ne sont pas valides. "
-                           "Utilisez : Janvier/janvier, Février/février, Mars/mars, etc.")
-        
-        # Filtrage des mois valides
-        df = df[df['Mois'].between(1, 12)]
-        
-        # Création des colonnes de date et de valeur
-        df['ds'] = pd.to_datetime(
-            df['Année'].astype(str) + '-' + df['Mois'].astype(str).str.zfill(2) + '-01'
-        )
-        df['y'] = df['Quantité']
-        
-        return df
-        
+        df, report = validate_history_file(file, file_name)
     except Exception as e:
         st.error(f"Erreur lors du chargement du fichier {file_name or 'importé'} : {str(e)}")
         return None
 
+    if df is None:
+        st.error(report.summary(file_name))
+        return None
+    if report.warnings:
+        st.warning(f"Fichier {file_name or 'importé'} : {report.warning_summary()}.")
+    return df
+
+
 def export_to_excel(df, file_name="export", sheet_name="Données"):
     """
     Exporte un DataFrame vers un fichier Excel.
@@ -193,7 +302,10 @@ def extract_model_from_filename(filename):
         tuple: (pn, model) ou (pn, None) si le format n'est pas respecté
     """
     # Enlever l'extension
-    base_name = filename.replace('.xlsx', '').replace('.xls', '')
+    base_name = filename
+    stem, extension = os.path.splitext(filename)
+    if extension.lower().lstrip('.') in IMPORT_EXTENSIONS:
+        base_name = stem
     
     # Vérifier le format Export_
     if not base_name.startswith('Export_'):
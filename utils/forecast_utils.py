@@ -1,12 +1,422 @@
+import weakref
+from functools import lru_cache
+import numpy as np
 import streamlit as st
 import pandas as pd
-from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
+from config.constants import (
+    PROPHET_PARAMS, PREDICTION_GRID_START, PREDICTION_GRID_END, SEASONALITY_REFERENCE_YEAR, CV_PARAMS, CV_PARALLEL,
+    FORECAST_ENGINE, FALLBACK_FORECAST_ENGINE, SECTION_FORECAST_ENGINES, PROPHET_WARM_START
+)
+from utils.model_cache import compute_data_fingerprint, build_cache_key, load_model, save_model, load_result, save_result
+from utils.classical_forecast import ClassicalModel, classical_cross_validation, CLASSICAL_VERSION
+
+try:
+    from prophet import Prophet, __version__ as PROPHET_VERSION
+    from prophet.diagnostics import cross_validation, performance_metrics
+    PROPHET_AVAILABLE = True
+except ImportError:
+    # Prophet absent : le moteur classique prend le relais
+    PROPHET_AVAILABLE = False
+    PROPHET_VERSION = None
+
+# Grilles de prédiction déjà calculées, libérées avec le modèle correspondant
+_prediction_grids = weakref.WeakKeyDictionary()
+
+
+def resolve_engine(section=None, pn=None, pn_forecast_engine=None):
+    """
+    Détermine le moteur de prévision à utiliser.
+
+    Priorité : choix enregistré pour le PN, puis moteur de la section, puis moteur par défaut.
+    Si Prophet n'est pas installé, le moteur de repli est utilisé.
+
+    Args:
+        section (str, optional): Section de l'application (ex : "dashboard", "analysis").
+        pn (str, optional): PN concerné.
+        pn_forecast_engine (dict, optional): Choix par PN, à la place de ceux de la session.
+
+    Returns:
+        str: Nom du moteur (clé de FORECAST_ENGINES).
+    """
+    engine = SECTION_FORECAST_ENGINES.get(section, FORECAST_ENGINE)
+    if pn_forecast_engine is not None:
+        engine = pn_forecast_engine.get(pn, engine)
+    else:
+        try:
+            engine = st.session_state.get('pn_forecast_engine', {}).get(pn, engine)
+        except Exception:
+            # Hors d'une session Streamlit (processus de calcul) : pas de choix par PN
+            pass
+    if engine == 'prophet' and not PROPHET_AVAILABLE:
+        engine = FALLBACK_FORECAST_ENGINE
+    return engine
+
+
+def _model_engine(model):
+    """Retourne le nom du moteur d'un modèle ajusté"""
+    return model.method if isinstance(model, ClassicalModel) else 'prophet'
+
+
+def _model_params(engine='prophet'):
+    """Paramètres identifiant un modèle ajusté dans les clés de cache"""
+    if engine != 'prophet':
+        return {'engine': engine, 'version': CLASSICAL_VERSION}
+    return {'engine': 'prophet', 'version': PROPHET_VERSION, **PROPHET_PARAMS}
+
+
+def get_fitted_model(df, engine=None, pn=None):
+    """
+    Retourne un modèle ajusté sur les données. Les modèles Prophet sont réutilisés depuis
+    le cache disque tant que la série historique et les paramètres n'ont pas changé ;
+    les modèles classiques, ajustés en quelques millisecondes, ne sont pas mis en cache.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        engine (str, optional): Moteur de prévision (par défaut : resolve_engine()).
+        pn (str, optional): PN concerné : un réajustement Prophet part alors des paramètres
+            du précédent modèle du PN (voir PROPHET_WARM_START).
+
+    Returns:
+        Prophet | ClassicalModel: Modèle ajusté.
+    """
+    engine = engine or resolve_engine()
+    if engine != 'prophet':
+        return ClassicalModel(engine).fit(df)
+
+    key = build_cache_key(compute_data_fingerprint(df), _model_params())
+    model = load_model(key)
+    if model is None:
+        warm_start = PROPHET_WARM_START and pn is not None
+        model = _fit_prophet(df, _warm_start_init(pn, df) if warm_start else None)
+        try:
+            save_model(key, model)
+            if warm_start:
+                save_result('warm_start', _warm_start_key(pn), _warm_start_record(model))
+        except OSError:
+            # Le cache est une optimisation : une erreur d'écriture ne doit pas bloquer la prévision
+            pass
+    return model
+
+
+def load_fitted_model(df, engine=None):
+    """
+    Charge depuis le cache le modèle Prophet ajusté sur ces données, sans ajustement.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        engine (str, optional): Moteur de prévision (par défaut : resolve_engine()).
+
+    Returns:
+        Prophet: Modèle en cache, ou None s'il n'a pas encore été ajusté (ou pour un moteur classique).
+    """
+    if (engine or resolve_engine()) != 'prophet':
+        return None
+    return load_model(build_cache_key(compute_data_fingerprint(df), _model_params()))
+
+
+def _fit_prophet(df, init=None):
+    """Ajuste un modèle Prophet, à partir des paramètres init s'ils sont fournis"""
+    if init is not None:
+        try:
+            return Prophet(**PROPHET_PARAMS).fit(df[['ds', 'y']], init=init)
+        except Exception:
+            # Paramètres incompatibles avec le nouvel historique : ajustement complet
+            pass
+    return Prophet(**PROPHET_PARAMS).fit(df[['ds', 'y']])
+
+
+def _warm_start_key(pn):
+    """Clé de cache des paramètres du dernier modèle Prophet d'un PN"""
+    return build_cache_key(f"warm_start|{pn}", _model_params())
+
+
+def _warm_start_record(model):
+    """Paramètres ajustés d'un modèle Prophet et échelles de l'historique correspondant"""
+    record = {name: float(np.mean(model.params[name])) for name in ('k', 'm', 'sigma_obs')}
+    record.update({name: np.mean(model.params[name], axis=0) for name in ('delta', 'beta')})
+    record.update({'start': model.start, 'y_scale': float(model.y_scale), 't_scale': model.t_scale.total_seconds()})
+    return record
+
+
+def _warm_start_init(pn, df):
+    """
+    Paramètres initiaux d'un réajustement Prophet, déduits du précédent modèle du PN.
+
+    Prophet travaille sur des valeurs normalisées (quantités divisées par leur maximum, dates ramenées
+    à [0, 1] sur la période historique) : les paramètres sont remis à l'échelle du nouvel historique,
+    ce qui place l'optimiseur près de la solution quand seuls quelques mois ont été ajoutés.
+
+    Args:
+        pn (str): PN concerné.
+        df (pandas.DataFrame): Nouvel historique avec colonnes 'ds' et 'y'.
+
+    Returns:
+        dict: Paramètres pour Prophet.fit(init=...), ou None sans modèle précédent compatible.
+    """
+    record = load_result('warm_start', _warm_start_key(pn))
+    if record is None or PROPHET_PARAMS.get('scaling', 'absmax') != 'absmax':
+        return None
+    ds = pd.to_datetime(df['ds'])
+    y_scale = float(pd.to_numeric(df['y'], errors='coerce').abs().max())
+    t_scale = (ds.max() - ds.min()).total_seconds()
+    if ds.min() != record['start'] or not y_scale or not t_scale or not record['y_scale'] or not record['t_scale']:
+        return None
+
+    value_ratio = record['y_scale'] / y_scale
+    slope_ratio = value_ratio * t_scale / record['t_scale']
+    return {
+        'k': record['k'] * slope_ratio,
+        'm': record['m'] * value_ratio,
+        'sigma_obs': record['sigma_obs'] * value_ratio,
+        'delta': record['delta'] * slope_ratio,
+        'beta': record['beta'] * value_ratio,
+    }
+
+
+def load_pn_model(pn, df=None, section=None):
+    """
+    Retourne le modèle ajusté d'un PN pour une page, sans ajustement Prophet dans la requête.
+
+    Les modèles Prophet sont ajustés par le précalcul en arrière-plan et seulement lus dans le cache ;
+    les modèles classiques, ajustés en quelques millisecondes, sont calculés directement.
+    L'horizon et la date de début des prévisions sont gérés ensuite par predict_range.
+
+    Args:
+        pn (str): PN concerné.
+        df (pandas.DataFrame, optional): Données historiques du PN. Par défaut, les données
+            de la session sont utilisées.
+        section (str, optional): Section appelante, pour le choix du moteur de prévision.
+
+    Returns:
+        Prophet | ClassicalModel: Modèle ajusté, ou None si le modèle Prophet n'est pas encore en cache
+            (l'appelant demande alors le précalcul du PN).
+    """
+    if df is None:
+        df = st.session_state.pn_data[pn]
+    engine = resolve_engine(section, pn)
+    if engine != 'prophet':
+        return get_fitted_model(df, engine)
+    return load_fitted_model(df, engine)
+
+
+def forecast_date_range(start_date, periods):
+    """
+    Retourne les dates mensuelles (début de mois) d'une période de prévision.
+
+    Args:
+        start_date (datetime): Date de début des prévisions.
+        periods (int): Nombre de mois à prévoir.
+
+    Returns:
+        pandas.DatetimeIndex: Dates de la période.
+    """
+    return pd.date_range(start=start_date, periods=periods, freq='MS')
+
+
+def _prediction_grid(model):
+    """
+    Prédit une seule fois une grille mensuelle large pour un modèle ajusté.
+    Toutes les combinaisons horizon/date de début sont ensuite servies par simple découpage.
+    """
+    grid = _prediction_grids.get(model)
+    if grid is None:
+        start = min(model.history['ds'].min(), pd.Timestamp(PREDICTION_GRID_START))
+        dates = pd.date_range(start=start, end=PREDICTION_GRID_END, freq='MS')
+        grid = model.predict(dates.to_frame(index=False, name='ds'))
+        _prediction_grids[model] = grid
+    return grid
+
+
+def predict_range(model, start, end=None, periods=None):
+    """
+    Retourne les prévisions mensuelles d'un modèle ajusté entre deux dates.
+
+    Args:
+        model (Prophet): Modèle ajusté (voir load_pn_model).
+        start (datetime): Date de début.
+        end (datetime, optional): Date de fin (incluse).
+        periods (int, optional): Nombre de mois, si la date de fin n'est pas fournie.
+
+    Returns:
+        pandas.DataFrame: Prévisions (colonnes 'ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend', ...).
+    """
+    if end is None:
+        dates = forecast_date_range(start, periods)
+    else:
+        dates = pd.date_range(start=start, end=end, freq='MS')
+    if dates.empty:
+        return model.predict(dates.to_frame(index=False, name='ds'))
+
+    grid = _prediction_grid(model)
+    if dates[0] < grid['ds'].iloc[0] or dates[-1] > grid['ds'].iloc[-1]:
+        # Période hors de la grille pré-calculée : prédiction directe
+        return model.predict(dates.to_frame(index=False, name='ds'))
+    return grid[grid['ds'].isin(dates)].reset_index(drop=True)
+
+
+def get_seasonality_profile(model):
+    """
+    Retourne l'effet saisonnier annuel d'un modèle ajusté, mois par mois.
+
+    Args:
+        model (Prophet): Modèle ajusté.
+
+    Returns:
+        pandas.DataFrame: Colonnes 'ds' (mois de l'année de référence) et 'yearly'.
+    """
+    forecast = predict_range(model, f"{SEASONALITY_REFERENCE_YEAR}-01-01", periods=12)
+    profile = forecast[['ds']].copy()
+    profile['yearly'] = forecast['yearly'] if 'yearly' in forecast.columns else 0.0
+    return profile
+
+
+def get_backtest(df, model=None, parallel=CV_PARALLEL, engine=None):
+    """
+    Retourne la validation croisée d'un PN et ses métriques, depuis le cache des backtests
+    tant que les données et les paramètres de validation n'ont pas changé.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        model (Prophet, optional): Modèle déjà ajusté sur ces données.
+        parallel (str, optional): Exécution des dates de coupure si le calcul est nécessaire
+            (None, "threads" ou "processes").
+        engine (str, optional): Moteur de prévision, déduit du modèle s'il est fourni.
+
+    Returns:
+        dict: 'df_cv' (prévisions par date de coupure) et 'metrics' (sortie de performance_metrics),
+              tous deux à None si l'historique est trop court pour la validation croisée.
+    """
+    engine = _model_engine(model) if model is not None else (engine or resolve_engine())
+    key = _backtest_key(df, engine)
+    backtest = load_result('backtests', key)
+    if backtest is not None:
+        return backtest
+
+    try:
+        if engine == 'prophet':
+            if model is None:
+                model = get_fitted_model(df, engine)
+            df_cv = cross_validation(model, parallel=parallel, **CV_PARAMS)
+        else:
+            df_cv = classical_cross_validation(df, engine, **CV_PARAMS)
+        backtest = {'df_cv': df_cv, 'metrics': _performance_metrics(df_cv) if not df_cv.empty else None}
+    except ValueError:
+        # Historique trop court pour les fenêtres demandées : résultat mis en cache lui aussi
+        backtest = {'df_cv': None, 'metrics': None}
+
+    try:
+        save_result('backtests', key, backtest)
+    except OSError:
+        pass
+    return backtest
+
+
+def get_backtest_mae(df, model=None, parallel=CV_PARALLEL, engine=None):
+    """
+    Retourne l'erreur absolue moyenne (MAE) issue de la validation croisée d'un PN.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        model (Prophet, optional): Modèle déjà ajusté sur ces données.
+        parallel (str, optional): Exécution des dates de coupure (voir get_backtest).
+        engine (str, optional): Moteur de prévision, déduit du modèle s'il est fourni.
+
+    Returns:
+        float: MAE moyenne, ou None si elle ne peut pas être calculée.
+    """
+    return backtest_mae(get_backtest(df, model, parallel, engine))
+
+
+def load_backtest(df, engine=None):
+    """
+    Charge la validation croisée d'un PN depuis le cache, sans la calculer.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        engine (str, optional): Moteur de prévision.
+
+    Returns:
+        dict: Résultat de get_backtest, ou None s'il n'a pas encore été calculé.
+    """
+    return load_result('backtests', _backtest_key(df, engine or resolve_engine()))
+
+
+def backtest_mae(backtest):
+    """
+    Erreur absolue moyenne (MAE) d'une validation croisée.
+
+    Args:
+        backtest (dict): Résultat de get_backtest ou de load_backtest.
+
+    Returns:
+        float: MAE moyenne, ou None si l'historique est trop court pour la validation croisée.
+    """
+    metrics = backtest['metrics']
+    return metrics['mae'].mean() if metrics is not None else None
+
+
+def _backtest_key(df, engine):
+    """Clé de cache de la validation croisée d'une série"""
+    return build_cache_key(compute_data_fingerprint(df), {**_model_params(engine), 'cv': CV_PARAMS})
+
+
+def load_pn_seasonality(df, engine=None):
+    """
+    Charge le profil de saisonnalité d'un PN depuis le cache, sans ajuster de modèle.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        engine (str, optional): Moteur de prévision.
+
+    Returns:
+        numpy.ndarray: Effet saisonnier des 12 mois, ou None s'il n'a pas encore été calculé.
+    """
+    return load_result('seasonality', _seasonality_key(df, engine or resolve_engine()))
+
+
+def get_pn_seasonality(df, model=None, engine=None):
+    """
+    Retourne le profil de saisonnalité d'un PN, calculé une seule fois par version des données.
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        model (Prophet, optional): Modèle déjà ajusté sur ces données.
+        engine (str, optional): Moteur de prévision, déduit du modèle s'il est fourni.
+
+    Returns:
+        numpy.ndarray: Effet saisonnier des 12 mois (janvier à décembre).
+    """
+    engine = _model_engine(model) if model is not None else (engine or resolve_engine())
+    key = _seasonality_key(df, engine)
+    profile = load_result('seasonality', key)
+    if profile is not None:
+        return profile
+
+    if model is None:
+        model = get_fitted_model(df, engine)
+    profile = get_seasonality_profile(model)['yearly'].to_numpy(dtype=np.float64)
+    try:
+        save_result('seasonality', key, profile)
+    except OSError:
+        pass
+    return profile
+
+
+def _seasonality_key(df, engine):
+    """Clé de cache du profil de saisonnalité d'une série"""
+    return build_cache_key(compute_data_fingerprint(df), {**_model_params(engine), 'seasonality_year': SEASONALITY_REFERENCE_YEAR})
+
+
+def _performance_metrics(df_cv):
+    """Métriques de validation croisée (performance_metrics de Prophet, ou MAE seule sans Prophet)"""
+    if PROPHET_AVAILABLE:
+        return performance_metrics(df_cv)
+    return pd.DataFrame({'mae': [(df_cv['y'] - df_cv['yhat']).abs().mean()]})
+
 
-@st.cache_data
 def run_prophet_forecast(df, periods, start_date):
     """
-    Exécute une prévision avec Prophet.
+    Exécute une prévision avec Prophet (ou avec le moteur de repli si Prophet n'est pas installé).
 
     Args:
         df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
@@ -16,61 +426,134 @@ def run_prophet_forecast(df, periods, start_date):
     Returns:
         tuple: Modèle Prophet et DataFrame des prévisions.
     """
-    model = Prophet()
-    model.fit(df[['ds', 'y']])
-    future = pd.date_range(start=start_date, periods=periods, freq='MS').to_frame(index=False, name='ds')
-    return model, model.predict(future)
+    model = get_fitted_model(df)
+    return model, predict_range(model, start_date, periods=periods)
 
-def adjust_forecast(forecast, df, trends, forecast_start_year=None, apply_all_trends=False):
+@lru_cache(maxsize=256)
+def _compile_trends(trend_items, forecast_start_year, apply_all_trends):
+    """Compile une fois des tendances déjà validées (tuple de paires année, pourcentage) en table année -> pourcentage"""
+    return {
+        year: pct for year, pct in trend_items
+        if apply_all_trends or (forecast_start_year is not None and year >= forecast_start_year)
+    }
+
+
+def compile_trends(trends, forecast_start_year=None, apply_all_trends=False):
     """
-    Ajuste les prévisions en appliquant des tendances personnalisées avancées.
-    L'impact de la tendance est proportionnel à la saisonnalité :
-    - Les points hauts de la saison sont plus impactés que les points bas.
+    Compile les tendances personnalisées d'un PN en table année -> pourcentage.
+
+    Args:
+        trends (dict): Tendances du PN (format {année: {"type": ..., "values": {année: pct}}} ou {année: pct}).
+        forecast_start_year (int, optional): Première année à laquelle appliquer les tendances.
+        apply_all_trends (bool): Applique toutes les années, quelle que soit la date de début.
+
+    Returns:
+        dict: Pourcentage à appliquer par année.
     """
-    forecast_adjusted = forecast.copy()
     if not trends:
-        return forecast_adjusted
+        return {}
+    # Validation et messages hors du cache : une année invalide est signalée à chaque appel
+    trend_items = []
     for year, trend_info in trends.items():
         try:
             year = int(year)
         except ValueError:
             st.error(f"Erreur : L'année {year} dans les tendances n'est pas valide.")
             continue
-        if not (apply_all_trends or (forecast_start_year is not None and year >= forecast_start_year)):
-            continue
         pct = 0.0
         if isinstance(trend_info, dict):
-            # On prend la dernière valeur de l'année
+            # On prend la dernière valeur saisie pour l'année (ordre d'insertion)
             values = trend_info.get("values", {})
             if values:
                 pct = list(values.values())[-1]
         else:
-            pct = float(trend_info)
-        # Application proportionnelle à la saisonnalité
-        mask = (forecast_adjusted['ds'].dt.year == year)
-        if not mask.any():
+            pct = trend_info
+        trend_items.append((year, float(pct)))
+    return _compile_trends(tuple(trend_items), forecast_start_year, apply_all_trends)
+
+
+def _trend_multipliers(seasonal, group_ids, pct):
+    """
+    Calcule le multiplicateur de chaque mois en une seule passe NumPy.
+
+    La saisonnalité est normalisée entre 0 et 1 au sein de chaque groupe (PN, année) :
+    l'impact de la tendance est maximal sur les points hauts de la saison.
+    """
+    active = ~np.isnan(pct)
+    multipliers = np.ones(len(seasonal))
+    if not active.any():
+        return multipliers
+
+    _, inverse = np.unique(group_ids, return_inverse=True)
+    mins = np.full(inverse.max() + 1, np.inf)
+    maxs = np.full(inverse.max() + 1, -np.inf)
+    np.minimum.at(mins, inverse, seasonal)
+    np.maximum.at(maxs, inverse, seasonal)
+    spread = (maxs - mins)[inverse]
+    coef = np.divide(seasonal - mins[inverse], spread, out=np.ones(len(seasonal)), where=spread != 0)
+
+    multipliers[active] = 1 + coef[active] * pct[active] / 100
+    return multipliers
+
+
+def _seasonal_component(forecast):
+    """Saisonnalité utilisée pour pondérer l'impact des tendances"""
+    if 'seasonal' in forecast.columns:
+        return forecast['seasonal'].to_numpy(dtype=np.float64)
+    if 'yhat' in forecast.columns:
+        # Approximation : saisonnalité = yhat - trend
+        if 'trend' in forecast.columns:
+            return (forecast['yhat'] - forecast['trend']).to_numpy(dtype=np.float64)
+        return forecast['yhat'].to_numpy(dtype=np.float64)
+    return np.zeros(len(forecast))
+
+
+def adjust_forecasts(forecasts, trends_by_pn, forecast_start_year=None, apply_all_trends=False):
+    """
+    Applique les tendances personnalisées à plusieurs prévisions en une seule opération.
+
+    Args:
+        forecasts (dict): Prévisions par PN.
+        trends_by_pn (dict): Tendances par PN (les PN absents ne sont pas ajustés).
+        forecast_start_year (int, optional): Première année à laquelle appliquer les tendances.
+        apply_all_trends (bool): Applique toutes les années, quelle que soit la date de début.
+
+    Returns:
+        dict: Prévisions ajustées par PN.
+    """
+    pns = [pn for pn, forecast in forecasts.items() if forecast is not None]
+    if not pns:
+        return dict(forecasts)
+
+    combined = pd.concat([forecasts[pn] for pn in pns], keys=range(len(pns)), names=['_pn', None])
+    pn_index = combined.index.get_level_values('_pn').to_numpy()
+    years = combined['ds'].dt.year.to_numpy()
+
+    # Table (PN, année) -> pourcentage, NaN si aucune tendance ne s'applique
+    pct = np.full(len(combined), np.nan)
+    for idx, pn in enumerate(pns):
+        compiled = compile_trends(trends_by_pn.get(pn), forecast_start_year, apply_all_trends)
+        if not compiled:
             continue
-        # On prend la colonne de saisonnalité (si existante), sinon on approxime par la série 'yhat' ou 'trend'
-        if 'seasonal' in forecast_adjusted.columns:
-            seasonal = forecast_adjusted.loc[mask, 'seasonal']
-        elif 'yhat' in forecast_adjusted.columns:
-            # Approximation : saisonnalité = yhat - trend
-            if 'trend' in forecast_adjusted.columns:
-                seasonal = forecast_adjusted.loc[mask, 'yhat'] - forecast_adjusted.loc[mask, 'trend']
-            else:
-                seasonal = forecast_adjusted.loc[mask, 'yhat']
-        else:
-            seasonal = pd.Series(0, index=forecast_adjusted.loc[mask].index)
-        # On normalise la saisonnalité entre 0 et 1
-        min_season = seasonal.min()
-        max_season = seasonal.max()
-        if max_season - min_season == 0:
-            coef = pd.Series(1, index=seasonal.index)
-        else:
-            coef = (seasonal - min_season) / (max_season - min_season)
-        # L'impact est plus fort sur les points hauts
-        impact = 1 + (coef * pct / 100)
-        for col in ['yhat', 'yhat_lower', 'yhat_upper', 'trend']:
-            if col in forecast_adjusted.columns:
-                forecast_adjusted.loc[mask, col] = forecast_adjusted.loc[mask, col] * impact.values
-    return forecast_adjusted
\ No newline at end of file
+        in_pn = pn_index == idx
+        pct[in_pn] = pd.Series(years[in_pn]).map(compiled).to_numpy(dtype=np.float64)
+
+    multipliers = _trend_multipliers(_seasonal_component(combined), pn_index * 10000 + years, pct)
+    columns = [col for col in ['yhat', 'yhat_lower', 'yhat_upper', 'trend'] if col in combined.columns]
+    combined[columns] = combined[columns].to_numpy(dtype=np.float64) * multipliers[:, None]
+
+    adjusted = dict(forecasts)
+    for idx, pn in enumerate(pns):
+        adjusted[pn] = combined.xs(idx, level='_pn')
+    return adjusted
+
+
+def adjust_forecast(forecast, df, trends, forecast_start_year=None, apply_all_trends=False):
+    """
+    Ajuste les prévisions en appliquant des tendances personnalisées avancées.
+    L'impact de la tendance est proportionnel à la saisonnalité :
+    - Les points hauts de la saison sont plus impactés que les points bas.
+    """
+    if not trends:
+        return forecast.copy()
+    return adjust_forecasts({None: forecast}, {None: trends}, forecast_start_year, apply_all_trends)[None]
@@ -0,0 +1,209 @@
+"""
+Pipeline d'import des fichiers d'historique
+Lit et valide plusieurs fichiers en parallèle sur un pool de processus, et ignore les réimports inchangés
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+import numpy as np
+
+from config.constants import IMPORT_MAX_WORKERS, DEFAULT_MERGE_POLICY
+from utils.data_utils import validate_history_file, extract_model_from_filename
+from utils.pn_series import PNSeries
+
+
+def file_fingerprint(content):
+    """
+    Empreinte du contenu brut d'un fichier importé.
+
+    Args:
+        content (bytes): Contenu du fichier.
+
+    Returns:
+        str: Empreinte hexadécimale SHA-256.
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def is_unchanged_upload(pn, file_hash, pn_data, pn_file_hash):
+    """
+    Indique si un fichier est celui déjà importé pour ce PN, sans le relire.
+
+    L'empreinte de l'historique enregistrée avec celle du fichier est comparée à l'historique courant :
+    un historique modifié depuis (restauration, autre import) n'est pas confondu avec le fichier.
+
+    Args:
+        pn (str): Numéro de PN.
+        file_hash (str): Empreinte du fichier (voir file_fingerprint).
+        pn_data (LazyPNCollection): Historiques courants.
+        pn_file_hash (dict): Empreintes enregistrées par PN ('file' et 'series').
+
+    Returns:
+        bool: True si le fichier et l'historique n'ont pas changé depuis le dernier import.
+    """
+    stored = pn_file_hash.get(pn)
+    if not stored or stored.get('file') != file_hash or pn not in pn_data:
+        return False
+    return pn_data.get_series(pn).fingerprint() == stored.get('series')
+
+
+def diff_history(pn, df, pn_data):
+    """
+    Compare un historique importé à l'historique courant d'un PN.
+
+    Args:
+        pn (str): Numéro de PN.
+        df (pandas.DataFrame): Historique importé (colonnes 'ds' et 'y').
+        pn_data (LazyPNCollection): Historiques courants.
+
+    Returns:
+        tuple: (PNSeries à enregistrer, index mensuels absolus des mois modifiés ou None pour un nouveau PN).
+               Si aucun mois n'a changé, la série courante est retournée telle quelle : elle n'est pas réécrite.
+    """
+    series = PNSeries.from_frame(df)
+    if pn not in pn_data:
+        return series, None
+    current = pn_data.get_series(pn)
+    changed = current.changed_months(series)
+    return (series if len(changed) else current), changed
+
+
+def merge_history(pn, df, pn_data, policy=DEFAULT_MERGE_POLICY):
+    """
+    Fusionne des mois supplémentaires dans l'historique courant d'un PN (mise à jour mensuelle).
+
+    Args:
+        pn (str): Numéro de PN.
+        df (pandas.DataFrame): Mois à ajouter (colonnes 'ds' et 'y').
+        pn_data (LazyPNCollection): Historiques courants.
+        policy (str): Politique pour les mois déjà présents (clé de MERGE_POLICIES).
+
+    Returns:
+        tuple: (PNSeries fusionnée, mois ajoutés, mois en conflit), mois en index mensuels absolus.
+               La série courante est retournée telle quelle si rien ne change ou si la fusion est refusée.
+    """
+    current = pn_data.get_series(pn) if pn in pn_data else PNSeries(0, np.empty(0, dtype=np.int32))
+    return current.merge(PNSeries.from_frame(df), policy)
+
+
+def format_months(months, limit=6):
+    """
+    Liste lisible de mois absolus (ex : "03/2025, 04/2025").
+
+    Args:
+        months (iterable): Index mensuels absolus (année * 12 + mois - 1).
+        limit (int): Nombre maximal de mois cités.
+
+    Returns:
+        str: Mois au format MM/AAAA.
+    """
+    months = list(months)
+    text = ', '.join(f"{month % 12 + 1:02d}/{month // 12}" for month in months[:limit])
+    if len(months) > limit:
+        text += f" et {len(months) - limit} autres"
+    return text
+
+
+def _parse_file(file_name, content):
+    """
+    Lit et valide un fichier (exécuté dans un processus du pool).
+
+    Args:
+        file_name (str): Nom du fichier importé.
+        content (bytes): Contenu du fichier.
+
+    Returns:
+        dict: 'df' (DataFrame ou None), 'error' (message ou None) et 'warning' (message ou None).
+    """
+    buffer = BytesIO(content)
+    # Le nom porte l'extension qui détermine le lecteur (Excel ou CSV)
+    buffer.name = file_name
+    try:
+        df, report = validate_history_file(buffer, file_name)
+    except Exception as e:
+        return {'df': None, 'error': str(e), 'warning': None}
+    return {
+        'df': df,
+        'error': report.summary(file_name) or None,
+        'warning': report.warning_summary() or None,
+    }
+
+
+def run_batch_import(files, pn_data=None, pn_file_hash=None, max_workers=None, on_progress=None):
+    """
+    Lit et valide un lot de fichiers en parallèle.
+
+    Le PN et le modèle d'avion sont extraits du nom de chaque fichier. Un fichier identique au dernier
+    import de son PN n'est pas lu ; un fichier relu pour un PN existant est comparé mois par mois
+    à l'historique courant. Un PN qui apparaît deux fois dans le lot n'est lu qu'une fois.
+
+    Args:
+        files (list): Fichiers chargés via st.file_uploader.
+        pn_data (LazyPNCollection, optional): Historiques courants.
+        pn_file_hash (dict, optional): Empreintes du dernier import par PN.
+        max_workers (int, optional): Nombre maximal de processus, sinon IMPORT_MAX_WORKERS.
+        on_progress (callable, optional): Appelé après chaque fichier avec (fichiers traités, total, résultat).
+
+    Returns:
+        list: Un dict par fichier, dans l'ordre du lot : 'file_name', 'pn', 'model', 'file_hash', 'df',
+              'series', 'changed_months', 'status', 'error', 'warning'. 'status' vaut "ok" (nouveau PN),
+              "updated" (mois modifiés), "unchanged", "ignored" ou "error" ; 'warning' signale les mois manquants.
+    """
+    pn_data = pn_data if pn_data is not None else {}
+    pn_file_hash = pn_file_hash or {}
+    results = []
+    to_parse = []
+    seen = set()
+    for file in files:
+        pn, model = extract_model_from_filename(file.name)
+        content = file.getvalue()
+        result = {
+            'file_name': file.name, 'pn': pn, 'model': model, 'file_hash': file_fingerprint(content),
+            'df': None, 'series': None, 'changed_months': None, 'status': None, 'error': None, 'warning': None,
+        }
+        if pn in seen:
+            result['status'] = 'ignored'
+            result['error'] = f"Le PN {pn} apparaît plusieurs fois dans le lot. Ce fichier sera ignoré."
+        elif is_unchanged_upload(pn, result['file_hash'], pn_data, pn_file_hash):
+            seen.add(pn)
+            result['status'] = 'unchanged'
+        else:
+            seen.add(pn)
+            to_parse.append((result, content))
+        results.append(result)
+
+    def _complete(result, parsed, done):
+        result['df'] = parsed['df']
+        result['error'] = parsed['error']
+        result['warning'] = parsed['warning']
+        if parsed['df'] is None:
+            result['status'] = 'error'
+        else:
+            result['series'], changed = diff_history(result['pn'], parsed['df'], pn_data)
+            result['changed_months'] = changed
+            if changed is None:
+                result['status'] = 'ok'
+            else:
+                result['status'] = 'updated' if len(changed) else 'unchanged'
+        if on_progress:
+            on_progress(done, len(to_parse), result)
+
+    limit = max_workers or IMPORT_MAX_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(limit, len(to_parse)))
+    if workers == 1:
+        # Un seul fichier : le démarrage du pool coûterait plus que la lecture
+        for done, (result, content) in enumerate(to_parse, start=1):
+            _complete(result, _parse_file(result['file_name'], content), done)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_parse_file, result['file_name'], content): result
+                for result, content in to_parse
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                _complete(futures[future], future.result(), done)
+
+    return results
@@ -0,0 +1,160 @@
+"""
+Cache persistant des modèles de prévision
+Stocke sur disque les modèles Prophet ajustés, indexés par l'empreinte des données du PN
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.constants import CACHE_DIR
+from utils.file_utils import write_atomic
+
+# Copie en mémoire des modèles déjà désérialisés dans ce processus
+# (partagée par les sessions et les threads d'arrière-plan, d'où le verrou)
+_memory_cache = {}
+_memory_cache_lock = threading.Lock()
+_MEMORY_CACHE_SIZE = 64
+
+
+def compute_data_fingerprint(df):
+    """
+    Calcule une empreinte du contenu d'une série historique (colonnes 'ds' et 'y').
+
+    Args:
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+
+    Returns:
+        str: Empreinte hexadécimale SHA-256 de la série.
+    """
+    ds = pd.to_datetime(df['ds']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    y = pd.to_numeric(df['y'], errors='coerce').to_numpy(dtype=np.float64)
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(ds).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()
+
+
+def build_cache_key(fingerprint, params=None):
+    """
+    Construit la clé de cache à partir de l'empreinte des données et des paramètres du modèle.
+
+    Args:
+        fingerprint (str): Empreinte des données (voir compute_data_fingerprint).
+        params (dict): Paramètres du modèle.
+
+    Returns:
+        str: Clé de cache.
+    """
+    payload = json.dumps(params or {}, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{fingerprint}|{payload}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _cache_path(kind, key, suffix):
+    """Retourne le chemin du fichier de cache pour un type de résultat et une clé"""
+    return Path(CACHE_DIR) / kind / f"{key}{suffix}"
+
+
+def _remember(key, value):
+    """Conserve un résultat dans le cache mémoire en limitant sa taille"""
+    with _memory_cache_lock:
+        if key not in _memory_cache and len(_memory_cache) >= _MEMORY_CACHE_SIZE:
+            _memory_cache.pop(next(iter(_memory_cache)))
+        _memory_cache[key] = value
+
+
+def _recall(key):
+    """Résultat du cache mémoire, ou None s'il n'y figure pas"""
+    with _memory_cache_lock:
+        return _memory_cache.get(key)
+
+
+def load_model(key):
+    """
+    Charge un modèle Prophet ajusté depuis le cache.
+
+    Args:
+        key (str): Clé de cache (voir build_cache_key).
+
+    Returns:
+        Prophet: Modèle ajusté, ou None s'il n'est pas en cache.
+    """
+    model = _recall(key)
+    if model is not None:
+        return model
+
+    path = _cache_path('models', key, '.json')
+    if not path.exists():
+        return None
+
+    try:
+        from prophet.serialize import model_from_json
+        with open(path, 'r', encoding='utf-8') as f:
+            model = model_from_json(f.read())
+    except Exception:
+        # Fichier illisible (version de Prophet différente, écriture interrompue...) : on refera l'ajustement
+        return None
+
+    _remember(key, model)
+    return model
+
+
+def save_model(key, model):
+    """
+    Enregistre un modèle Prophet ajusté dans le cache.
+
+    Args:
+        key (str): Clé de cache (voir build_cache_key).
+        model (Prophet): Modèle ajusté.
+    """
+    from prophet.serialize import model_to_json
+    write_atomic(_cache_path('models', key, '.json'), model_to_json(model).encode('utf-8'))
+    _remember(key, model)
+
+
+def load_result(kind, key):
+    """
+    Charge un résultat de calcul (validation croisée, saisonnalité...) depuis le cache.
+
+    Args:
+        kind (str): Type de résultat (sous-dossier du cache).
+        key (str): Clé de cache (voir build_cache_key).
+
+    Returns:
+        object: Résultat enregistré, ou None s'il n'est pas en cache.
+    """
+    memory_key = f"{kind}/{key}"
+    value = _recall(memory_key)
+    if value is not None:
+        return value
+
+    path = _cache_path(kind, key, '.pkl')
+    if not path.exists():
+        return None
+
+    try:
+        value = pd.read_pickle(path)
+    except Exception:
+        return None
+
+    _remember(memory_key, value)
+    return value
+
+
+def save_result(kind, key, value):
+    """
+    Enregistre un résultat de calcul dans le cache.
+
+    Args:
+        kind (str): Type de résultat (sous-dossier du cache).
+        key (str): Clé de cache (voir build_cache_key).
+        value (object): Résultat à enregistrer (DataFrame, dict de DataFrames...).
+    """
+    write_atomic(_cache_path(kind, key, '.pkl'), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    _remember(f"{kind}/{key}", value)
@@ -8,9 +8,9 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from utils.forecast_utils import run_prophet_forecast, adjust_forecast
+from utils.forecast_utils import adjust_forecasts
+from utils.batch_forecast import run_batch_forecast
 from utils.data_utils import get_aircraft_model
-from prophet.diagnostics import cross_validation, performance_metrics
 
 def generate_pdf_report(selected_pns, months, forecast_start_date, kpis_to_include, pn_data, pn_last_updated, pn_trend, pn_trend_enabled, pn_aircraft_model=None):
     """
@@ -21,7 +21,7 @@ def generate_pdf_report(selected_pns, months, forecast_start_date, kpis_to_inclu
         months (int): Nombre de mois à prévoir.
         forecast_start_date (datetime): Date de début des prévisions.
         kpis_to_include (list): Indicateurs clés à inclure.
-        pn_data (dict): Données des PN.
+        pn_data (LazyPNCollection): Données des PN.
         pn_last_updated (dict): Dates de mise à jour des PN.
         pn_trend (dict): Tendances personnalisées des PN.
         pn_trend_enabled (dict): Indicateur d'activation des tendances.
@@ -88,6 +88,19 @@ def generate_pdf_report(selected_pns, months, forecast_start_date, kpis_to_inclu
     elements.append(Paragraph(disclaimer, normal_style))
     elements.append(PageBreak())
 
+    # Prévisions (et validation croisée si la MAE est demandée) de tous les PN, calculées en parallèle
+    batch_results = run_batch_forecast(
+        selected_pns, pn_data, forecast_start_date, months,
+        with_cv=bool(kpis_to_include) and "MAE" in kpis_to_include, section='report'
+    )
+    # Tendances personnalisées appliquées à tous les PN en une seule opération
+    enabled_trends = {pn: pn_trend.get(pn) for pn in selected_pns if pn_trend_enabled.get(pn, False) and pn_trend.get(pn)}
+    adjusted_forecasts = adjust_forecasts(
+        {pn: result['forecast'] for pn, result in batch_results.items()},
+        enabled_trends,
+        forecast_start_year=forecast_start_date.year
+    )
+
     for idx, pn in enumerate(selected_pns):
         # Titre PN
         pn_title = f"Rapport de Prévision de la Demande PN : {pn} ({get_aircraft_model(pn, pn_aircraft_model)})"
@@ -104,17 +117,16 @@ def generate_pdf_report(selected_pns, months, forecast_start_date, kpis_to_inclu
             elements.append(Paragraph(f"Aucune donnée disponible pour {pn}.", normal_style))
             continue
 
-        model, forecast = run_prophet_forecast(df, months, forecast_start_date)
-        trends = pn_trend.get(pn, {})
-        enable_trends = pn_trend_enabled.get(pn, False)
-        forecast_adjusted = forecast.copy()
-        if enable_trends and trends:
-            forecast_adjusted = adjust_forecast(forecast, df, trends, forecast_start_year=forecast_start_date.year)
+        result = batch_results.get(pn, {})
+        forecast = result.get('forecast')
+        if forecast is None:
+            elements.append(Paragraph(f"Prévision impossible pour {pn} : {result.get('error', 'erreur inconnue')}.", normal_style))
+            continue
+        forecast_adjusted = adjusted_forecasts[pn]
 
-        df_cv = cross_validation(model, horizon='365 days', initial='730 days', period='180 days')
-        mae = performance_metrics(df_cv)['mae'].mean() if not df_cv.empty else None
+        mae = result.get('mae')
 
-        yearly_totals = df.groupby(df['ds'].dt.year)['y'].sum()
+        yearly_totals = pn_data.get_series(pn).yearly_totals()
         current_year = datetime.now().year
         complete_years = yearly_totals[yearly_totals.index < current_year]
         reference_year = complete_years.index.min() if not complete_years.empty else None
@@ -1,8 +1,10 @@
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 from utils.data_utils import get_aircraft_model
 import streamlit as st
-from prophet import Prophet
+from utils.batch_forecast import get_seasonality_matrix
+from config.constants import SEASONALITY_REFERENCE_YEAR
 
 def generate_forecast_plot(df, forecast_adjusted, selected_pn, forecast_start_date, forecast_end_date, enable_trends, pn_aircraft_model=None):
     """
@@ -131,7 +133,7 @@ def generate_trend_plot(trend_forecast, trend_forecast_adjusted, enable_trends):
     )
     return fig_trend
 
-def generate_seasonality_plot(pns_to_plot, pn_data, pn_aircraft_model=None):
+def generate_seasonality_plot(pns_to_plot, pn_data, pn_aircraft_model=None, on_missing=None):
     """
     Génère un graphique Plotly pour la saisonnalité des PN.
 
@@ -139,36 +141,29 @@ def generate_seasonality_plot(pns_to_plot, pn_data, pn_aircraft_model=None):
         pns_to_plot (list): Liste des PN à afficher.
         pn_data (dict): Données des PN.
         pn_aircraft_model (dict): Dictionnaire des modèles d'avion personnalisés.
+        on_missing (callable, optional): Reçoit les PN dont le profil n'est pas encore calculé
+            (voir get_seasonality_matrix) ; ils sont alors absents du graphique.
 
     Returns:
         plotly.graph_objects.Figure: Graphique Plotly.
     """
     fig_seasonality = go.Figure()
     colors = ['#003087', '#4A90E2', '#CE1126'] + ['#4682B4', '#87CEEB', '#B22222']
-    color_idx = 0
 
-    for pn in pns_to_plot:
-        df = pn_data[pn]
-        if df.empty:
-            continue
-        model = Prophet(yearly_seasonality=True)
-        model.fit(df[['ds', 'y']])
-        future = pd.date_range(start='2025-01-01', periods=12, freq='MS').to_frame(index=False, name='ds')
-        forecast = model.predict(future)
-        monthly_seasonality = forecast[['ds', 'yearly']].copy()
-        monthly_seasonality['Month'] = monthly_seasonality['ds'].dt.strftime('%b')
-        monthly_seasonality['yearly'] = monthly_seasonality['yearly'].clip(lower=0)
+    pns_kept, seasonality_matrix = get_seasonality_matrix(pns_to_plot, pn_data, section='dashboard', on_missing=on_missing)
+    seasonality_matrix = np.clip(seasonality_matrix, 0, None)
+    months = pd.date_range(start=f'{SEASONALITY_REFERENCE_YEAR}-01-01', periods=12, freq='MS').strftime('%b').tolist()
 
+    for color_idx, pn in enumerate(pns_kept):
         fig_seasonality.add_trace(go.Scatter(
-            x=monthly_seasonality['Month'],
-            y=monthly_seasonality['yearly'],
+            x=months,
+            y=seasonality_matrix[:, color_idx],
             mode='lines+markers',
             name=f"{pn} ({get_aircraft_model(pn, pn_aircraft_model)})",
             line=dict(color=colors[color_idx % len(colors)]),
             marker=dict(size=8),
             hovertemplate=f'Mois: %{{x}}<br>Saisonnalité: %{{y:.2f}}<br>PN: {pn}<extra></extra>'
         ))
-        color_idx += 1
 
     fig_seasonality.update_layout(
         title='Comparaison de la saisonnalité annuelle',
@@ -0,0 +1,144 @@
+"""
+Collection paresseuse des historiques PN
+La liste des PN est connue immédiatement, chaque historique n'est chargé qu'au premier accès
+"""
+
+import threading
+from collections.abc import MutableMapping
+
+from utils.pn_series import PNSeries
+
+
+class _SeriesLoader:
+    """Chargeur de séries (PNSeries) mémoïsé, partagé par toutes les copies d'une collection"""
+
+    def __init__(self, load):
+        self._load = load
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def peek(self, pn):
+        """Retourne l'historique s'il est déjà chargé, sans lecture sur le disque"""
+        return self._series.get(pn)
+
+    def get(self, pn):
+        """Retourne l'historique, chargé une seule fois"""
+        with self._lock:
+            if pn not in self._series:
+                self._series[pn] = self._load(pn)
+            return self._series[pn]
+
+
+class LazyPNCollection(MutableMapping):
+    """
+    Dictionnaire PN -> DataFrame dont les historiques sont chargés à la demande.
+
+    Les historiques sont conservés sous forme compacte (PNSeries) ; le DataFrame n'est construit
+    qu'à la lecture d'un PN. Les PN ajoutés ou remplacés sont conservés dans la collection elle-même ;
+    les autres sont lus par le chargeur, une seule fois pour toutes les copies (copy()) de la collection.
+    Tester la présence d'un PN, compter ou lister les PN ne charge aucun historique.
+    """
+
+    def __init__(self, pns=(), load=None, loader=None):
+        self._pns = dict.fromkeys(pns)
+        self._assigned = {}
+        self._loader = loader or (_SeriesLoader(load) if load is not None else None)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Construit une collection déjà entièrement en mémoire.
+
+        Args:
+            frames (dict): Historiques par PN (DataFrame ou PNSeries).
+
+        Returns:
+            LazyPNCollection: Collection sans chargeur.
+        """
+        collection = cls()
+        for pn, df in frames.items():
+            collection[pn] = df
+        return collection
+
+    def get_series(self, pn):
+        """
+        Retourne l'historique compact d'un PN (chargé au premier accès).
+
+        Args:
+            pn (str): Numéro de PN.
+
+        Returns:
+            PNSeries: Historique du PN.
+        """
+        if pn in self._assigned:
+            return self._assigned[pn]
+        if pn not in self._pns or self._loader is None:
+            raise KeyError(pn)
+        return self._loader.get(pn)
+
+    def __getitem__(self, pn):
+        return self.get_series(pn).to_frame()
+
+    def __setitem__(self, pn, df):
+        self._pns[pn] = None
+        self._assigned[pn] = df if isinstance(df, PNSeries) else PNSeries.from_frame(df)
+
+    def __delitem__(self, pn):
+        del self._pns[pn]
+        self._assigned.pop(pn, None)
+
+    def __contains__(self, pn):
+        return pn in self._pns
+
+    def __iter__(self):
+        return iter(self._pns)
+
+    def __len__(self):
+        return len(self._pns)
+
+    def __repr__(self):
+        loaded = sum(1 for pn in self._pns if self.peek(pn) is not None)
+        return f"LazyPNCollection({len(self)} PN, {loaded} chargés)"
+
+    def peek(self, pn):
+        """
+        Retourne l'historique compact d'un PN s'il est déjà en mémoire, sans le charger.
+
+        Args:
+            pn (str): Numéro de PN.
+
+        Returns:
+            PNSeries: Historique, ou None s'il n'a pas encore été chargé.
+        """
+        if pn in self._assigned:
+            return self._assigned[pn]
+        if pn not in self._pns or self._loader is None:
+            return None
+        return self._loader.peek(pn)
+
+    def copy(self):
+        """
+        Copie superficielle : les PN ajoutés ou supprimés dans la copie n'affectent pas l'original,
+        les historiques déjà chargés restent partagés.
+
+        Returns:
+            LazyPNCollection: Nouvelle collection.
+        """
+        collection = LazyPNCollection(self._pns, loader=self._loader)
+        collection._assigned = dict(self._assigned)
+        return collection
+
+
+def as_pn_collection(pn_data):
+    """
+    Convertit un dictionnaire d'historiques en collection (copie superficielle si c'en est déjà une).
+
+    Args:
+        pn_data (dict | LazyPNCollection): Historiques par PN.
+
+    Returns:
+        LazyPNCollection: Collection indépendante de l'argument.
+    """
+    if isinstance(pn_data, LazyPNCollection):
+        return pn_data.copy()
+    return LazyPNCollection.from_frames(pn_data or {})
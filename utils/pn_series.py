@@ -0,0 +1,252 @@
+"""
+Représentation compacte de l'historique d'un PN
+Un index de premier mois et un tableau NumPy contigu des quantités mensuelles
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# DataFrame matérialisés récemment, partagés par toutes les sessions du processus
+_frame_cache = OrderedDict()
+_frame_cache_lock = threading.Lock()
+_FRAME_CACHE_SIZE = 32
+
+
+class PNSeries:
+    """
+    Historique mensuel d'un PN.
+
+    start est l'index absolu du premier mois (année * 12 + mois - 1) ; values contient une quantité
+    par mois à partir de start, en int32 si toutes sont entières, sinon en float32 avec NaN pour
+    les mois absents. Les DataFrame attendus par les pages et par Prophet ne sont construits
+    qu'à la demande.
+    """
+
+    __slots__ = ('start', 'values')
+
+    def __init__(self, start, values):
+        self.start = int(start)
+        self.values = values
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Construit la série à partir d'un DataFrame avec colonnes 'ds' et 'y'.
+
+        Args:
+            df (pandas.DataFrame): Historique du PN (un mois en double garde la dernière valeur).
+
+        Returns:
+            PNSeries: Série compacte.
+        """
+        if df.empty:
+            return cls(0, np.empty(0, dtype=np.int32))
+        ds = pd.to_datetime(df['ds'])
+        months = (ds.dt.year * 12 + ds.dt.month - 1).to_numpy(dtype=np.int64)
+        start = int(months.min())
+        values = np.full(int(months.max()) - start + 1, np.nan)
+        values[months - start] = pd.to_numeric(df['y'], errors='coerce').to_numpy(dtype=np.float64)
+        return cls._compact(start, values)
+
+    @classmethod
+    def _compact(cls, start, values):
+        """Série stockée en int32 si toutes les quantités sont entières et aucun mois ne manque, sinon en float32"""
+        if not np.isnan(values).any() and np.array_equal(values, np.round(values)) \
+                and np.abs(values).max(initial=0) < np.iinfo(np.int32).max:
+            return cls(start, values.astype(np.int32))
+        return cls(start, values.astype(np.float32))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"PNSeries({self.start // 12}-{self.start % 12 + 1:02d}, {len(self)} mois, {self.values.dtype})"
+
+    @property
+    def empty(self):
+        return self.observed_count() == 0
+
+    def _observed(self):
+        """Masque des mois renseignés"""
+        if self.values.dtype.kind == 'f':
+            return ~np.isnan(self.values)
+        return np.ones(len(self.values), dtype=bool)
+
+    def observed_count(self):
+        """Nombre de mois renseignés"""
+        return int(self._observed().sum())
+
+    def months(self):
+        """Index mensuels absolus des mois renseignés"""
+        return self.start + np.flatnonzero(self._observed())
+
+    def dates(self):
+        """Dates (premier jour du mois) des mois renseignés"""
+        # Index mensuel absolu -> datetime64[M] (mois écoulés depuis janvier 1970)
+        return (self.months() - 1970 * 12).astype('datetime64[M]').astype('datetime64[ns]')
+
+    def quantities(self):
+        """Quantités des mois renseignés (vue sans copie si aucun mois ne manque)"""
+        observed = self._observed()
+        return self.values if observed.all() else self.values[observed]
+
+    def fingerprint(self):
+        """
+        Empreinte du contenu de la série (mois renseignés et quantités), indépendante du type
+        de stockage : deux imports du même historique donnent la même empreinte.
+
+        Returns:
+            str: Empreinte hexadécimale SHA-256.
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(self.dates().astype(np.int64)).tobytes())
+        digest.update(np.ascontiguousarray(self.quantities().astype(np.float64)).tobytes())
+        return digest.hexdigest()
+
+    def changed_months(self, other):
+        """
+        Mois dont la quantité diffère entre deux séries (mois ajoutés, supprimés ou modifiés).
+
+        Args:
+            other (PNSeries): Nouvelle version de l'historique.
+
+        Returns:
+            numpy.ndarray: Index mensuels absolus des mois modifiés, triés.
+        """
+        if not len(self.values) and not len(other.values):
+            return np.empty(0, dtype=np.int64)
+        spans = [(series.start, series.start + len(series)) for series in (self, other) if len(series.values)]
+        start = min(span[0] for span in spans)
+        end = max(span[1] for span in spans)
+
+        # Alignement des deux séries sur la même plage de mois (NaN : mois absent)
+        aligned = []
+        for series in (self, other):
+            values = np.full(end - start, np.nan)
+            if len(series.values):
+                offset = series.start - start
+                values[offset:offset + len(series)] = series.values
+            aligned.append(values)
+        old, new = aligned
+        changed = (old != new) & ~(np.isnan(old) & np.isnan(new))
+        return start + np.flatnonzero(changed)
+
+    def merge(self, other, policy='reject'):
+        """
+        Fusionne de nouveaux mois dans l'historique.
+
+        Un conflit est un mois renseigné des deux côtés avec des quantités différentes ;
+        policy indique la quantité retenue : 'overwrite' (la nouvelle), 'keep' (l'existante)
+        ou 'reject' (aucune fusion si au moins un conflit).
+
+        Args:
+            other (PNSeries): Mois à ajouter.
+            policy (str): Politique de fusion (clé de MERGE_POLICIES).
+
+        Returns:
+            tuple: (PNSeries fusionnée, index mensuels absolus des mois ajoutés, des mois en conflit).
+                   En cas de rejet, ou si rien ne change, la série retournée est self.
+        """
+        if policy not in ('reject', 'overwrite', 'keep'):
+            raise ValueError(f"Politique de fusion inconnue : {policy}")
+        empty = np.empty(0, dtype=np.int64)
+        if not other.observed_count():
+            return self, empty, empty
+        if not self.observed_count():
+            return other, other.months(), empty
+
+        start = min(self.start, other.start)
+        end = max(self.start + len(self), other.start + len(other))
+        merged = np.full(end - start, np.nan)
+        merged[self.start - start:self.start - start + len(self)] = self.values
+        incoming = np.full(end - start, np.nan)
+        incoming[other.start - start:other.start - start + len(other)] = other.values
+
+        existing = ~np.isnan(merged)
+        provided = ~np.isnan(incoming)
+        added = provided & ~existing
+        conflicts = provided & existing & (merged != incoming)
+        if policy == 'reject' and conflicts.any():
+            return self, empty, start + np.flatnonzero(conflicts)
+
+        replaced = added | (conflicts if policy == 'overwrite' else False)
+        if not replaced.any():
+            return self, empty, start + np.flatnonzero(conflicts)
+        merged[replaced] = incoming[replaced]
+
+        first, last = np.flatnonzero(~np.isnan(merged))[[0, -1]]
+        series = PNSeries._compact(start + first, merged[first:last + 1])
+        return series, start + np.flatnonzero(added), start + np.flatnonzero(conflicts)
+
+    def to_prophet_frame(self):
+        """
+        DataFrame minimal attendu par les moteurs de prévision.
+
+        Returns:
+            pandas.DataFrame: Colonnes 'ds' et 'y'.
+        """
+        return pd.DataFrame({'ds': self.dates(), 'y': self.quantities()}, copy=False)
+
+    def to_frame(self):
+        """
+        DataFrame complet utilisé par les pages (mis en cache pour les séries consultées récemment).
+        Le DataFrame retourné est partagé : il ne doit pas être modifié en place.
+
+        Returns:
+            pandas.DataFrame: Colonnes 'Année', 'Mois', 'Quantité', 'ds', 'y'.
+        """
+        key = id(self)
+        with _frame_cache_lock:
+            cached = _frame_cache.get(key)
+            if cached is not None and cached[0] is self:
+                _frame_cache.move_to_end(key)
+                return cached[1]
+
+        months = self.months()
+        quantities = self.quantities()
+        if quantities.dtype.kind in 'iu':
+            quantities = quantities.astype(np.int64)
+        frame = pd.DataFrame({
+            'Année': months // 12,
+            'Mois': months % 12 + 1,
+            'Quantité': quantities,
+            'ds': self.dates(),
+            'y': quantities,
+        })
+
+        with _frame_cache_lock:
+            _frame_cache[key] = (self, frame)
+            _frame_cache.move_to_end(key)
+            while len(_frame_cache) > _FRAME_CACHE_SIZE:
+                _frame_cache.popitem(last=False)
+        return frame
+
+    def yearly_totals(self):
+        """
+        Totaux annuels des années comportant au moins un mois renseigné.
+
+        Returns:
+            pandas.Series: Total par année (index : année).
+        """
+        if not len(self.values):
+            return pd.Series(dtype=np.int64)
+        first_year = self.start // 12
+        offset = self.start - first_year * 12
+        year_count = -(-(offset + len(self.values)) // 12)
+
+        # Alignement sur des années civiles complètes, puis une ligne par année
+        padded = np.zeros(year_count * 12, dtype=np.float64)
+        observed = np.zeros(year_count * 12, dtype=bool)
+        padded[offset:offset + len(self.values)] = np.nan_to_num(self.values.astype(np.float64))
+        observed[offset:offset + len(self.values)] = self._observed()
+        totals = padded.reshape(-1, 12).sum(axis=1)
+        kept = observed.reshape(-1, 12).any(axis=1)
+
+        if self.values.dtype.kind in 'iu':
+            totals = totals.astype(np.int64)
+        years = np.arange(first_year, first_year + year_count)
+        return pd.Series(totals[kept], index=years[kept])
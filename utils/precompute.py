@@ -0,0 +1,236 @@
+"""
+Précalcul des prévisions en arrière-plan
+Ajuste les modèles, calcule validations croisées et saisonnalités de chaque PN après un changement de données
+"""
+
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import streamlit as st
+
+from config.constants import PRECOMPUTE_SECTIONS, PRECOMPUTE_CHECK_SECONDS
+from utils.data_store import get_data_store
+from utils.batch_forecast import get_worker_count
+from utils.forecast_utils import (
+    get_fitted_model, get_backtest, load_backtest, get_pn_seasonality, load_pn_seasonality, resolve_engine
+)
+
+
+def precompute_pn(pn, df, engines):
+    """
+    Calcule et met en cache le modèle, la validation croisée et la saisonnalité d'un PN
+    (exécuté dans le thread du précalcul ou dans un processus du pool).
+
+    Args:
+        pn (str): PN concerné.
+        df (pandas.DataFrame): Données historiques avec colonnes 'ds' et 'y'.
+        engines (iterable): Moteurs de prévision utilisés par les pages pour ce PN.
+
+    Returns:
+        dict: 'pn', 'computed' (nombre de moteurs recalculés) et 'error' (message ou None).
+    """
+    result = {'pn': pn, 'computed': 0, 'error': None}
+    try:
+        for engine in engines:
+            # Résultats déjà en cache pour cette version des données : aucun ajustement
+            if load_pn_seasonality(df, engine) is not None and load_backtest(df, engine) is not None:
+                continue
+            model = get_fitted_model(df, engine, pn)
+            get_pn_seasonality(df, model)
+            get_backtest(df, model)
+            result['computed'] += 1
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def precompute_engines(pn, pn_forecast_engine=None):
+    """
+    Moteurs de prévision à précalculer pour un PN (un par moteur distinct des sections précalculées).
+
+    Args:
+        pn (str): PN concerné.
+        pn_forecast_engine (dict, optional): Choix de moteur enregistrés par PN.
+
+    Returns:
+        list: Noms des moteurs.
+    """
+    engines = [resolve_engine(section, pn, pn_forecast_engine or {}) for section in PRECOMPUTE_SECTIONS]
+    return list(dict.fromkeys(engines))
+
+
+class PrecomputeWorker:
+    """
+    File de précalcul des prévisions.
+
+    Les pages et les imports ajoutent des PN à la file (enqueue) sans attendre ; un thread démon
+    calcule les résultats manquants dans le cache (modèles, validations croisées, saisonnalités),
+    que les pages se contentent ensuite de lire. Les demandes en attente sont regroupées, et un PN
+    dont les résultats sont déjà en cache pour ses données courantes n'est pas réajusté.
+    Le thread vérifie aussi toutes les check_seconds secondes si un autre processus a modifié les données.
+    """
+
+    def __init__(self, data_store, check_seconds=PRECOMPUTE_CHECK_SECONDS):
+        self._data_store = data_store
+        self.check_seconds = check_seconds
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # État consulté par les pages
+        self.current = None
+        self.last_version = None
+        self.errors = {}
+
+    def enqueue(self, pns=None):
+        """
+        Demande le précalcul de PN (sans attendre le calcul).
+
+        Args:
+            pns (iterable, optional): PN à précalculer (tous les PN si None).
+        """
+        if pns is None:
+            pns = list(self._data_store.snapshot()[1]['pn_data'])
+        with self._pending_lock:
+            new = [pn for pn in pns if pn not in self._pending]
+            self._pending.update(new)
+        if new:
+            self._queue.put(new)
+
+    def is_pending(self, pn):
+        """
+        Indique si le précalcul d'un PN est en attente ou en cours.
+
+        Args:
+            pn (str): PN concerné.
+
+        Returns:
+            bool: True si ses résultats ne sont pas encore disponibles.
+        """
+        with self._pending_lock:
+            return pn in self._pending or pn == self.current
+
+    def pending_count(self):
+        """Nombre de PN en attente de précalcul"""
+        with self._pending_lock:
+            return len(self._pending)
+
+    def run_once(self, pns=None, max_workers=1):
+        """
+        Précalcule les PN indiqués sur les données courantes du stock partagé.
+
+        Args:
+            pns (iterable, optional): PN à précalculer (tous les PN si None).
+            max_workers (int): Nombre de processus ; 1 calcule dans le thread appelant.
+
+        Returns:
+            dict: Résultat de precompute_pn par PN traité.
+        """
+        version, data = self._data_store.snapshot()
+        self.last_version = version
+        pn_data = data['pn_data']
+        pns = list(pn_data) if pns is None else [pn for pn in pns if pn in pn_data]
+        results = {}
+
+        def _done(result):
+            results[result['pn']] = result
+            if result['error']:
+                self.errors[result['pn']] = result['error']
+            else:
+                self.errors.pop(result['pn'], None)
+
+        tasks = []
+        for pn in pns:
+            series = pn_data.get_series(pn)
+            if series.empty:
+                self._discard(pn)
+                continue
+            tasks.append((pn, series.to_prophet_frame(), precompute_engines(pn, data['pn_forecast_engine'])))
+
+        workers = get_worker_count(len(tasks), max_workers)
+        if workers == 1:
+            for pn, df, engines in tasks:
+                self.current = pn
+                self._discard(pn)
+                _done(precompute_pn(pn, df, engines))
+            self.current = None
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(precompute_pn, pn, df, engines) for pn, df, engines in tasks]
+                for future in as_completed(futures):
+                    result = future.result()
+                    self._discard(result['pn'])
+                    _done(result)
+        return results
+
+    def _discard(self, pn):
+        """Retire un PN de la liste d'attente"""
+        with self._pending_lock:
+            self._pending.discard(pn)
+
+    def _run(self):
+        """Boucle du thread : traite les demandes, et vérifie périodiquement les écritures d'autres processus"""
+        while not self._stop.is_set():
+            try:
+                pns = set(self._queue.get(timeout=self.check_seconds))
+            except queue.Empty:
+                if self._data_store.refresh() == self.last_version:
+                    continue
+                pns = None
+            # Regroupement des demandes arrivées entre-temps
+            while pns is not None:
+                try:
+                    pns.update(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.run_once(pns)
+            except Exception as e:
+                # Le thread doit survivre à une erreur ponctuelle (données illisibles, disque plein...)
+                self.errors[None] = str(e)
+
+    def start(self):
+        """Démarre le thread démon (sans effet s'il tourne déjà) et demande le précalcul de tous les PN"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="forecast-precompute", daemon=True)
+            self._thread.start()
+            self.enqueue()
+
+    def stop(self):
+        """Arrête le thread après le PN en cours"""
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+@st.cache_resource
+def get_precompute_worker():
+    """
+    Retourne la file de précalcul unique du processus serveur, démarrée au premier appel.
+
+    Returns:
+        PrecomputeWorker: File partagée par toutes les sessions.
+    """
+    worker = PrecomputeWorker(get_data_store())
+    worker.start()
+    return worker
+
+
+if __name__ == "__main__":
+    # Précalcul hors du serveur (tâche planifiée du système, avant l'arrivée des utilisateurs) :
+    # python -m utils.precompute [PN ...]
+    import sys
+    from utils.data_store import DataStore
+
+    selected = sys.argv[1:] or None
+    results = PrecomputeWorker(DataStore()).run_once(selected, max_workers=None)
+    computed = sum(1 for result in results.values() if result['computed'])
+    print(f"{len(results)} PN traités, {computed} recalculés")
+    for pn, result in results.items():
+        if result['error']:
+            print(f"Erreur pour {pn} : {result['error']}")
@@ -0,0 +1,145 @@
+"""
+Restauration des sauvegardes
+Restaure un PN ou toute la flotte depuis une sauvegarde ou une date, en ne lisant que les historiques concernés
+"""
+
+from datetime import datetime
+
+from utils.pn_collection import as_pn_collection
+from utils.storage import METADATA_SECTIONS
+
+
+def find_snapshot(snapshot_store, at, pns=None):
+    """
+    Sauvegarde la plus récente créée au plus tard à une date donnée.
+
+    Args:
+        snapshot_store (SnapshotStore): Magasin des sauvegardes.
+        at (datetime): Date de référence.
+        pns (list, optional): Si fourni, seules les sauvegardes contenant tous ces PN sont retenues.
+
+    Returns:
+        str: Identifiant de la sauvegarde, ou None si aucune n'existe à cette date.
+    """
+    entries, _ = snapshot_store.list_snapshots()
+    for entry in entries:
+        if datetime.fromisoformat(entry['created_at']) > at:
+            continue
+        # Le catalogue ne liste pas les PN : seul le manifeste est lu, pas les historiques
+        if not pns or all(pn in snapshot_store.load(entry['id'])['pn_data'] for pn in pns):
+            return entry['id']
+    return None
+
+
+def _series_digests(snapshot_store, snapshot_id):
+    """Empreinte de chaque historique de la sauvegarde (vide pour une ancienne sauvegarde JSON)"""
+    if snapshot_store.is_legacy(snapshot_id):
+        return {}
+    return snapshot_store.read_manifest(snapshot_id)['series']
+
+
+def plan_restore(snapshot_store, current, snapshot_id, pns=None):
+    """
+    Calcule les sections à publier pour restaurer une sauvegarde.
+
+    Sans liste de PN, toute la flotte revient à l'état de la sauvegarde (les PN créés depuis sont supprimés) ;
+    sinon seuls les PN indiqués sont restaurés et les autres restent inchangés. Seuls les historiques
+    qui diffèrent des historiques courants sont lus dans la sauvegarde.
+
+    Args:
+        snapshot_store (SnapshotStore): Magasin des sauvegardes.
+        current (dict): Sections courantes (ex : st.session_state ou DataStore.snapshot()).
+        snapshot_id (str): Identifiant de la sauvegarde.
+        pns (list, optional): PN à restaurer (toute la flotte si None).
+
+    Returns:
+        tuple: (sections à publier, résumé avec 'restored', 'unchanged' et 'removed' : listes de PN).
+
+    Raises:
+        ValueError: Si un PN demandé est absent de la sauvegarde.
+    """
+    snapshot = snapshot_store.load(snapshot_id)
+    source = snapshot['pn_data']
+    targets = list(source) if pns is None else list(pns)
+    missing = [pn for pn in targets if pn not in source]
+    if missing:
+        raise ValueError(f"PN absents de la sauvegarde {snapshot_id} : {', '.join(missing)}")
+
+    digests = _series_digests(snapshot_store, snapshot_id)
+    pn_data = as_pn_collection(current.get('pn_data', {}))
+    summary = {'restored': [], 'unchanged': [], 'removed': []}
+    for pn in targets:
+        # Historique identique (même empreinte) : ni lecture dans la sauvegarde, ni réécriture
+        if pn in pn_data and pn in digests and pn_data.get_series(pn).fingerprint() == digests[pn]:
+            summary['unchanged'].append(pn)
+            continue
+        pn_data[pn] = source.get_series(pn)
+        summary['restored'].append(pn)
+    if pns is None:
+        summary['removed'] = [pn for pn in pn_data if pn not in source]
+        for pn in summary['removed']:
+            del pn_data[pn]
+
+    sections = {'pn_data': pn_data}
+    for section in METADATA_SECTIONS:
+        values = dict(current.get(section, {}))
+        for pn in summary['removed']:
+            values.pop(pn, None)
+        # Section absente d'une ancienne sauvegarde : les valeurs courantes sont conservées
+        if section in snapshot:
+            for pn in targets:
+                if pn in snapshot[section]:
+                    values[pn] = snapshot[section][pn]
+                else:
+                    values.pop(pn, None)
+        sections[section] = values
+    return sections, summary
+
+
+def restore(snapshot_store, data_store, snapshot_id, pns=None, expected_version=None):
+    """
+    Restaure une sauvegarde dans le stock de données partagé, en une seule écriture.
+
+    Args:
+        snapshot_store (SnapshotStore): Magasin des sauvegardes.
+        data_store (DataStore): Stock de données partagé.
+        snapshot_id (str): Identifiant de la sauvegarde.
+        pns (list, optional): PN à restaurer (toute la flotte si None).
+        expected_version (int, optional): Version des données sur laquelle la restauration a été décidée.
+
+    Returns:
+        tuple: (nouvelle version des données, résumé de plan_restore).
+
+    Raises:
+        DataConflictError: Si les données ont changé depuis expected_version.
+    """
+    version, current = data_store.snapshot()
+    sections, summary = plan_restore(snapshot_store, current, snapshot_id, pns)
+    return data_store.publish(expected_version=version if expected_version is None else expected_version, **sections), summary
+
+
+if __name__ == "__main__":
+    # Restauration hors du serveur : python -m utils.restore <sauvegarde | AAAA-MM-JJ[THH:MM]> [PN ...]
+    import sys
+    from utils.data_store import DataStore
+    from utils.snapshot_store import SnapshotStore
+
+    if len(sys.argv) < 2:
+        sys.exit("Usage : python -m utils.restore <sauvegarde | AAAA-MM-JJ[THH:MM]> [PN ...]")
+    snapshots = SnapshotStore()
+    target, selected = sys.argv[1], sys.argv[2:] or None
+    if target not in snapshots.catalog():
+        try:
+            at = datetime.fromisoformat(target)
+        except ValueError:
+            sys.exit(f"Sauvegarde introuvable : {target}")
+        if len(target) == 10:
+            # Date seule : toutes les sauvegardes de la journée sont retenues
+            at = at.replace(hour=23, minute=59, second=59)
+        found = find_snapshot(snapshots, at, selected)
+        if found is None:
+            sys.exit(f"Aucune sauvegarde au {target}")
+        target = found
+    _, result = restore(snapshots, DataStore(), target, selected)
+    print(f"Sauvegarde {target} : {len(result['restored'])} PN restaurés, "
+          f"{len(result['unchanged'])} inchangés, {len(result['removed'])} supprimés")
@@ -4,8 +4,10 @@ Centralise la gestion de l'état de session Streamlit
 """
 
 import streamlit as st
-from utils.data_utils import load_json_data
-from config.constants import DEFAULT_TREND_YEAR, DEFAULT_TREND_PERCENTAGE
+from utils.data_store import get_data_store, DATA_SECTIONS
+from utils.storage import DataConflictError
+from utils.precompute import get_precompute_worker
+from config.constants import DEFAULT_TREND_YEAR, DEFAULT_TREND_PERCENTAGE, MESSAGES
 
 
 class SessionManager:
@@ -15,24 +17,93 @@ class SessionManager:
     def initialize():
         """Initialise l'état de session avec les données par défaut"""
         if 'initialized' not in st.session_state:
-            json_data = load_json_data()
-            
-            # Données principales
-            st.session_state.pn_data = json_data.get('pn_data', {})
-            st.session_state.pn_last_updated = json_data.get('pn_last_updated', {})
-            st.session_state.pn_trend = json_data.get('pn_trend', {})
-            st.session_state.pn_trend_enabled = json_data.get('pn_trend_enabled', {})
-            st.session_state.pn_file_name = json_data.get('pn_file_name', {})
-            st.session_state.pn_aircraft_model = json_data.get('pn_aircraft_model', {})
+            # Données principales, partagées avec les autres sessions
+            SessionManager.sync(force=True)
             
             # Paramètres d'interface
             st.session_state.trend_inputs = [{'year': DEFAULT_TREND_YEAR, 'percentage': DEFAULT_TREND_PERCENTAGE}]
             st.session_state.active_section = "dashboard"
             
             # Lien de données
-            st.session_state.data_link = json_data.get('data_link', "https://example.com")
+            st.session_state.data_link = get_data_store().data_link
             
             st.session_state.initialized = True
+        else:
+            SessionManager.sync()
+    
+    @staticmethod
+    def sync(force=False):
+        """
+        Récupère les données publiées par une autre session depuis le dernier chargement.
+        Si les données ne peuvent pas être lues, un message est affiché : la session conserve sa copie
+        précédente, ou la page s'arrête si aucune donnée n'a encore été chargée.
+
+        Args:
+            force (bool): Recharge les références même si la version n'a pas changé.
+        """
+        store = get_data_store()
+        try:
+            if not force and st.session_state.get('data_version') == store.refresh():
+                return
+            version, data = store.snapshot()
+        except Exception as e:
+            # Données illisibles : rien n'est publié sur un état vide, nouvelle tentative à la prochaine action
+            st.error(MESSAGES['data_load_error'].format(error=e))
+            if 'data_version' not in st.session_state:
+                st.stop()
+            return
+        for section in DATA_SECTIONS:
+            st.session_state[section] = data[section]
+        st.session_state.data_version = version
+    
+    @staticmethod
+    def save(*sections):
+        """
+        Publie les données de la session dans le stock partagé et sur le disque.
+
+        Args:
+            *sections: Sections à publier (toutes par défaut).
+
+        Returns:
+            bool: True si l'enregistrement a réussi, False en cas de conflit avec une autre session
+                  ou d'erreur d'écriture.
+        """
+        sections = sections or DATA_SECTIONS
+        return SessionManager.publish(**{section: st.session_state.get(section, {}) for section in sections})
+    
+    @staticmethod
+    def publish(**sections):
+        """
+        Publie de nouvelles valeurs de sections, si aucune autre session n'a écrit depuis le dernier chargement.
+
+        Args:
+            **sections: Sections à publier (ex : pn_trend=..., pn_trend_enabled=...).
+
+        Returns:
+            bool: True si l'enregistrement a réussi, False en cas de conflit (message affiché,
+                  données les plus récentes rechargées à la prochaine exécution) ou d'erreur d'écriture
+                  (message affiché, données du stock rechargées dans la session).
+        """
+        try:
+            st.session_state.data_version = get_data_store().publish(
+                expected_version=st.session_state.get('data_version'),
+                **sections
+            )
+        except DataConflictError:
+            st.error(MESSAGES['data_conflict'])
+            return False
+        except Exception as e:
+            # Écriture impossible (disque plein, droits...) : le stock est inchangé, et la copie de la session,
+            # éventuellement modifiée en place avant l'enregistrement, est remplacée par les données du stock
+            st.error(f"Erreur lors de la sauvegarde des données : {str(e)}")
+            SessionManager.sync(force=True)
+            return False
+        for section, values in sections.items():
+            st.session_state[section] = values
+        if 'pn_data' in sections or 'pn_forecast_engine' in sections:
+            # Prévisions recalculées en arrière-plan : la page n'attend pas les ajustements
+            get_precompute_worker().enqueue()
+        return True
     
     @staticmethod
     def ensure_aircraft_models():
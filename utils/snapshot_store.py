@@ -0,0 +1,480 @@
+"""
+Magasin de sauvegardes dédupliquées
+Chaque série PN est enregistrée une seule fois par contenu ; une sauvegarde n'est qu'un manifeste de références
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from config.constants import BACKUP_DIR, BACKUP_COMPRESSION, DEFAULT_DATA_LINK
+from utils.file_utils import write_atomic, file_lock
+from utils.pn_collection import LazyPNCollection, as_pn_collection
+from utils.pn_series import PNSeries
+from utils.storage import METADATA_SECTIONS
+
+# Préfixes et formats de date des identifiants de sauvegarde (repris des anciens noms de fichier)
+SNAPSHOT_ID_FORMATS = {
+    'auto': "auto_%Y%m%d",
+    'manual': "backup_%Y-%m-%d_%Hh%Mmin%S",
+}
+
+
+def snapshot_time(snapshot_id):
+    """
+    Date d'une sauvegarde, lue dans son identifiant.
+
+    Args:
+        snapshot_id (str): Identifiant de la sauvegarde (ex : "auto_20250707", ou "auto_20250707_2"
+            pour une deuxième sauvegarde portant la même date).
+
+    Returns:
+        datetime: Date de la sauvegarde, ou None si l'identifiant ne suit aucun format connu.
+    """
+    base, _, suffix = snapshot_id.rpartition('_')
+    candidates = [snapshot_id, base] if suffix.isdigit() else [snapshot_id]
+    for candidate in candidates:
+        for id_format in SNAPSHOT_ID_FORMATS.values():
+            try:
+                return datetime.strptime(candidate, id_format)
+            except ValueError:
+                continue
+    return None
+
+
+def snapshot_sequence(snapshot_id):
+    """
+    Rang d'une sauvegarde parmi celles portant la même date ("auto_20250707" : 1, "auto_20250707_2" : 2).
+
+    Args:
+        snapshot_id (str): Identifiant de la sauvegarde.
+
+    Returns:
+        int: Numéro du suffixe, 1 sans suffixe.
+    """
+    base, _, suffix = snapshot_id.rpartition('_')
+    if suffix.isdigit() and snapshot_time(base) is not None:
+        return int(suffix)
+    return 1
+
+
+def snapshot_kind(snapshot_id):
+    """Type de sauvegarde ('auto' ou 'manual') d'après le préfixe de l'identifiant"""
+    return 'auto' if snapshot_id.startswith('auto_') else 'manual'
+
+
+class SnapshotStore:
+    """
+    Sauvegardes dans le dossier BACKUP_DIR :
+    - objects/<aa>/<empreinte>.npz : une série par contenu distinct, partagée par toutes les sauvegardes
+    - snapshots/<id>.json.gz (ou .json sans compression) : manifeste d'une sauvegarde, références des
+      séries par empreinte et sections de métadonnées
+    - <id>.json à la racine : anciennes sauvegardes complètes, toujours lisibles et restaurables
+    - catalog.json : index des sauvegardes (date, taille, nombre de PN, empreinte), tenu à jour à chaque
+      création ou suppression ; la liste des sauvegardes ne parcourt ni ne lit le dossier
+
+    Une sauvegarde n'écrit donc que les séries qui ont changé depuis la précédente, plus son manifeste.
+    """
+
+    def __init__(self, root=None, compress=BACKUP_COMPRESSION):
+        self.root = Path(root or BACKUP_DIR)
+        self.compress = compress
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        # Catalogue en mémoire et date de modification du fichier correspondant
+        self._catalog = None
+        self._catalog_mtime = None
+
+    def _object_path(self, digest):
+        return self.root / 'objects' / digest[:2] / f"{digest}.npz"
+
+    def _manifest_path(self, snapshot_id, compress=None):
+        compress = self.compress if compress is None else compress
+        return self.root / 'snapshots' / f"{snapshot_id}.json{'.gz' if compress else ''}"
+
+    def _legacy_path(self, snapshot_id):
+        return self.root / f"{snapshot_id}.json"
+
+    @property
+    def catalog_path(self):
+        return self.root / 'catalog.json'
+
+    @contextmanager
+    def lock(self):
+        """
+        Verrou exclusif entre threads et entre processus : une sauvegarde en cours n'est jamais nettoyée.
+        Réentrant dans un même thread (le catalogue peut être reconstruit pendant une écriture).
+        """
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with file_lock(self.root / '.snapshots.lock'):
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    def _write_object(self, series):
+        """Enregistre une série si son contenu n'est pas déjà présent, et retourne son empreinte"""
+        digest = series.fingerprint()
+        path = self._object_path(digest)
+        if not path.exists():
+            buffer = io.BytesIO()
+            save = np.savez_compressed if self.compress else np.savez
+            save(buffer, start=np.int64(series.start), values=series.values)
+            write_atomic(path, buffer.getvalue())
+        return digest
+
+    def load_series(self, digest):
+        """
+        Charge une série depuis son empreinte.
+
+        Args:
+            digest (str): Empreinte de la série (voir PNSeries.fingerprint).
+
+        Returns:
+            PNSeries: Historique enregistré.
+        """
+        with np.load(self._object_path(digest)) as arrays:
+            return PNSeries(int(arrays['start']), arrays['values'])
+
+    def create(self, data, kind='manual', now=None):
+        """
+        Crée une sauvegarde.
+
+        Args:
+            data (dict): Sections de données ('pn_data', 'pn_trend'...) et, optionnellement, 'data_link'.
+            kind (str): 'auto' ou 'manual' (préfixe de l'identifiant).
+            now (datetime, optional): Date de la sauvegarde.
+
+        Returns:
+            str: Identifiant de la sauvegarde (ex : "backup_2025-07-07_09h30min00"), suffixé ("_2", "_3"...)
+                 si une sauvegarde porte déjà cet identifiant : elle n'est jamais écrasée.
+        """
+        now = now or datetime.now()
+        base_id = now.strftime(SNAPSHOT_ID_FORMATS[kind])
+        pn_data = as_pn_collection(data.get('pn_data', {}))
+        with self.lock():
+            snapshot_id, count = base_id, 1
+            while self._exists(snapshot_id):
+                count += 1
+                snapshot_id = f"{base_id}_{count}"
+            # Les objets sont écrits avant le manifeste qui les référence
+            series = {pn: self._write_object(pn_data.get_series(pn)) for pn in pn_data}
+            manifest = {
+                'id': snapshot_id,
+                'kind': kind,
+                'created_at': now.isoformat(timespec='seconds'),
+                'series': series,
+                'sections': {section: data.get(section, {}) for section in METADATA_SECTIONS},
+                'data_link': data.get('data_link') or DEFAULT_DATA_LINK,
+            }
+            content = json.dumps(manifest, ensure_ascii=False, default=str).encode('utf-8')
+            if self.compress:
+                content = gzip.compress(content)
+            write_atomic(self._manifest_path(snapshot_id), content)
+
+            catalog = self.catalog()
+            catalog[snapshot_id] = self._catalog_entry(snapshot_id, manifest, content)
+            self._write_catalog(catalog)
+        return snapshot_id
+
+    def _exists(self, snapshot_id):
+        """Indique si un manifeste ou une ancienne sauvegarde porte déjà cet identifiant"""
+        return any(self._manifest_path(snapshot_id, compress).exists() for compress in (True, False)) \
+            or self._legacy_path(snapshot_id).exists()
+
+    def _scan_snapshot_ids(self):
+        """Identifiants des sauvegardes présentes sur le disque (parcours des dossiers)"""
+        ids = set()
+        if (self.root / 'snapshots').exists():
+            ids.update(path.name.split('.json')[0] for path in (self.root / 'snapshots').iterdir()
+                       if path.name.endswith(('.json', '.json.gz')))
+        if self.root.exists():
+            ids.update(path.stem for path in self.root.glob('*.json') if path != self.catalog_path)
+        return ids
+
+    def _catalog_entry(self, snapshot_id, manifest, content):
+        """Entrée du catalogue d'une sauvegarde (manifeste, ou contenu complet d'une ancienne sauvegarde)"""
+        if manifest is None:
+            raw = json.loads(content)
+            created = snapshot_time(snapshot_id) or datetime.fromtimestamp(self._legacy_path(snapshot_id).stat().st_mtime)
+            return {
+                'id': snapshot_id,
+                'kind': snapshot_kind(snapshot_id),
+                'created_at': created.isoformat(timespec='seconds'),
+                'size': len(content),
+                'pn_count': len(raw.get('pn_data', {})),
+                'hash': hashlib.sha256(content).hexdigest(),
+                'legacy': True,
+            }
+        # Taille à restaurer : manifeste et séries référencées (partagées avec d'autres sauvegardes)
+        objects = {self._object_path(digest) for digest in manifest['series'].values()}
+        return {
+            'id': snapshot_id,
+            'kind': manifest['kind'],
+            'created_at': manifest['created_at'],
+            'size': len(content) + sum(path.stat().st_size for path in objects if path.exists()),
+            'pn_count': len(manifest['series']),
+            'hash': hashlib.sha256(content).hexdigest(),
+            'legacy': False,
+        }
+
+    def rebuild_catalog(self):
+        """
+        Reconstruit le catalogue en relisant toutes les sauvegardes (catalogue absent ou illisible).
+
+        Returns:
+            dict: Entrées du catalogue par identifiant.
+        """
+        with self.lock():
+            catalog = {}
+            for snapshot_id in self._scan_snapshot_ids():
+                if self.is_legacy(snapshot_id):
+                    catalog[snapshot_id] = self._catalog_entry(snapshot_id, None, self._legacy_path(snapshot_id).read_bytes())
+                else:
+                    path = next(self._manifest_path(snapshot_id, compress) for compress in (True, False)
+                                if self._manifest_path(snapshot_id, compress).exists())
+                    catalog[snapshot_id] = self._catalog_entry(snapshot_id, self.read_manifest(snapshot_id), path.read_bytes())
+            self._write_catalog(catalog)
+            return catalog
+
+    def _write_catalog(self, catalog):
+        """Enregistre le catalogue (verrous déjà pris)"""
+        write_atomic(self.catalog_path, json.dumps(catalog, indent=1, ensure_ascii=False).encode('utf-8'))
+        self._catalog = catalog
+        self._catalog_mtime = self.catalog_path.stat().st_mtime_ns
+
+    def catalog(self):
+        """
+        Catalogue des sauvegardes, relu seulement s'il a été modifié (par exemple par un autre processus).
+
+        Returns:
+            dict: Entrées par identifiant : 'id', 'kind', 'created_at', 'size' (octets), 'pn_count',
+                  'hash' (empreinte du manifeste ou du fichier) et 'legacy'.
+        """
+        with self._lock:
+            try:
+                mtime = self.catalog_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                # Premier accès (ou catalogue supprimé) : index construit depuis les fichiers présents
+                return dict(self.rebuild_catalog())
+            if self._catalog is None or mtime != self._catalog_mtime:
+                try:
+                    with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                        self._catalog = json.load(f)
+                    self._catalog_mtime = mtime
+                except ValueError:
+                    return dict(self.rebuild_catalog())
+            return dict(self._catalog)
+
+    def list_snapshots(self, offset=0, limit=None):
+        """
+        Page du catalogue, de la sauvegarde la plus récente à la plus ancienne.
+
+        Args:
+            offset (int): Nombre d'entrées à sauter.
+            limit (int, optional): Nombre maximal d'entrées retournées (toutes si None).
+
+        Returns:
+            tuple: (liste des entrées de la page, nombre total de sauvegardes).
+        """
+        # Sauvegardes créées dans la même seconde (ou le même jour) départagées par leur suffixe
+        entries = sorted(
+            self.catalog().values(),
+            key=lambda entry: (entry['created_at'], snapshot_sequence(entry['id'])),
+            reverse=True
+        )
+        end = None if limit is None else offset + limit
+        return entries[offset:end], len(entries)
+
+    def snapshot_ids(self):
+        """
+        Liste les sauvegardes, manifestes et anciennes sauvegardes complètes.
+
+        Returns:
+            list: Identifiants, du plus récent au plus ancien.
+        """
+        return [entry['id'] for entry in self.list_snapshots()[0]]
+
+    def is_legacy(self, snapshot_id):
+        """Indique si la sauvegarde est une ancienne copie complète en JSON"""
+        return not any(self._manifest_path(snapshot_id, compress).exists() for compress in (True, False)) \
+            and self._legacy_path(snapshot_id).exists()
+
+    def read_manifest(self, snapshot_id):
+        """
+        Lit le manifeste d'une sauvegarde.
+
+        Args:
+            snapshot_id (str): Identifiant de la sauvegarde.
+
+        Returns:
+            dict: 'id', 'kind', 'created_at', 'series' (empreinte par PN), 'sections' et 'data_link'.
+
+        Raises:
+            FileNotFoundError: Si la sauvegarde n'existe pas ou est une ancienne sauvegarde complète.
+        """
+        for compress in (True, False):
+            path = self._manifest_path(snapshot_id, compress)
+            if path.exists():
+                content = path.read_bytes()
+                return json.loads(gzip.decompress(content) if compress else content)
+        raise FileNotFoundError(snapshot_id)
+
+    def _read_legacy(self, snapshot_id):
+        """Contenu d'une ancienne sauvegarde complète (DataFrame encodés en JSON dans le JSON)"""
+        with open(self._legacy_path(snapshot_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _legacy_series(value):
+        """Série d'une ancienne sauvegarde (chaîne to_json ou liste d'enregistrements)"""
+        df = pd.read_json(io.StringIO(value)) if isinstance(value, str) else pd.DataFrame(value)
+        df['ds'] = pd.to_datetime(df['ds'])
+        return PNSeries.from_frame(df)
+
+    def load(self, snapshot_id):
+        """
+        Charge une sauvegarde sans lire les séries : chaque historique est chargé au premier accès.
+
+        Args:
+            snapshot_id (str): Identifiant de la sauvegarde.
+
+        Returns:
+            dict: Sections de données ('pn_data' en LazyPNCollection) et 'data_link'. Une section absente
+                  d'une ancienne sauvegarde JSON n'est pas retournée.
+        """
+        if self.is_legacy(snapshot_id):
+            raw = self._read_legacy(snapshot_id)
+            encoded = raw.get('pn_data', {})
+            # Les anciennes sauvegardes n'ont pas toutes les sections : seules les sections présentes sont retournées
+            data = {section: raw[section] for section in METADATA_SECTIONS if section in raw}
+            data['data_link'] = raw.get('data_link') or DEFAULT_DATA_LINK
+            data['pn_data'] = LazyPNCollection(encoded, load=lambda pn: self._legacy_series(encoded[pn]))
+            return data
+
+        manifest = self.read_manifest(snapshot_id)
+        series = manifest['series']
+        data = {section: manifest['sections'].get(section, {}) for section in METADATA_SECTIONS}
+        data['data_link'] = manifest.get('data_link') or DEFAULT_DATA_LINK
+        data['pn_data'] = LazyPNCollection(series, load=lambda pn: self.load_series(series[pn]))
+        return data
+
+    def export(self, snapshot_id):
+        """
+        Contenu téléchargeable d'une sauvegarde : un JSON autonome, lisible sans le magasin.
+
+        Args:
+            snapshot_id (str): Identifiant de la sauvegarde.
+
+        Returns:
+            bytes: JSON de la sauvegarde (fichier d'origine pour une ancienne sauvegarde).
+        """
+        if self.is_legacy(snapshot_id):
+            return self._legacy_path(snapshot_id).read_bytes()
+        data = self.load(snapshot_id)
+        pn_data = data.pop('pn_data')
+        export = {'pn_data': {pn: pn_data.get_series(pn).to_frame().to_dict('records') for pn in pn_data}, **data}
+        return json.dumps(export, indent=2, ensure_ascii=False, default=str).encode('utf-8')
+
+    def delete(self, snapshot_id):
+        """
+        Supprime une sauvegarde, puis les séries qu'aucune autre sauvegarde ne référence.
+
+        Args:
+            snapshot_id (str): Identifiant de la sauvegarde.
+        """
+        with self.lock():
+            self._remove(snapshot_id)
+            self._collect_garbage()
+
+    def _remove(self, snapshot_id):
+        """Supprime le manifeste (ou l'ancienne sauvegarde complète) et son entrée du catalogue, sans nettoyer les séries"""
+        for compress in (True, False):
+            self._manifest_path(snapshot_id, compress).unlink(missing_ok=True)
+        self._legacy_path(snapshot_id).unlink(missing_ok=True)
+        catalog = self.catalog()
+        if catalog.pop(snapshot_id, None) is not None:
+            self._write_catalog(catalog)
+
+    def prune(self, retention):
+        """
+        Supprime les sauvegardes les plus anciennes au-delà du nombre conservé pour leur type,
+        puis les séries qui ne sont plus référencées.
+
+        Args:
+            retention (dict): Nombre de sauvegardes conservées par type ('auto', 'manual'), None : toutes.
+
+        Returns:
+            list: Identifiants des sauvegardes supprimées.
+        """
+        removed = []
+        with self.lock():
+            by_kind = {}
+            # Ordre du catalogue (date de création, puis suffixe) : de la plus récente à la plus ancienne
+            for snapshot_id in self.snapshot_ids():
+                by_kind.setdefault(snapshot_kind(snapshot_id), []).append(snapshot_id)
+            for kind, ids in by_kind.items():
+                keep = retention.get(kind)
+                if keep is None:
+                    continue
+                for snapshot_id in ids[keep:]:
+                    self._remove(snapshot_id)
+                    removed.append(snapshot_id)
+            if removed:
+                self._collect_garbage()
+        return removed
+
+    def collect_garbage(self):
+        """
+        Supprime les séries qu'aucun manifeste ne référence.
+
+        Returns:
+            int: Nombre de séries supprimées.
+        """
+        with self.lock():
+            return self._collect_garbage()
+
+    def _collect_garbage(self):
+        """Nettoyage des objets orphelins (verrous déjà pris)"""
+        objects_dir = self.root / 'objects'
+        if not objects_dir.exists():
+            return 0
+        # Parcours du disque plutôt que du catalogue : une série référencée n'est jamais supprimée
+        referenced = set()
+        for snapshot_id in self._scan_snapshot_ids():
+            if not self.is_legacy(snapshot_id):
+                referenced.update(self.read_manifest(snapshot_id)['series'].values())
+        removed = 0
+        for path in objects_dir.glob('*/*.npz'):
+            if path.stem not in referenced:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+@st.cache_resource
+def get_snapshot_store():
+    """
+    Retourne le magasin de sauvegardes unique du processus serveur.
+
+    Returns:
+        SnapshotStore: Magasin partagé par toutes les sessions.
+    """
+    return SnapshotStore()
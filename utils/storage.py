@@ -0,0 +1,401 @@
+"""
+Couche de stockage des données PN
+Backends interchangeables : JSON historique ou un fichier NumPy (.npz) par PN avec un manifeste
+"""
+
+import hashlib
+import io
+import json
+import re
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config.constants import (
+    DATA_FILE, DATA_DIR, STORAGE_BACKEND, DEFAULT_DATA_LINK, LEGACY_SERIES_FILE, LEGACY_METADATA_FILE
+)
+from utils.data_utils import load_json_data, save_json_data
+from utils.file_utils import write_atomic, file_lock
+from utils.pn_collection import LazyPNCollection
+from utils.pn_series import PNSeries
+
+# Sections de métadonnées enregistrées chacune dans leur fichier
+METADATA_SECTIONS = (
+    'pn_last_updated', 'pn_trend', 'pn_trend_enabled',
+    'pn_file_name', 'pn_aircraft_model', 'pn_forecast_engine', 'pn_file_hash'
+)
+
+
+def _get_series(pn_data, pn):
+    """Série compacte d'un PN, sans conversion si la collection la fournit déjà"""
+    if isinstance(pn_data, LazyPNCollection):
+        return pn_data.get_series(pn)
+    return PNSeries.from_frame(pn_data[pn])
+
+
+class DataConflictError(Exception):
+    """Les données ont été modifiées par une autre session ou un autre processus depuis leur lecture"""
+
+
+class JsonStorage:
+    """Stockage historique : un seul fichier JSON, une liste d'enregistrements par PN"""
+
+    def exists(self):
+        """Indique si des données sont présentes"""
+        return Path(DATA_FILE).exists()
+
+    def lock(self):
+        """Verrou exclusif entre processus pour les lectures et écritures"""
+        return file_lock(f"{DATA_FILE}.lock")
+
+    def read_version(self):
+        """
+        Version des données enregistrées, comparée avant chaque écriture.
+
+        Returns:
+            int: Date de modification du fichier en nanosecondes (0 s'il n'existe pas).
+        """
+        path = Path(DATA_FILE)
+        return path.stat().st_mtime_ns if path.exists() else 0
+
+    def load(self):
+        """
+        Charge toutes les données.
+
+        Returns:
+            dict: Sections de données ('pn_data', 'pn_trend'...) et 'data_link'.
+        """
+        return load_json_data()
+
+    def load_section(self, section):
+        """
+        Charge une seule section de métadonnées (ou le lien de données), sans reconstruire les DataFrame des PN.
+
+        Args:
+            section (str): Nom de la section (ex : 'pn_trend').
+
+        Returns:
+            dict | str: Contenu de la section, ou None si elle est absente.
+        """
+        path = Path(DATA_FILE)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(section)
+
+    def save(self, data):
+        """
+        Enregistre toutes les données.
+
+        Args:
+            data (dict): Sections de données et 'data_link'.
+        """
+        save_json_data(
+            data.get('pn_data', {}),
+            data.get('pn_last_updated', {}),
+            data.get('pn_trend', {}),
+            data.get('pn_trend_enabled', {}),
+            data.get('pn_file_name', {}),
+            data.get('pn_aircraft_model', {}),
+            data.get('pn_forecast_engine', {}),
+            data.get('data_link'),
+            data.get('pn_file_hash', {})
+        )
+
+    def write(self, data, series=None, removed=(), sections=None):
+        """Enregistrement incrémental : le fichier unique est toujours réécrit en entier"""
+        self.save(data)
+        return self.read_version()
+
+    def clear(self):
+        """Supprime toutes les données"""
+        Path(DATA_FILE).unlink(missing_ok=True)
+
+
+class LegacyNpzStorage:
+    """
+    Stockage de la version précédente, en lecture seule : toutes les séries dans un seul fichier .npz
+    et toutes les métadonnées dans un fichier JSON. Seulement lu pour la migration vers NpzStorage.
+    """
+
+    def exists(self):
+        """Indique si des données sont présentes"""
+        return Path(LEGACY_METADATA_FILE).exists()
+
+    def load(self):
+        """
+        Charge toutes les données.
+
+        Returns:
+            dict: Sections de données ('pn_data' en LazyPNCollection déjà en mémoire) et 'data_link'.
+        """
+        with open(LEGACY_METADATA_FILE, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        data = {section: metadata.get(section, {}) for section in METADATA_SECTIONS}
+        data['data_link'] = metadata.get('data_link', DEFAULT_DATA_LINK)
+        frames = {}
+        series = metadata.get('series', {})
+        if series:
+            with np.load(LEGACY_SERIES_FILE) as arrays:
+                for pn, entry in series.items():
+                    values = arrays[entry['key']]
+                    # int32 si toutes les quantités sont entières, sinon float64 avec NaN (stocké en float32)
+                    if values.dtype.kind == 'f':
+                        values = values.astype(np.float32)
+                    frames[pn] = PNSeries(entry['start'], values)
+        data['pn_data'] = LazyPNCollection.from_frames(frames)
+        return data
+
+    def clear(self):
+        """Supprime toutes les données"""
+        Path(LEGACY_METADATA_FILE).unlink(missing_ok=True)
+        Path(LEGACY_SERIES_FILE).unlink(missing_ok=True)
+
+
+class NpzStorage:
+    """
+    Stockage colonnaire par PN dans le dossier DATA_DIR :
+    - series/<PN>-<version>.npz : quantités mensuelles contiguës et index du premier mois ; chaque écriture
+      crée un nouveau fichier, l'ancien n'est supprimé qu'après la mise à jour du manifeste
+    - sections/<section>.json : une section de métadonnées par fichier (tendances, dates...)
+    - manifest.json : correspondance entre les PN et leurs fichiers de séries
+    - version : numéro croissant changé à chaque écriture (et à chaque effacement), écrit en dernier
+
+    Chaque écriture ne touche que les fichiers des PN et sections modifiés (et le compteur).
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root or DATA_DIR)
+
+    @property
+    def manifest_path(self):
+        return self.root / 'manifest.json'
+
+    def _series_path(self, file_name):
+        return self.root / 'series' / file_name
+
+    def _section_path(self, section):
+        return self.root / 'sections' / f"{section}.json"
+
+    @staticmethod
+    def _series_file_name(pn, version):
+        """Nom de fichier sans caractère spécial pour une version de l'historique d'un PN"""
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', pn)
+        digest = hashlib.sha1(pn.encode('utf-8')).hexdigest()[:8]
+        return f"{safe}-{digest}-{version}.npz"
+
+    def exists(self):
+        """Indique si des données sont présentes"""
+        return self.manifest_path.exists()
+
+    def lock(self):
+        """Verrou exclusif entre processus pour les lectures et écritures"""
+        return file_lock(self.root.parent / f".{self.root.name}.lock")
+
+    def read_version(self):
+        """
+        Version des données enregistrées, comparée avant chaque écriture.
+
+        Returns:
+            int: Numéro de version (0 si aucune donnée n'a jamais été écrite).
+        """
+        try:
+            return int((self.root / 'version').read_text())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _read_manifest(self):
+        if not self.manifest_path.exists():
+            return {'series': {}}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_json(self, path, value):
+        write_atomic(path, json.dumps(value, indent=4, ensure_ascii=False, default=str).encode('utf-8'))
+
+    def load_section(self, section):
+        """
+        Charge une seule section de métadonnées (ou le lien de données).
+
+        Args:
+            section (str): Nom de la section (ex : 'pn_trend').
+
+        Returns:
+            dict | str: Contenu de la section, ou None si elle n'a jamais été enregistrée.
+        """
+        path = self._section_path(section)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_series(self, pn, file_name=None):
+        """
+        Charge l'historique d'un seul PN.
+
+        Args:
+            pn (str): Numéro de PN.
+            file_name (str, optional): Fichier de la série, lu dans le manifeste si absent.
+
+        Returns:
+            PNSeries: Historique du PN.
+        """
+        file_name = file_name or self._read_manifest()['series'][pn]
+        with np.load(self._series_path(file_name)) as arrays:
+            return PNSeries(int(arrays['start']), arrays['values'])
+
+    def load(self):
+        """
+        Charge toutes les données.
+
+        Returns:
+            dict: Sections de données ('pn_data', 'pn_trend'...) et 'data_link'.
+                  'pn_data' est une LazyPNCollection : chaque historique est lu au premier accès.
+        """
+        manifest = self._read_manifest()
+        data = {section: self.load_section(section) or {} for section in METADATA_SECTIONS}
+        data['data_link'] = self.load_section('data_link') or DEFAULT_DATA_LINK
+        # Historiques chargés à la demande : seul le manifeste est lu ici
+        files = manifest['series']
+        data['pn_data'] = LazyPNCollection(files, load=lambda pn: self._load_listed_series(pn, files[pn]))
+        return data
+
+    def _load_listed_series(self, pn, file_name):
+        """
+        Charge au premier accès un historique listé dans un manifeste déjà lu.
+
+        Une écriture concurrente peut avoir remplacé le fichier depuis la lecture du manifeste (l'ancien
+        fichier est alors supprimé) : le manifeste courant est relu pour charger la version enregistrée.
+        """
+        try:
+            return self.load_series(pn, file_name)
+        except FileNotFoundError:
+            for _ in range(3):
+                try:
+                    return self.load_series(pn)
+                except FileNotFoundError:
+                    # Fichier remplacé entre la lecture du manifeste et celle de la série : nouvel essai
+                    continue
+            raise
+
+    def save(self, data):
+        """
+        Enregistre toutes les données.
+
+        Args:
+            data (dict): Sections de données et 'data_link'.
+        """
+        self.write(data)
+
+    def write(self, data, series=None, removed=(), sections=None):
+        """
+        Enregistre les PN et sections modifiés.
+
+        Args:
+            data (dict): État complet des sections de données et 'data_link'.
+            series (iterable, optional): PN dont l'historique a changé (tous si None).
+            removed (iterable): PN supprimés.
+            sections (iterable, optional): Sections de métadonnées modifiées, 'data_link' compris (toutes si None).
+
+        Returns:
+            int: Nouvelle version des données.
+        """
+        pn_data = data.get('pn_data', {})
+        series = list(pn_data) if series is None else list(series)
+        sections = (*METADATA_SECTIONS, 'data_link') if sections is None else tuple(sections)
+
+        manifest = self._read_manifest()
+        version = self._next_version()
+        orphans = []
+
+        # Les fichiers de séries sont écrits avant le manifeste qui les référence, sous un nouveau nom :
+        # un fichier listé dans un manifeste n'est jamais modifié, seulement supprimé une fois remplacé
+        for pn in series:
+            pn_series = _get_series(pn_data, pn)
+            buffer = io.BytesIO()
+            np.savez(buffer, start=np.int64(pn_series.start), values=pn_series.values)
+            file_name = self._series_file_name(pn, version)
+            write_atomic(self._series_path(file_name), buffer.getvalue())
+            if pn in manifest['series']:
+                orphans.append(manifest['series'][pn])
+            manifest['series'][pn] = file_name
+
+        for section in sections:
+            if section == 'data_link':
+                value = data.get('data_link') or DEFAULT_DATA_LINK
+            else:
+                value = data.get(section, {})
+            self._write_json(self._section_path(section), value)
+
+        orphans += [manifest['series'].pop(pn) for pn in removed if pn in manifest['series']]
+        if series or orphans or not self.exists():
+            self._write_json(self.manifest_path, manifest)
+        # Les fichiers remplacés ou des PN supprimés ne sont effacés qu'une fois retirés du manifeste
+        for file_name in orphans:
+            self._series_path(file_name).unlink(missing_ok=True)
+
+        write_atomic(self.root / 'version', str(version).encode('ascii'))
+        return version
+
+    def _next_version(self):
+        """
+        Nouveau numéro de version, jamais réutilisé : l'horloge en nanosecondes, au moins la version
+        précédente + 1. Après un effacement, un autre processus ne peut donc pas confondre
+        la nouvelle version avec celle qu'il a lue avant.
+        """
+        return max(self.read_version() + 1, time.time_ns())
+
+    def clear(self):
+        """Supprime toutes les données (le numéro de version est conservé et avancé)"""
+        version = self._next_version()
+        shutil.rmtree(self.root, ignore_errors=True)
+        write_atomic(self.root / 'version', str(version).encode('ascii'))
+
+
+STORAGE_BACKENDS = {
+    'json': JsonStorage,
+    'npz': NpzStorage,
+}
+
+
+def get_storage(backend=STORAGE_BACKEND):
+    """
+    Retourne le backend de stockage configuré, après migration éventuelle depuis le JSON historique.
+
+    Args:
+        backend (str): Nom du backend (clé de STORAGE_BACKENDS).
+
+    Returns:
+        JsonStorage | NpzStorage: Backend de stockage.
+    """
+    storage = STORAGE_BACKENDS[backend]()
+    if backend != 'json':
+        migrate_legacy(storage)
+    return storage
+
+
+def migrate_legacy(storage):
+    """
+    Migration unique : recopie les données d'un ancien format dans un autre backend s'il est encore vide.
+    Le fichier .npz unique de la version précédente est prioritaire sur le JSON historique, qu'il remplaçait.
+
+    Args:
+        storage: Backend de destination.
+
+    Returns:
+        bool: True si une migration a été effectuée.
+    """
+    with storage.lock():
+        if storage.exists():
+            return False
+        for legacy in (LegacyNpzStorage(), JsonStorage()):
+            if not legacy.exists():
+                continue
+            data = legacy.load()
+            if data:
+                storage.save(data)
+                return True
+        return False
@@ -0,0 +1,52 @@
+"""
+Dépôt des tendances personnalisées
+Sert les sections pn_trend / pn_trend_enabled depuis un cache mémoire, sans relire l'historique des PN
+"""
+
+import copy
+import threading
+import streamlit as st
+from utils.data_store import get_data_store
+
+TREND_SECTIONS = ('pn_trend', 'pn_trend_enabled')
+
+
+class TrendsRepository:
+    """
+    Accès en lecture aux tendances personnalisées.
+
+    Les tendances sont lues une fois (section seule si les PN ne sont pas encore chargés), puis servies
+    depuis la mémoire tant que la version du stock de données ne change pas : toute écriture,
+    de cette session, d'une autre session ou d'un autre processus, invalide le cache.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._version = None
+        self._trends = None
+
+    def get_trends(self):
+        """
+        Retourne les tendances personnalisées.
+
+        Returns:
+            tuple: (version des données, pn_trend, pn_trend_enabled). Les dictionnaires sont des copies
+                   profondes : la page peut les modifier avant de les publier.
+        """
+        version = self._store.refresh()
+        with self._lock:
+            if self._trends is None or self._version != version:
+                self._version, self._trends = self._store.read_sections(*TREND_SECTIONS)
+            return self._version, copy.deepcopy(self._trends['pn_trend']), copy.deepcopy(self._trends['pn_trend_enabled'])
+
+
+@st.cache_resource
+def get_trends_repository():
+    """
+    Retourne le dépôt des tendances unique du processus serveur.
+
+    Returns:
+        TrendsRepository: Dépôt partagé par toutes les sessions.
+    """
+    return TrendsRepository(get_data_store())
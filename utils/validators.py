@@ -3,9 +3,109 @@ Module de validation des données
 Centralise toutes les validations de l'application
 """
 
+import numpy as np
 import pandas as pd
 from typing import Union, List, Tuple
-from config.constants import REQUIRED_COLUMNS
+from config.constants import REQUIRED_COLUMNS, HISTORY_YEAR_RANGE, VALIDATION_MAX_REPORTED_ROWS
+from config.mappings import MONTH_MAP
+
+
+class ValidationIssue:
+    """Anomalie détectée par la validation : un contrôle, une colonne et les lignes concernées"""
+
+    __slots__ = ('check', 'column', 'message', 'rows')
+
+    def __init__(self, check, column, message, rows=()):
+        self.check = check
+        self.column = column
+        self.message = message
+        self.rows = np.asarray(rows, dtype=np.int64)
+
+    def __repr__(self):
+        return f"ValidationIssue({self.check!r}, {self.column!r}, {len(self.rows)} lignes)"
+
+    def describe(self, max_rows=VALIDATION_MAX_REPORTED_ROWS):
+        """
+        Message lisible, avec les premières lignes concernées.
+
+        Args:
+            max_rows (int): Nombre maximal de lignes citées.
+
+        Returns:
+            str: Message de l'anomalie.
+        """
+        if not len(self.rows):
+            return self.message
+        shown = ', '.join(str(row) for row in self.rows[:max_rows])
+        if len(self.rows) > max_rows:
+            shown += f" et {len(self.rows) - max_rows} autres"
+        label = "ligne" if len(self.rows) == 1 else "lignes"
+        return f"{self.message} ({label} {shown})"
+
+
+class ValidationReport:
+    """
+    Résultat de la validation d'un historique importé.
+
+    errors bloque l'import ; warnings (mois manquants) est seulement signalé. Les numéros de ligne
+    commencent à 1 et suivent l'ordre des lignes lues dans le fichier. data contient l'historique
+    normalisé (années et mois entiers, quantités numériques) lorsque la validation réussit.
+    """
+
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+        self.data = None
+
+    @property
+    def is_valid(self):
+        return not self.errors
+
+    def add_error(self, check, column, message, rows=()):
+        self.errors.append(ValidationIssue(check, column, message, rows))
+
+    def add_warning(self, check, column, message, rows=()):
+        self.warnings.append(ValidationIssue(check, column, message, rows))
+
+    def summary(self, file_ref=None):
+        """
+        Résumé des erreurs, une phrase par contrôle en échec.
+
+        Args:
+            file_ref (str, optional): Nom du fichier cité dans le message.
+
+        Returns:
+            str: Résumé, ou chaîne vide si les données sont valides.
+        """
+        if self.is_valid:
+            return ""
+        return f"Le fichier {file_ref or 'importé'} est invalide : {self.error_details()}."
+
+    def error_details(self):
+        """Détail des erreurs, sans mention du fichier (chaîne vide s'il n'y en a pas)"""
+        return ' ; '.join(issue.describe() for issue in self.errors)
+
+    def warning_summary(self):
+        """Résumé des avertissements (chaîne vide s'il n'y en a pas)"""
+        return ' ; '.join(issue.describe() for issue in self.warnings)
+
+    def to_frame(self):
+        """
+        Détail des anomalies, une ligne par contrôle.
+
+        Returns:
+            pandas.DataFrame: Colonnes 'Niveau', 'Colonne', 'Anomalie', 'Lignes'.
+        """
+        return pd.DataFrame([
+            {
+                "Niveau": level,
+                "Colonne": issue.column or "",
+                "Anomalie": issue.message,
+                "Lignes": ', '.join(map(str, issue.rows)),
+            }
+            for level, issues in (("Erreur", self.errors), ("Avertissement", self.warnings))
+            for issue in issues
+        ], columns=["Niveau", "Colonne", "Anomalie", "Lignes"])
 
 
 class DataValidator:
@@ -48,41 +148,111 @@ class DataValidator:
         return True, ""
     
     @staticmethod
-    def validate_excel_structure(df: pd.DataFrame) -> Tuple[bool, str]:
+    def validate_history(df: pd.DataFrame, year_range: Tuple[int, int] = HISTORY_YEAR_RANGE) -> ValidationReport:
         """
-        Valide la structure d'un DataFrame Excel
-        
+        Valide un historique importé (colonnes 'Année', 'Mois', 'Quantité') en une passe vectorisée :
+        types, plages de valeurs, valeurs manquantes, mois en double et mois manquants.
+
         Args:
-            df (pd.DataFrame): DataFrame à valider
-            
+            df (pd.DataFrame): Historique brut lu dans le fichier.
+            year_range (Tuple[int, int]): Années minimale et maximale acceptées.
+
         Returns:
-            Tuple[bool, str]: (est_valide, message_erreur)
+            ValidationReport: Anomalies par contrôle avec leurs numéros de ligne,
+                              et historique normalisé si aucune erreur n'est détectée.
         """
+        report = ValidationReport()
+
         # Vérification des colonnes
         if list(df.columns) != REQUIRED_COLUMNS:
-            return False, f"Le fichier doit contenir exactement les colonnes : {', '.join(REQUIRED_COLUMNS)}"
-        
-        # Vérification des valeurs manquantes
-        if df[REQUIRED_COLUMNS].isnull().any().any():
-            return False, "Le fichier contient des valeurs manquantes"
-        
-        # Vérification des types de données
-        try:
-            # Vérifier que les années sont des entiers
-            df['Année'].astype(int)
-        except (ValueError, TypeError):
-            return False, "La colonne 'Année' doit contenir des valeurs numériques entières"
-        
-        # Vérifier que les quantités sont numériques et non négatives
-        try:
-            quantities = pd.to_numeric(df['Quantité'], errors='raise')
-            if (quantities < 0).any():
-                return False, "La colonne 'Quantité' ne peut pas contenir de valeurs négatives"
-        except (ValueError, TypeError):
-            return False, "La colonne 'Quantité' doit contenir des valeurs numériques non négatives"
-        
-        return True, ""
-    
+            report.add_error('structure', None,
+                             f"il doit contenir exactement les colonnes : {', '.join(REQUIRED_COLUMNS)}")
+            return report
+        if df.empty:
+            report.add_error('structure', None, "il ne contient aucune donnée")
+            return report
+
+        rows = np.arange(1, len(df) + 1)
+        missing = {column: df[column].isna().to_numpy() for column in REQUIRED_COLUMNS}
+        for column in REQUIRED_COLUMNS:
+            if missing[column].any():
+                report.add_error('missing', column, f"la colonne {column} contient des valeurs manquantes",
+                                 rows[missing[column]])
+
+        # Années : numériques, entières et dans la plage acceptée
+        years = pd.to_numeric(df['Année'], errors='coerce').to_numpy(dtype=np.float64)
+        year_nan = np.isnan(years)
+        not_numeric = year_nan & ~missing['Année']
+        if not_numeric.any():
+            report.add_error('dtype', 'Année', "la colonne Année doit contenir des valeurs numériques entières",
+                             rows[not_numeric])
+        with np.errstate(invalid='ignore'):
+            not_integer = ~year_nan & (years != np.floor(years))
+            out_of_range = ~year_nan & ~not_integer & ((years < year_range[0]) | (years > year_range[1]))
+        if not_integer.any():
+            report.add_error('dtype', 'Année', "la colonne Année doit contenir des années entières",
+                             rows[not_integer])
+        if out_of_range.any():
+            report.add_error('range', 'Année',
+                             f"les années doivent être comprises entre {year_range[0]} et {year_range[1]}",
+                             rows[out_of_range])
+        year_ok = ~(year_nan | not_integer | out_of_range)
+
+        # Mois : noms français (Janvier/janvier, Février/février, ...)
+        months = df['Mois'].map(MONTH_MAP).to_numpy(dtype=np.float64)
+        month_nan = np.isnan(months)
+        unknown_month = month_nan & ~missing['Mois']
+        if unknown_month.any():
+            report.add_error('range', 'Mois',
+                             "certains mois ne sont pas valides, utilisez : Janvier/janvier, Février/février, Mars/mars, etc.",
+                             rows[unknown_month])
+
+        # Quantités : numériques, finies et non négatives
+        quantities = pd.to_numeric(df['Quantité'], errors='coerce')
+        values = quantities.to_numpy(dtype=np.float64, na_value=np.nan)
+        quantity_nan = np.isnan(values)
+        invalid_quantity = (quantity_nan & ~missing['Quantité']) | np.isinf(values)
+        if invalid_quantity.any():
+            report.add_error('dtype', 'Quantité', "la colonne Quantité doit contenir des valeurs numériques",
+                             rows[invalid_quantity])
+        with np.errstate(invalid='ignore'):
+            negative = values < 0
+        if negative.any():
+            report.add_error('range', 'Quantité', "la colonne Quantité ne peut pas contenir de valeurs négatives",
+                             rows[negative])
+
+        # Mois en double et mois manquants, sur les lignes dont la période est lisible
+        period_ok = year_ok & ~month_nan
+        periods = (years[period_ok] * 12 + months[period_ok] - 1).astype(np.int64)
+        period_rows = rows[period_ok]
+        order = np.argsort(periods, kind='stable')
+        sorted_periods = periods[order]
+        repeated = sorted_periods[1:] == sorted_periods[:-1]
+        if repeated.any():
+            in_group = np.zeros(len(sorted_periods), dtype=bool)
+            in_group[1:] |= repeated
+            in_group[:-1] |= repeated
+            report.add_error('duplicate', None, "certains mois apparaissent plusieurs fois",
+                             np.sort(period_rows[order][in_group]))
+
+        unique_periods = np.unique(sorted_periods)
+        gaps = np.diff(unique_periods) - 1
+        if (gaps > 0).any():
+            after_gap = np.flatnonzero(gaps > 0) + 1
+            first_rows = period_rows[order][np.searchsorted(sorted_periods, unique_periods[after_gap])]
+            report.add_warning('gap', None, f"{int(gaps.sum())} mois manquants dans l'historique",
+                               np.sort(first_rows))
+
+        if report.is_valid:
+            if quantities.dtype.kind == 'f' and np.array_equal(values, np.floor(values)):
+                quantities = quantities.astype(np.int64)
+            report.data = pd.DataFrame({
+                'Année': years.astype(np.int64),
+                'Mois': months.astype(np.int64),
+                'Quantité': quantities.to_numpy(),
+            }, index=df.index)
+        return report
+
     @staticmethod
     def validate_year_range(years: List[int], min_year: int = 2000, max_year: int = 2100) -> Tuple[bool, str]:
         """